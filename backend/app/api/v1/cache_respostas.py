@@ -0,0 +1,107 @@
+import functools
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+from ...core.config import settings
+from ...services.concorrencia import VooUnico
+from ...services.servico_dados_assincrono import servico_dados_async
+
+class CacheRespostas:
+    """Cache LRU de respostas calculadas, limitado em entradas e em bytes
+    
+    Cada entrada guarda a versão das coleções que a resposta leu; uma
+    consulta só acerta se a versão atual for a mesma, então qualquer
+    gravação numa dessas coleções invalida exatamente as entradas que
+    dependem dela. Usado só pelo event loop, sem lock.
+    """
+    
+    def __init__(self, max_entradas: int, max_bytes: int):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas: "OrderedDict[Hashable, Tuple[str, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self.acertos = 0
+        self.falhas = 0
+    
+    def obter(self, chave: Hashable, versao: str) -> Tuple[bool, Any]:
+        entrada = self._entradas.get(chave)
+        if entrada is None or entrada[0] != versao:
+            if entrada is not None:
+                self._descartar(chave)
+            self.falhas += 1
+            return False, None
+        self._entradas.move_to_end(chave)
+        self.acertos += 1
+        return True, entrada[1]
+    
+    def guardar(self, chave: Hashable, versao: str, valor: Any, tamanho: int) -> None:
+        if chave in self._entradas:
+            self._descartar(chave)
+        if tamanho > self.max_bytes:
+            return
+        self._entradas[chave] = (versao, valor, tamanho)
+        self._bytes += tamanho
+        while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+            self._descartar(next(iter(self._entradas)))
+    
+    def limpar(self) -> None:
+        self._entradas.clear()
+        self._bytes = 0
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        total = self.acertos + self.falhas
+        return {
+            "entradas": len(self._entradas),
+            "bytes": self._bytes,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": round(self.acertos / total, 4) if total else 0.0
+        }
+    
+    def _descartar(self, chave: Hashable) -> None:
+        _, _, tamanho = self._entradas.pop(chave)
+        self._bytes -= tamanho
+
+# Instância global do cache de respostas
+cache_respostas = CacheRespostas(settings.CACHE_RESPOSTAS_MAX_ENTRADAS, settings.CACHE_RESPOSTAS_MAX_BYTES)
+
+# Cálculos em andamento: quem chega durante um cálculo aguarda o mesmo resultado
+calculos_em_andamento = VooUnico()
+
+def em_cache(*colecoes: str) -> Callable:
+    """Guarda o resultado de uma função assíncrona pura dos dados armazenados
+    
+    A chave é a função e seus argumentos (numa rota, os parâmetros da query);
+    `colecoes` são as coleções lidas (sem nenhuma, o documento inteiro). A
+    versão é obtida antes do cálculo, então uma gravação concorrente faz a
+    entrada nascer já desatualizada em vez de esconder a alteração.
+    Exceções (404, 400...) não são guardadas.
+    
+    Requisições idênticas que chegam enquanto a resposta é calculada (por
+    exemplo, todos os clientes logo após uma gravação) compartilham o
+    mesmo cálculo.
+    """
+    def decorador(funcao: Callable) -> Callable:
+        @functools.wraps(funcao)
+        async def envolvida(*args, **kwargs):
+            chave = (funcao.__module__, funcao.__qualname__, args, tuple(sorted(kwargs.items())))
+            versao, _ = await servico_dados_async.versao_colecoes(colecoes or None)
+            if settings.CACHE_RESPOSTAS_ENABLED:
+                encontrado, valor = cache_respostas.obter(chave, versao)
+                if encontrado:
+                    return valor
+            
+            return await calculos_em_andamento.executar((chave, versao), lambda: _calcular(chave, versao, funcao, args, kwargs))
+        
+        return envolvida
+    return decorador
+
+async def _calcular(chave: Hashable, versao: str, funcao: Callable, args: tuple, kwargs: dict) -> Any:
+    valor = await funcao(*args, **kwargs)
+    if settings.CACHE_RESPOSTAS_ENABLED:
+        cache_respostas.guardar(chave, versao, valor, _tamanho(valor))
+    return valor
+
+def _tamanho(valor: Any) -> int:
+    """Tamanho aproximado da resposta serializada"""
+    return len(json.dumps(valor, default=str))
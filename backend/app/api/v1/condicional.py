@@ -0,0 +1,45 @@
+from email.utils import formatdate
+from typing import Any
+from fastapi import Depends, HTTPException, Request
+from ...services.servico_dados_assincrono import servico_dados_async
+from .ndjson import aceita_ndjson
+
+def versionado(*colecoes: str) -> Any:
+    """Dependência de GET condicional para rotas que leem as coleções informadas
+    
+    Calcula o ETag a partir das versões das coleções (sem nenhuma coleção,
+    do documento inteiro) antes de o endpoint ler os dados. Se o cliente já
+    tem essa versão (If-None-Match) a resposta é 304 sem corpo; caso
+    contrário ETag e Last-Modified ficam em request.state.validadores e são
+    aplicados à resposta por adicionar_validadores.
+    """
+    async def verificar(request: Request) -> None:
+        versao, alterado_em = await servico_dados_async.versao_colecoes(colecoes or None)
+        # NDJSON e JSON são representações diferentes do mesmo recurso
+        etag = f'W/"{versao}-nd"' if aceita_ndjson(request) else f'W/"{versao}"'
+        validadores = {"ETag": etag, "Last-Modified": formatdate(alterado_em, usegmt=True)}
+        
+        if _corresponde(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=validadores)
+        request.state.validadores = validadores
+    
+    return Depends(verificar)
+
+def adicionar_validadores(request: Request, response: Any) -> None:
+    """Copia ETag/Last-Modified calculados por versionado para uma resposta 200"""
+    validadores = getattr(request.state, "validadores", None)
+    if validadores and response.status_code == 200:
+        response.headers.update(validadores)
+
+def _corresponde(if_none_match: str, etag: str) -> bool:
+    """Comparação fraca (RFC 9110) de If-None-Match com o ETag atual"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    atual = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if (candidato[2:] if candidato.startswith("W/") else candidato) == atual:
+            return True
+    return False
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Request
+from typing import List, Dict, Any, Iterator
 from ....models.extrato import LLMConfigCreate, LLMConfigInDB
-from ....services.servico_dados import servico_dados
+from ....services.servico_dados_assincrono import servico_dados_async
+from ..cache_respostas import cache_respostas, calculos_em_andamento, em_cache
+from ....services.extracao_pdf import extrator_pdf
+from ..condicional import versionado
+from ..ndjson import aceita_ndjson, resposta_ndjson
 import uuid
 from datetime import datetime
 import json
@@ -10,11 +14,11 @@ router = APIRouter()
 
 # === ENDPOINTS DE CONFIGURAÇÕES LLM ===
 
-@router.get("/llm-configs", response_model=List[LLMConfigInDB])
+@router.get("/llm-configs", response_model=List[LLMConfigInDB], dependencies=[versionado("llm_configs")])
 async def listar_configs_llm():
     """Lista todas as configurações de LLM"""
     try:
-        configs = servico_dados.get_llm_configs()
+        configs = await servico_dados_async.get_llm_configs()
         return configs
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
@@ -36,7 +40,7 @@ async def criar_config_llm(config: LLMConfigCreate):
         config_dict["is_active"] = True
         config_dict["created_at"] = datetime.now().isoformat()
         
-        config_criada = servico_dados.save_llm_config(config_dict)
+        config_criada = await servico_dados_async.save_llm_config(config_dict)
         return config_criada
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
@@ -45,16 +49,12 @@ async def criar_config_llm(config: LLMConfigCreate):
 async def deletar_config_llm(config_id: str):
     """Remove uma configuração de LLM"""
     try:
-        data = servico_dados.load_data()
-        configs = data.get("llm_configs", [])
+        sucesso = await servico_dados_async.delete_llm_config(config_id)
         
-        for i, config in enumerate(configs):
-            if config.get("id") == config_id:
-                del configs[i]
-                servico_dados.save_data(data)
-                return {"message": "Configuração removida com sucesso"}
+        if not sucesso:
+            raise HTTPException(status_code=404, detail="Configuração não encontrada")
         
-        raise HTTPException(status_code=404, detail="Configuração não encontrada")
+        return {"message": "Configuração removida com sucesso"}
     except HTTPException:
         raise
     except Exception as e:
@@ -64,18 +64,13 @@ async def deletar_config_llm(config_id: str):
 async def alternar_config_llm(config_id: str):
     """Ativa/desativa uma configuração de LLM"""
     try:
-        data = servico_dados.load_data()
-        configs = data.get("llm_configs", [])
-        
-        for i, config in enumerate(configs):
-            if config.get("id") == config_id:
-                configs[i]["is_active"] = not configs[i].get("is_active", True)
-                servico_dados.save_data(data)
-                
-                status = "ativada" if configs[i]["is_active"] else "desativada"
-                return {"message": f"Configuração {status} com sucesso"}
-        
-        raise HTTPException(status_code=404, detail="Configuração não encontrada")
+        config = await servico_dados_async.toggle_llm_config(config_id)
+        
+        if not config:
+            raise HTTPException(status_code=404, detail="Configuração não encontrada")
+        
+        status = "ativada" if config["is_active"] else "desativada"
+        return {"message": f"Configuração {status} com sucesso"}
     except HTTPException:
         raise
     except Exception as e:
@@ -84,19 +79,30 @@ async def alternar_config_llm(config_id: str):
 # === ENDPOINTS DE BACKUP E RESTORE ===
 
 @router.get("/backup/export")
-async def exportar_dados():
-    """Exporta todos os dados do sistema"""
+async def exportar_dados(request: Request):
+    """Exporta todos os dados do sistema
+    
+    Com Accept: application/x-ndjson o backup é enviado em streaming, uma
+    linha por chave avulsa ({"chave", "valor"}) e por registro
+    ({"colecao", "registro"}), terminando com {"export_info"}.
+    """
     try:
-        data = servico_dados.load_data()
+        if aceita_ndjson(request):
+            return resposta_ndjson(_exportacao_ndjson())
+        
+        data = await servico_dados_async.load_data()
         
         # Remover chaves API sensíveis do backup
+        # (cópias: o documento retornado por load_data() é o cache compartilhado)
         backup_data = data.copy()
         if "llm_configs" in backup_data:
-            for config in backup_data["llm_configs"]:
-                if "api_key" in config:
-                    del config["api_key"]
+            backup_data["llm_configs"] = [
+                {k: v for k, v in config.items() if k != "api_key"}
+                for config in backup_data["llm_configs"]
+            ]
         
         # Atualizar metadata do backup
+        backup_data["backup_metadata"] = dict(backup_data.get("backup_metadata", {}))
         backup_data["backup_metadata"]["export_date"] = datetime.now().isoformat()
         backup_data["backup_metadata"]["export_version"] = "1.0.0"
         
@@ -128,14 +134,14 @@ async def importar_dados(backup_data: Dict[str, Any]):
                 )
         
         # Fazer backup dos dados atuais antes de importar
-        current_data = servico_dados.load_data()
+        current_data = await servico_dados_async.load_data()
         backup_filename = f"backup_pre_import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         
         # Salvar dados importados
         backup_data["backup_metadata"]["import_date"] = datetime.now().isoformat()
         backup_data["backup_metadata"]["previous_backup"] = backup_filename
         
-        servico_dados.save_data(backup_data)
+        await servico_dados_async.save_data(backup_data)
         
         return {
             "message": "Dados importados com sucesso",
@@ -153,11 +159,12 @@ async def importar_dados(backup_data: Dict[str, Any]):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/backup/info")
+@router.get("/backup/info", dependencies=[versionado()])
+@em_cache()
 async def info_backup():
     """Obtém informações sobre o backup atual"""
     try:
-        data = servico_dados.load_data()
+        data = await servico_dados_async.load_data()
         backup_metadata = data.get("backup_metadata", {})
         
         # Calcular estatísticas
@@ -187,38 +194,29 @@ async def info_backup():
 async def status_sistema():
     """Obtém status geral do sistema"""
     try:
-        data = servico_dados.load_data()
-        
-        # Verificar configurações de IA
-        configs_llm = data.get("llm_configs", [])
-        configs_ativas = [c for c in configs_llm if c.get("is_active", True)]
-        
-        # Calcular estatísticas de uso
-        total_transacoes = len(data.get("gastos", [])) + len(data.get("receitas", []))
-        total_processamentos = (
-            len(data.get("contracheques_processados", [])) +
-            len(data.get("extratos_bancarios_processados", [])) +
-            len(data.get("extratos_cartao_processados", []))
-        )
+        # Estatísticas dos dados vêm do cache; as dos caches são sempre atuais
+        status = dict(await _status_dados())
+        status["cache_dados"] = await servico_dados_async.estatisticas_cache()
+        status["cache_respostas"] = cache_respostas.estatisticas()
+        status["leituras_coalescidas"] = {
+            "servico_dados": servico_dados_async.voo_unico.coalescidas,
+            "relatorios": calculos_em_andamento.coalescidas
+        }
+        status["extracao_pdf"] = extrator_pdf.estatisticas()
+        return status
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.post("/sistema/resumos/reconstruir")
+async def reconstruir_resumos():
+    """Recalcula os resumos mensais e informa os meses que estavam divergentes"""
+    try:
+        divergencias = await servico_dados_async.reconstruir_resumos()
         
         return {
-            "sistema": {
-                "versao": "1.0.0",
-                "status": "online",
-                "data_inicializacao": data.get("backup_metadata", {}).get("version", "1.0.0")
-            },
-            "configuracoes_ia": {
-                "total_configs": len(configs_llm),
-                "configs_ativas": len(configs_ativas),
-                "provedores_disponiveis": list(set(c.get("provider") for c in configs_ativas))
-            },
-            "estatisticas_uso": {
-                "total_transacoes": total_transacoes,
-                "total_contas": len(data.get("contas", [])),
-                "total_investimentos": len(data.get("investimentos", [])),
-                "total_processamentos_ia": total_processamentos
-            },
-            "ultimo_backup": data.get("backup_metadata", {}).get("last_backup")
+            "message": "Resumos mensais reconstruídos com sucesso",
+            "consistente": not any(divergencias.values()),
+            "meses_divergentes": divergencias
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
@@ -228,11 +226,11 @@ async def reset_sistema():
     """Reseta o sistema para o estado inicial (CUIDADO!)"""
     try:
         # Fazer backup antes do reset
-        current_data = servico_dados.load_data()
+        current_data = await servico_dados_async.load_data()
         backup_filename = f"backup_pre_reset_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         
         # Recriar arquivo inicial
-        servico_dados._create_initial_data_file()
+        await servico_dados_async.resetar()
         
         return {
             "message": "Sistema resetado com sucesso",
@@ -242,3 +240,69 @@ async def reset_sistema():
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@em_cache()
+async def _status_dados() -> Dict[str, Any]:
+    """Parte do status calculada a partir do documento"""
+    data = await servico_dados_async.load_data()
+    
+    # Verificar configurações de IA
+    configs_llm = data.get("llm_configs", [])
+    configs_ativas = [c for c in configs_llm if c.get("is_active", True)]
+    
+    # Calcular estatísticas de uso
+    total_transacoes = len(data.get("gastos", [])) + len(data.get("receitas", []))
+    total_processamentos = (
+        len(data.get("contracheques_processados", [])) +
+        len(data.get("extratos_bancarios_processados", [])) +
+        len(data.get("extratos_cartao_processados", []))
+    )
+    
+    return {
+        "sistema": {
+            "versao": "1.0.0",
+            "status": "online",
+            "data_inicializacao": data.get("backup_metadata", {}).get("version", "1.0.0")
+        },
+        "configuracoes_ia": {
+            "total_configs": len(configs_llm),
+            "configs_ativas": len(configs_ativas),
+            "provedores_disponiveis": list(set(c.get("provider") for c in configs_ativas))
+        },
+        "estatisticas_uso": {
+            "total_transacoes": total_transacoes,
+            "total_contas": len(data.get("contas", [])),
+            "total_investimentos": len(data.get("investimentos", [])),
+            "total_processamentos_ia": total_processamentos
+        },
+        "ultimo_backup": data.get("backup_metadata", {}).get("last_backup")
+    }
+
+def _exportacao_ndjson() -> Iterator[Dict[str, Any]]:
+    """Linhas do backup em streaming (sem as chaves de API)"""
+    export_date = datetime.now().isoformat()
+    totais: Dict[str, int] = {}
+    
+    for linha in servico_dados_async.servico.iterar_documento():
+        colecao = linha.get("colecao")
+        if colecao is None:
+            if linha["chave"] == "backup_metadata":
+                metadata = dict(linha["valor"] or {})
+                metadata["export_date"] = export_date
+                metadata["export_version"] = "1.0.0"
+                linha = {"chave": "backup_metadata", "valor": metadata}
+        else:
+            totais[colecao] = totais.get(colecao, 0) + 1
+            if colecao == "llm_configs":
+                linha = {"colecao": colecao, "registro": {k: v for k, v in linha["registro"].items() if k != "api_key"}}
+        yield linha
+    
+    yield {
+        "export_info": {
+            "total_gastos": totais.get("gastos", 0),
+            "total_receitas": totais.get("receitas", 0),
+            "total_contas": totais.get("contas", 0),
+            "total_investimentos": totais.get("investimentos", 0),
+            "export_date": export_date
+        }
+    }
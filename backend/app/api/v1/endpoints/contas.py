@@ -1,17 +1,32 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Any, Dict, Iterator, List, Optional
 from ....models.conta import Conta, ContaCreate, ContaUpdate
-from ....services.servico_dados import servico_dados
+from ....services.agregacao import colunas_em_centavos
+from ....services.colunar import valor_em_centavos
+from ....services.base_dados import ConflitoVersao
+from ....services.servico_dados_assincrono import servico_dados_async
+from ..cache_respostas import em_cache
+from ..condicional import versionado
+from ..ndjson import aceita_ndjson, resposta_ndjson
+from ..projecao import campos_projecao, resposta_projetada
+import heapq
 import uuid
 
 router = APIRouter()
 
-@router.get("/contas", response_model=List[Conta])
-async def listar_contas():
+@router.get("/contas", response_model=List[Conta], dependencies=[versionado("contas")])
+async def listar_contas(
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
+):
     """Lista todas as contas"""
     try:
-        contas = servico_dados.get_contas()
+        campos = campos_projecao(Conta, fields)
+        contas = await servico_dados_async.get_contas()
+        if campos:
+            return resposta_projetada(Conta, campos, contas)
         return contas
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
@@ -22,21 +37,26 @@ async def criar_conta(conta: ContaCreate):
         conta_dict = conta.dict()
         conta_dict["id"] = str(uuid.uuid4())
         
-        conta_criada = servico_dados.create_conta(conta_dict)
+        conta_criada = await servico_dados_async.create_conta(conta_dict)
         return conta_criada
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/contas/{conta_id}", response_model=Conta)
-async def obter_conta(conta_id: str):
+@router.get("/contas/{conta_id}", response_model=Conta, dependencies=[versionado("contas")])
+async def obter_conta(
+    conta_id: str,
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
+):
     """Obtém uma conta específica por ID"""
     try:
-        contas = servico_dados.get_contas()
-        conta = next((c for c in contas if c["id"] == conta_id), None)
+        campos = campos_projecao(Conta, fields)
+        conta = await servico_dados_async.get_conta(conta_id)
         
         if not conta:
             raise HTTPException(status_code=404, detail="Conta não encontrada")
         
+        if campos:
+            return resposta_projetada(Conta, campos, conta)
         return conta
     except HTTPException:
         raise
@@ -48,12 +68,14 @@ async def atualizar_conta(conta_id: str, conta: ContaUpdate):
     """Atualiza uma conta existente"""
     try:
         conta_dict = conta.dict(exclude_unset=True)
-        conta_atualizada = servico_dados.update_conta(conta_id, conta_dict)
+        conta_atualizada = await servico_dados_async.update_conta(conta_id, conta_dict)
         
         if not conta_atualizada:
             raise HTTPException(status_code=404, detail="Conta não encontrada")
         
         return conta_atualizada
+    except ConflitoVersao as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -64,19 +86,13 @@ async def deletar_conta(conta_id: str):
     """Remove uma conta"""
     try:
         # Verificar se a conta está sendo usada em transações
-        gastos = servico_dados.get_gastos()
-        receitas = servico_dados.get_receitas()
-        
-        conta_em_uso = any(g.get("conta_id") == conta_id for g in gastos) or \
-                      any(r.get("conta_id") == conta_id for r in receitas)
-        
-        if conta_em_uso:
+        if await servico_dados_async.conta_em_uso(conta_id):
             raise HTTPException(
                 status_code=400, 
                 detail="Não é possível excluir conta que possui transações associadas"
             )
         
-        sucesso = servico_dados.delete_conta(conta_id)
+        sucesso = await servico_dados_async.delete_conta(conta_id)
         
         if not sucesso:
             raise HTTPException(status_code=404, detail="Conta não encontrada")
@@ -87,27 +103,23 @@ async def deletar_conta(conta_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/contas/{conta_id}/saldo")
+@router.get("/contas/{conta_id}/saldo", dependencies=[versionado("contas", "gastos", "receitas")])
+@em_cache("contas", "gastos", "receitas")
 async def calcular_saldo_conta(conta_id: str):
     """Calcula o saldo atual de uma conta baseado nas transações"""
     try:
         # Verificar se a conta existe
-        contas = servico_dados.get_contas()
-        conta = next((c for c in contas if c["id"] == conta_id), None)
+        conta = await servico_dados_async.get_conta(conta_id)
         
         if not conta:
             raise HTTPException(status_code=404, detail="Conta não encontrada")
         
-        # Buscar transações da conta
-        gastos = servico_dados.get_gastos()
-        receitas = servico_dados.get_receitas()
-        
-        gastos_conta = [g for g in gastos if g.get("conta_id") == conta_id]
-        receitas_conta = [r for r in receitas if r.get("conta_id") == conta_id]
+        # Totais das transações da conta (resumos mantidos a cada mutação)
+        totais = await servico_dados_async.totais_conta(conta_id)
         
         # Calcular saldo
-        total_gastos = sum(float(g.get("valor", 0)) for g in gastos_conta)
-        total_receitas = sum(float(r.get("valor", 0)) for r in receitas_conta)
+        total_gastos = totais["gastos"]["total"]
+        total_receitas = totais["receitas"]["total"]
         
         saldo_inicial = float(conta.get("saldo_atual", 0))
         saldo_calculado = saldo_inicial + total_receitas - total_gastos
@@ -119,27 +131,33 @@ async def calcular_saldo_conta(conta_id: str):
             "total_receitas": round(total_receitas, 2),
             "total_gastos": round(total_gastos, 2),
             "saldo_atual": round(saldo_calculado, 2),
-            "quantidade_transacoes": len(gastos_conta) + len(receitas_conta)
+            "quantidade_transacoes": totais["gastos"]["quantidade"] + totais["receitas"]["quantidade"]
         }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/contas/{conta_id}/extrato")
-async def extrato_conta(conta_id: str):
-    """Gera extrato de uma conta com todas as transações"""
+@router.get("/contas/{conta_id}/extrato", dependencies=[versionado("contas", "gastos", "receitas")])
+async def extrato_conta(conta_id: str, request: Request):
+    """Gera extrato de uma conta com todas as transações
+    
+    Com Accept: application/x-ndjson o extrato é enviado em streaming: uma
+    linha com a conta, uma por transação e uma final com os totais.
+    """
     try:
         # Verificar se a conta existe
-        contas = servico_dados.get_contas()
-        conta = next((c for c in contas if c["id"] == conta_id), None)
+        conta = await servico_dados_async.get_conta(conta_id)
         
         if not conta:
             raise HTTPException(status_code=404, detail="Conta não encontrada")
         
+        if aceita_ndjson(request):
+            return resposta_ndjson(_extrato_ndjson(conta))
+        
         # Buscar transações da conta
-        gastos = servico_dados.get_gastos()
-        receitas = servico_dados.get_receitas()
+        gastos = await servico_dados_async.get_gastos({"conta_id": conta_id})
+        receitas = await servico_dados_async.get_receitas({"conta_id": conta_id})
         
         gastos_conta = [
             {
@@ -147,7 +165,7 @@ async def extrato_conta(conta_id: str):
                 "tipo_transacao": "gasto",
                 "valor_movimento": -float(g.get("valor", 0))
             }
-            for g in gastos if g.get("conta_id") == conta_id
+            for g in gastos
         ]
         
         receitas_conta = [
@@ -156,7 +174,7 @@ async def extrato_conta(conta_id: str):
                 "tipo_transacao": "receita",
                 "valor_movimento": float(r.get("valor", 0))
             }
-            for r in receitas if r.get("conta_id") == conta_id
+            for r in receitas
         ]
         
         # Combinar e ordenar por data
@@ -165,8 +183,8 @@ async def extrato_conta(conta_id: str):
         
         # Calcular saldo
         saldo_inicial = float(conta.get("saldo_atual", 0))
-        total_receitas = sum(float(r.get("valor", 0)) for r in receitas_conta)
-        total_gastos = sum(float(g.get("valor", 0)) for g in gastos_conta)
+        total_receitas = int(colunas_em_centavos(receitas, ("valor",)).sum()) / 100
+        total_gastos = int(colunas_em_centavos(gastos, ("valor",)).sum()) / 100
         saldo_atual = saldo_inicial + total_receitas - total_gastos
         
         return {
@@ -182,3 +200,37 @@ async def extrato_conta(conta_id: str):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+def _extrato_ndjson(conta: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Linhas do extrato em streaming, intercalando gastos e receitas por data"""
+    servico = servico_dados_async.servico
+    filtros = {"conta_id": conta["id"]}
+    gastos = (
+        {**g, "tipo_transacao": "gasto", "valor_movimento": -float(g.get("valor", 0))}
+        for g in servico.iterar("gastos", filtros)
+    )
+    receitas = (
+        {**r, "tipo_transacao": "receita", "valor_movimento": float(r.get("valor", 0))}
+        for r in servico.iterar("receitas", filtros)
+    )
+    
+    yield {"conta": conta}
+    
+    # Totais acumulados em centavos enquanto as transações são enviadas
+    centavos = {"gasto": 0, "receita": 0}
+    quantidade = 0
+    for transacao in heapq.merge(gastos, receitas, key=lambda t: str(t.get("data") or ""), reverse=True):
+        centavos[transacao["tipo_transacao"]] += valor_em_centavos(transacao.get("valor"))
+        quantidade += 1
+        yield transacao
+    
+    saldo_inicial = float(conta.get("saldo_atual", 0))
+    total_receitas = centavos["receita"] / 100
+    total_gastos = centavos["gasto"] / 100
+    yield {
+        "saldo_inicial": round(saldo_inicial, 2),
+        "saldo_atual": round(saldo_inicial + total_receitas - total_gastos, 2),
+        "total_receitas": round(total_receitas, 2),
+        "total_gastos": round(total_gastos, 2),
+        "quantidade_transacoes": quantidade
+    }
@@ -1,25 +1,40 @@
 from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from typing import List, Optional, Union
 from datetime import date
+from ....core.config import settings
 from ....models.investimento import (
     Investimento, InvestimentoCreate, InvestimentoUpdate,
     Meta, MetaCreate, MetaUpdate
 )
-from ....services.servico_dados import servico_dados
+from ....models.paginacao import Pagina
+from ....services.base_dados import ConflitoVersao
+from ....services.servico_dados_assincrono import servico_dados_async
+from ..cache_respostas import em_cache
+from ..condicional import versionado
+from ..projecao import campos_projecao, resposta_projetada
 import uuid
 
 router = APIRouter()
 
 # === ENDPOINTS DE INVESTIMENTOS ===
 
-@router.get("/investimentos", response_model=List[Investimento])
+@router.get("/investimentos", response_model=Union[List[Investimento], Pagina[Investimento]], dependencies=[versionado("investimentos")])
 async def listar_investimentos(
     ativo: Optional[bool] = Query(None, description="Filtrar por investimentos ativos"),
-    tipo: Optional[str] = Query(None, description="Filtrar por tipo de investimento")
+    tipo: Optional[str] = Query(None, description="Filtrar por tipo de investimento"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGINACAO_LIMITE_MAXIMO, description="Tamanho da página (ativa a paginação por cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
 ):
     """Lista todos os investimentos com filtros opcionais"""
     try:
-        investimentos = servico_dados.get_investimentos()
+        campos = campos_projecao(Investimento, fields)
+        if limit is not None or cursor is not None:
+            filtros = {"ativo": ativo, "tipo_investimento": tipo or None}
+            pagina = await servico_dados_async.paginar("investimentos", limit or settings.PAGINACAO_LIMITE_PADRAO, cursor, filtros)
+            return resposta_projetada(Investimento, campos, pagina) if campos else pagina
+        
+        investimentos = await servico_dados_async.get_investimentos()
         
         # Aplicar filtros
         if ativo is not None:
@@ -28,7 +43,13 @@ async def listar_investimentos(
         if tipo:
             investimentos = [i for i in investimentos if i.get("tipo_investimento") == tipo]
         
+        if campos:
+            return resposta_projetada(Investimento, campos, investimentos)
         return investimentos
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
@@ -47,21 +68,65 @@ async def criar_investimento(investimento: InvestimentoCreate):
         if not investimento_dict.get("valor_atual"):
             investimento_dict["valor_atual"] = investimento_dict["valor_inicial"]
         
-        investimento_criado = servico_dados.create_investimento(investimento_dict)
+        investimento_criado = await servico_dados_async.create_investimento(investimento_dict)
         return investimento_criado
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/investimentos/{investimento_id}", response_model=Investimento)
-async def obter_investimento(investimento_id: str):
+@router.get("/investimentos/resumo", dependencies=[versionado("investimentos")])
+@em_cache("investimentos")
+async def resumo_investimentos():
+    """Gera resumo dos investimentos"""
+    try:
+        resumo = await servico_dados_async.agregar_investimentos()
+        
+        # Calcular totais
+        valor_total_aplicado = resumo["total"]["valor_inicial"]
+        valor_total_atual = resumo["total"]["valor_atual"]
+        
+        # Calcular rentabilidade
+        rentabilidade_total = valor_total_atual - valor_total_aplicado if valor_total_aplicado > 0 else 0
+        percentual_rentabilidade = (rentabilidade_total / valor_total_aplicado * 100) if valor_total_aplicado > 0 else 0
+        
+        # Agrupar por tipo (somas vetorizadas por tipo_investimento)
+        por_tipo = {}
+        for tipo, grupo in resumo["grupos"].items():
+            valor_aplicado = grupo["valor_inicial"]
+            rentabilidade = grupo["valor_atual"] - valor_aplicado
+            por_tipo[tipo] = {
+                "quantidade": grupo["quantidade"],
+                "valor_aplicado": valor_aplicado,
+                "valor_atual": grupo["valor_atual"],
+                "rentabilidade": round(rentabilidade, 2),
+                "percentual": round((rentabilidade / valor_aplicado * 100) if valor_aplicado > 0 else 0, 2)
+            }
+        
+        return {
+            "total_investimentos": resumo["total"]["quantidade"],
+            "valor_total_aplicado": round(valor_total_aplicado, 2),
+            "valor_total_atual": round(valor_total_atual, 2),
+            "rentabilidade_total": round(rentabilidade_total, 2),
+            "percentual_rentabilidade": round(percentual_rentabilidade, 2),
+            "por_tipo": por_tipo
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.get("/investimentos/{investimento_id}", response_model=Investimento, dependencies=[versionado("investimentos")])
+async def obter_investimento(
+    investimento_id: str,
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
+):
     """Obtém um investimento específico por ID"""
     try:
-        investimentos = servico_dados.get_investimentos()
-        investimento = next((i for i in investimentos if i["id"] == investimento_id), None)
+        campos = campos_projecao(Investimento, fields)
+        investimento = await servico_dados_async.get_investimento(investimento_id)
         
         if not investimento:
             raise HTTPException(status_code=404, detail="Investimento não encontrado")
         
+        if campos:
+            return resposta_projetada(Investimento, campos, investimento)
         return investimento
     except HTTPException:
         raise
@@ -72,22 +137,20 @@ async def obter_investimento(investimento_id: str):
 async def atualizar_investimento(investimento_id: str, investimento: InvestimentoUpdate):
     """Atualiza um investimento existente"""
     try:
-        data = servico_dados.load_data()
-        investimentos = data.get("investimentos", [])
-        
-        for i, inv in enumerate(investimentos):
-            if inv.get("id") == investimento_id:
-                investimento_dict = investimento.dict(exclude_unset=True)
-                
-                # Converter date para string ISO
-                if isinstance(investimento_dict.get("data_aplicacao"), date):
-                    investimento_dict["data_aplicacao"] = investimento_dict["data_aplicacao"].isoformat()
-                
-                investimentos[i].update(investimento_dict)
-                servico_dados.save_data(data)
-                return investimentos[i]
-        
-        raise HTTPException(status_code=404, detail="Investimento não encontrado")
+        investimento_dict = investimento.dict(exclude_unset=True)
+        
+        # Converter date para string ISO
+        if isinstance(investimento_dict.get("data_aplicacao"), date):
+            investimento_dict["data_aplicacao"] = investimento_dict["data_aplicacao"].isoformat()
+        
+        investimento_atualizado = await servico_dados_async.update_investimento(investimento_id, investimento_dict)
+        
+        if not investimento_atualizado:
+            raise HTTPException(status_code=404, detail="Investimento não encontrado")
+        
+        return investimento_atualizado
+    except ConflitoVersao as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -97,85 +160,45 @@ async def atualizar_investimento(investimento_id: str, investimento: Investiment
 async def deletar_investimento(investimento_id: str):
     """Remove um investimento"""
     try:
-        data = servico_dados.load_data()
-        investimentos = data.get("investimentos", [])
+        sucesso = await servico_dados_async.delete_investimento(investimento_id)
         
-        for i, inv in enumerate(investimentos):
-            if inv.get("id") == investimento_id:
-                del investimentos[i]
-                servico_dados.save_data(data)
-                return {"message": "Investimento removido com sucesso"}
+        if not sucesso:
+            raise HTTPException(status_code=404, detail="Investimento não encontrado")
         
-        raise HTTPException(status_code=404, detail="Investimento não encontrado")
+        return {"message": "Investimento removido com sucesso"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/investimentos/resumo")
-async def resumo_investimentos():
-    """Gera resumo dos investimentos"""
-    try:
-        investimentos = servico_dados.get_investimentos()
-        investimentos_ativos = [i for i in investimentos if i.get("ativo", True)]
-        
-        # Calcular totais
-        valor_total_aplicado = sum(float(i.get("valor_inicial", 0)) for i in investimentos_ativos)
-        valor_total_atual = sum(float(i.get("valor_atual", 0)) for i in investimentos_ativos)
-        
-        # Calcular rentabilidade
-        rentabilidade_total = valor_total_atual - valor_total_aplicado if valor_total_aplicado > 0 else 0
-        percentual_rentabilidade = (rentabilidade_total / valor_total_aplicado * 100) if valor_total_aplicado > 0 else 0
-        
-        # Agrupar por tipo
-        por_tipo = {}
-        for inv in investimentos_ativos:
-            tipo = inv.get("tipo_investimento", "outros")
-            if tipo not in por_tipo:
-                por_tipo[tipo] = {
-                    "quantidade": 0,
-                    "valor_aplicado": 0,
-                    "valor_atual": 0
-                }
-            
-            por_tipo[tipo]["quantidade"] += 1
-            por_tipo[tipo]["valor_aplicado"] += float(inv.get("valor_inicial", 0))
-            por_tipo[tipo]["valor_atual"] += float(inv.get("valor_atual", 0))
-        
-        # Calcular rentabilidade por tipo
-        for tipo_data in por_tipo.values():
-            rentabilidade = tipo_data["valor_atual"] - tipo_data["valor_aplicado"]
-            tipo_data["rentabilidade"] = round(rentabilidade, 2)
-            tipo_data["percentual"] = round(
-                (rentabilidade / tipo_data["valor_aplicado"] * 100) if tipo_data["valor_aplicado"] > 0 else 0, 2
-            )
-        
-        return {
-            "total_investimentos": len(investimentos_ativos),
-            "valor_total_aplicado": round(valor_total_aplicado, 2),
-            "valor_total_atual": round(valor_total_atual, 2),
-            "rentabilidade_total": round(rentabilidade_total, 2),
-            "percentual_rentabilidade": round(percentual_rentabilidade, 2),
-            "por_tipo": por_tipo
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
-
 # === ENDPOINTS DE METAS ===
 
-@router.get("/metas", response_model=List[Meta])
+@router.get("/metas", response_model=Union[List[Meta], Pagina[Meta]], dependencies=[versionado("metas")])
 async def listar_metas(
-    ativa: Optional[bool] = Query(None, description="Filtrar por metas ativas")
+    ativa: Optional[bool] = Query(None, description="Filtrar por metas ativas"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGINACAO_LIMITE_MAXIMO, description="Tamanho da página (ativa a paginação por cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
 ):
     """Lista todas as metas com filtros opcionais"""
     try:
-        data = servico_dados.load_data()
-        metas = data.get("metas", [])
+        campos = campos_projecao(Meta, fields)
+        if limit is not None or cursor is not None:
+            pagina = await servico_dados_async.paginar("metas", limit or settings.PAGINACAO_LIMITE_PADRAO, cursor, {"ativa": ativa})
+            return resposta_projetada(Meta, campos, pagina) if campos else pagina
+        
+        metas = await servico_dados_async.get_metas()
         
         if ativa is not None:
             metas = [m for m in metas if m.get("ativa") == ativa]
         
+        if campos:
+            return resposta_projetada(Meta, campos, metas)
         return metas
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
@@ -194,26 +217,52 @@ async def criar_meta(meta: MetaCreate):
         if isinstance(meta_dict.get("data_objetivo"), date):
             meta_dict["data_objetivo"] = meta_dict["data_objetivo"].isoformat()
         
-        data = servico_dados.load_data()
-        meta_dict["created_at"] = datetime.now().isoformat()
-        data["metas"].append(meta_dict)
-        servico_dados.save_data(data)
+        meta_criada = await servico_dados_async.create_meta(meta_dict)
+        return meta_criada
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.get("/metas/resumo", dependencies=[versionado("metas")])
+@em_cache("metas")
+async def resumo_metas():
+    """Gera resumo das metas"""
+    try:
+        resumo = await servico_dados_async.agregar_metas()
+        
+        total_metas = resumo["total"]["quantidade"]
+        metas_atingidas = resumo["atingidas"]
+        
+        valor_total_objetivo = resumo["total"]["valor_objetivo"]
+        valor_total_atual = resumo["total"]["valor_atual"]
+        
+        percentual_geral = (valor_total_atual / valor_total_objetivo * 100) if valor_total_objetivo > 0 else 0
         
-        return meta_dict
+        return {
+            "total_metas": total_metas,
+            "metas_atingidas": metas_atingidas,
+            "metas_pendentes": total_metas - metas_atingidas,
+            "valor_total_objetivo": round(valor_total_objetivo, 2),
+            "valor_total_atual": round(valor_total_atual, 2),
+            "percentual_geral": round(percentual_geral, 2)
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/metas/{meta_id}", response_model=Meta)
-async def obter_meta(meta_id: str):
+@router.get("/metas/{meta_id}", response_model=Meta, dependencies=[versionado("metas")])
+async def obter_meta(
+    meta_id: str,
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
+):
     """Obtém uma meta específica por ID"""
     try:
-        data = servico_dados.load_data()
-        metas = data.get("metas", [])
-        meta = next((m for m in metas if m["id"] == meta_id), None)
+        campos = campos_projecao(Meta, fields)
+        meta = await servico_dados_async.get_meta(meta_id)
         
         if not meta:
             raise HTTPException(status_code=404, detail="Meta não encontrada")
         
+        if campos:
+            return resposta_projetada(Meta, campos, meta)
         return meta
     except HTTPException:
         raise
@@ -224,24 +273,22 @@ async def obter_meta(meta_id: str):
 async def atualizar_meta(meta_id: str, meta: MetaUpdate):
     """Atualiza uma meta existente"""
     try:
-        data = servico_dados.load_data()
-        metas = data.get("metas", [])
-        
-        for i, m in enumerate(metas):
-            if m.get("id") == meta_id:
-                meta_dict = meta.dict(exclude_unset=True)
-                
-                # Converter dates para string ISO
-                if isinstance(meta_dict.get("data_inicio"), date):
-                    meta_dict["data_inicio"] = meta_dict["data_inicio"].isoformat()
-                if isinstance(meta_dict.get("data_objetivo"), date):
-                    meta_dict["data_objetivo"] = meta_dict["data_objetivo"].isoformat()
-                
-                metas[i].update(meta_dict)
-                servico_dados.save_data(data)
-                return metas[i]
-        
-        raise HTTPException(status_code=404, detail="Meta não encontrada")
+        meta_dict = meta.dict(exclude_unset=True)
+        
+        # Converter dates para string ISO
+        if isinstance(meta_dict.get("data_inicio"), date):
+            meta_dict["data_inicio"] = meta_dict["data_inicio"].isoformat()
+        if isinstance(meta_dict.get("data_objetivo"), date):
+            meta_dict["data_objetivo"] = meta_dict["data_objetivo"].isoformat()
+        
+        meta_atualizada = await servico_dados_async.update_meta(meta_id, meta_dict)
+        
+        if not meta_atualizada:
+            raise HTTPException(status_code=404, detail="Meta não encontrada")
+        
+        return meta_atualizada
+    except ConflitoVersao as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -251,16 +298,12 @@ async def atualizar_meta(meta_id: str, meta: MetaUpdate):
 async def deletar_meta(meta_id: str):
     """Remove uma meta"""
     try:
-        data = servico_dados.load_data()
-        metas = data.get("metas", [])
+        sucesso = await servico_dados_async.delete_meta(meta_id)
         
-        for i, m in enumerate(metas):
-            if m.get("id") == meta_id:
-                del metas[i]
-                servico_dados.save_data(data)
-                return {"message": "Meta removida com sucesso"}
+        if not sucesso:
+            raise HTTPException(status_code=404, detail="Meta não encontrada")
         
-        raise HTTPException(status_code=404, detail="Meta não encontrada")
+        return {"message": "Meta removida com sucesso"}
     except HTTPException:
         raise
     except Exception as e:
@@ -273,62 +316,29 @@ async def contribuir_meta(meta_id: str, valor: float):
         if valor <= 0:
             raise HTTPException(status_code=400, detail="Valor deve ser positivo")
         
-        data = servico_dados.load_data()
-        metas = data.get("metas", [])
-        
-        for i, m in enumerate(metas):
-            if m.get("id") == meta_id:
-                valor_atual = float(m.get("valor_atual", 0))
-                metas[i]["valor_atual"] = valor_atual + valor
-                servico_dados.save_data(data)
-                
-                # Verificar se a meta foi atingida
-                valor_objetivo = float(m.get("valor_objetivo", 0))
-                if metas[i]["valor_atual"] >= valor_objetivo:
-                    return {
-                        "message": "Parabéns! Meta atingida!",
-                        "meta_atingida": True,
-                        "valor_atual": metas[i]["valor_atual"],
-                        "valor_objetivo": valor_objetivo
-                    }
-                
-                return {
-                    "message": "Contribuição adicionada com sucesso!",
-                    "meta_atingida": False,
-                    "valor_atual": metas[i]["valor_atual"],
-                    "valor_objetivo": valor_objetivo,
-                    "percentual_atingido": round((metas[i]["valor_atual"] / valor_objetivo * 100), 2)
-                }
-        
-        raise HTTPException(status_code=404, detail="Meta não encontrada")
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
-
-@router.get("/metas/resumo")
-async def resumo_metas():
-    """Gera resumo das metas"""
-    try:
-        data = servico_dados.load_data()
-        metas = data.get("metas", [])
-        metas_ativas = [m for m in metas if m.get("ativa", True)]
+        meta = await servico_dados_async.contribuir_meta(meta_id, valor)
         
-        total_metas = len(metas_ativas)
-        metas_atingidas = len([m for m in metas_ativas if float(m.get("valor_atual", 0)) >= float(m.get("valor_objetivo", 0))])
+        if not meta:
+            raise HTTPException(status_code=404, detail="Meta não encontrada")
         
-        valor_total_objetivo = sum(float(m.get("valor_objetivo", 0)) for m in metas_ativas)
-        valor_total_atual = sum(float(m.get("valor_atual", 0)) for m in metas_ativas)
-        
-        percentual_geral = (valor_total_atual / valor_total_objetivo * 100) if valor_total_objetivo > 0 else 0
+        # Verificar se a meta foi atingida
+        valor_objetivo = float(meta.get("valor_objetivo", 0))
+        if meta["valor_atual"] >= valor_objetivo:
+            return {
+                "message": "Parabéns! Meta atingida!",
+                "meta_atingida": True,
+                "valor_atual": meta["valor_atual"],
+                "valor_objetivo": valor_objetivo
+            }
         
         return {
-            "total_metas": total_metas,
-            "metas_atingidas": metas_atingidas,
-            "metas_pendentes": total_metas - metas_atingidas,
-            "valor_total_objetivo": round(valor_total_objetivo, 2),
-            "valor_total_atual": round(valor_total_atual, 2),
-            "percentual_geral": round(percentual_geral, 2)
+            "message": "Contribuição adicionada com sucesso!",
+            "meta_atingida": False,
+            "valor_atual": meta["valor_atual"],
+            "valor_objetivo": valor_objetivo,
+            "percentual_atingido": round((meta["valor_atual"] / valor_objetivo * 100), 2)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
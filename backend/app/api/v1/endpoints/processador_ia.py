@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query, Request
+from typing import Dict, Any, Optional
 import uuid
 from datetime import datetime, date
+from ....services.extracao_pdf import FilaExtracaoCheia
 from ....services.processamento_arquivos import processamento_arquivos
-from ....services.servico_dados import servico_dados
+from ....services.servico_dados_assincrono import servico_dados_async
+from ....services.unidade_trabalho import UnidadeTrabalho
+from ..condicional import versionado
+from ..ndjson import aceita_ndjson, resposta_ndjson
 from ....core.config import settings
 import logging
 
@@ -42,6 +46,10 @@ async def processar_contracheque(arquivo: UploadFile = File(...)):
             "dados_extraidos": dados_extraidos
         }
         
+    except FilaExtracaoCheia as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -54,6 +62,8 @@ async def processar_contracheque_detalhado(dados: Dict[str, Any], arquivo_nome:
     try:
         logger.info("Iniciando processamento detalhado do contracheque...")
         
+        # Rubricas e histórico são gravados juntos, numa única gravação
+        unidade = UnidadeTrabalho()
         transacoes_criadas = []
         
         # Processar créditos (receitas)
@@ -80,7 +90,7 @@ async def processar_contracheque_detalhado(dados: Dict[str, Any], arquivo_nome:
                 "created_at": datetime.now().isoformat()
             }
             
-            servico_dados.create_receita(receita_dict)
+            unidade.inserir("receitas", receita_dict)
             transacoes_criadas.append({
                 "tipo": "receita",
                 "id": receita_dict["id"],
@@ -114,7 +124,7 @@ async def processar_contracheque_detalhado(dados: Dict[str, Any], arquivo_nome:
                 "created_at": datetime.now().isoformat()
             }
             
-            servico_dados.create_gasto(gasto_dict)
+            unidade.inserir("gastos", gasto_dict)
             transacoes_criadas.append({
                 "tipo": "gasto",
                 "id": gasto_dict["id"],
@@ -141,7 +151,8 @@ async def processar_contracheque_detalhado(dados: Dict[str, Any], arquivo_nome:
             "created_at": datetime.now().isoformat()
         }
         
-        servico_dados.save_contracheque_processado(contracheque_historico)
+        unidade.inserir("contracheques_processados", contracheque_historico)
+        await servico_dados_async.confirmar(unidade)
         
         return {
             "message": "Contracheque processado com sucesso!",
@@ -187,6 +198,10 @@ async def processar_extrato_bancario(arquivo: UploadFile = File(...)):
             "dados_extraidos": dados_extraidos
         }
         
+    except FilaExtracaoCheia as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -223,36 +238,76 @@ async def processar_extrato_cartao(arquivo: UploadFile = File(...)):
             "dados_extraidos": dados_extraidos
         }
         
+    except FilaExtracaoCheia as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Erro no processamento do extrato de cartão: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/contracheques/historico")
-async def listar_contracheques():
+@router.get("/contracheques/historico", dependencies=[versionado("contracheques_processados")])
+async def listar_contracheques(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGINACAO_LIMITE_MAXIMO, description="Tamanho da página (ativa a paginação por cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior")
+):
     """Lista histórico de contracheques processados"""
     try:
-        data = servico_dados.load_data()
+        if aceita_ndjson(request):
+            return resposta_ndjson(servico_dados_async.servico.iterar("contracheques_processados"))
+        
+        if limit is not None or cursor is not None:
+            return await servico_dados_async.paginar("contracheques_processados", limit or settings.PAGINACAO_LIMITE_PADRAO, cursor)
+        
+        data = await servico_dados_async.load_data()
         return data.get("contracheques_processados", [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/extratos-bancarios/historico")
-async def listar_extratos_bancarios():
+@router.get("/extratos-bancarios/historico", dependencies=[versionado("extratos_bancarios_processados")])
+async def listar_extratos_bancarios(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGINACAO_LIMITE_MAXIMO, description="Tamanho da página (ativa a paginação por cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior")
+):
     """Lista histórico de extratos bancários processados"""
     try:
-        data = servico_dados.load_data()
+        if aceita_ndjson(request):
+            return resposta_ndjson(servico_dados_async.servico.iterar("extratos_bancarios_processados"))
+        
+        if limit is not None or cursor is not None:
+            return await servico_dados_async.paginar("extratos_bancarios_processados", limit or settings.PAGINACAO_LIMITE_PADRAO, cursor)
+        
+        data = await servico_dados_async.load_data()
         return data.get("extratos_bancarios_processados", [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/extratos-cartao/historico")
-async def listar_extratos_cartao():
+@router.get("/extratos-cartao/historico", dependencies=[versionado("extratos_cartao_processados")])
+async def listar_extratos_cartao(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGINACAO_LIMITE_MAXIMO, description="Tamanho da página (ativa a paginação por cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior")
+):
     """Lista histórico de extratos de cartão processados"""
     try:
-        data = servico_dados.load_data()
+        if aceita_ndjson(request):
+            return resposta_ndjson(servico_dados_async.servico.iterar("extratos_cartao_processados"))
+        
+        if limit is not None or cursor is not None:
+            return await servico_dados_async.paginar("extratos_cartao_processados", limit or settings.PAGINACAO_LIMITE_PADRAO, cursor)
+        
+        data = await servico_dados_async.load_data()
         return data.get("extratos_cartao_processados", [])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
@@ -1,26 +1,45 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
-from datetime import date
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Any, Dict, List, Optional, Union
+from datetime import date, datetime
+from pydantic import BaseModel
+from ....core.config import settings
 from ....models.transacao import (
-    Gasto, GastoCreate, GastoUpdate,
-    Receita, ReceitaCreate, ReceitaUpdate,
+    Gasto, GastoCreate, GastoUpdate, GastoUpdateLote,
+    Receita, ReceitaCreate, ReceitaUpdate, ReceitaUpdateLote,
     Categoria
 )
-from ....services.servico_dados import servico_dados
+from ....models.lote import RemocaoLote, ResultadoLote
+from ....models.paginacao import Pagina
+from ....services.agregacao import PERIODOS
+from ....services.base_dados import ConflitoVersao, RegistroInexistente
+from ....services.servico_dados_assincrono import servico_dados_async
+from ....services.unidade_trabalho import UnidadeTrabalho
+from ..cache_respostas import em_cache
+from ..condicional import versionado
+from ..ndjson import aceita_ndjson, resposta_ndjson
+from ..projecao import campos_projecao, recortar, resposta_projetada
 import uuid
 
 router = APIRouter()
 
 # === ENDPOINTS DE GASTOS ===
 
-@router.get("/gastos", response_model=List[Gasto])
+@router.get("/gastos", response_model=Union[List[Gasto], Pagina[Gasto]], dependencies=[versionado("gastos")])
 async def listar_gastos(
+    request: Request,
     categoria: Optional[str] = Query(None, description="Filtrar por categoria"),
     data_inicio: Optional[date] = Query(None, description="Data de início do período"),
     data_fim: Optional[date] = Query(None, description="Data de fim do período"),
-    forma_pagamento: Optional[str] = Query(None, description="Filtrar por forma de pagamento")
+    forma_pagamento: Optional[str] = Query(None, description="Filtrar por forma de pagamento"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGINACAO_LIMITE_MAXIMO, description="Tamanho da página (ativa a paginação por cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
 ):
-    """Lista todos os gastos com filtros opcionais"""
+    """Lista todos os gastos com filtros opcionais
+    
+    Com Accept: application/x-ndjson os gastos são enviados em streaming,
+    um por linha, em ordem decrescente de data.
+    """
     try:
         filtros = {}
         if categoria:
@@ -32,8 +51,22 @@ async def listar_gastos(
         if forma_pagamento:
             filtros["forma_pagamento"] = forma_pagamento
         
-        gastos = servico_dados.get_gastos(filtros)
+        campos = campos_projecao(Gasto, fields)
+        if aceita_ndjson(request):
+            return resposta_ndjson(recortar(servico_dados_async.servico.iterar("gastos", filtros), campos))
+        
+        if limit is not None or cursor is not None:
+            gastos = await servico_dados_async.paginar("gastos", limit or settings.PAGINACAO_LIMITE_PADRAO, cursor, filtros)
+        else:
+            gastos = await servico_dados_async.get_gastos(filtros)
+        
+        if campos:
+            return resposta_projetada(Gasto, campos, gastos)
         return gastos
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
@@ -50,21 +83,64 @@ async def criar_gasto(gasto: GastoCreate):
         if isinstance(gasto_dict.get("data_ultima_parcela"), date):
             gasto_dict["data_ultima_parcela"] = gasto_dict["data_ultima_parcela"].isoformat()
         
-        gasto_criado = servico_dados.create_gasto(gasto_dict)
+        gasto_criado = await servico_dados_async.create_gasto(gasto_dict)
         return gasto_criado
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/gastos/{gasto_id}", response_model=Gasto)
-async def obter_gasto(gasto_id: str):
+# Lotes: declarados antes de /gastos/{gasto_id} para "batch" não ser lido como id
+
+@router.post("/gastos/batch", response_model=ResultadoLote[Gasto])
+async def criar_gastos_lote(itens: List[GastoCreate]):
+    """Cria vários gastos numa única gravação (todos ou nenhum)"""
+    try:
+        return await _criar_em_lote("gastos", itens)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.patch("/gastos/batch", response_model=ResultadoLote[Gasto])
+async def atualizar_gastos_lote(itens: List[GastoUpdateLote]):
+    """Atualiza vários gastos numa única gravação (todos ou nenhum)"""
+    try:
+        return await _atualizar_em_lote("gastos", itens)
+    except RegistroInexistente as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ConflitoVersao as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.delete("/gastos/batch", response_model=ResultadoLote[Gasto])
+async def remover_gastos_lote(lote: RemocaoLote):
+    """Remove vários gastos numa única gravação (todos ou nenhum)"""
+    try:
+        return await _remover_em_lote("gastos", lote.ids)
+    except RegistroInexistente as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.get("/gastos/{gasto_id}", response_model=Gasto, dependencies=[versionado("gastos")])
+async def obter_gasto(
+    gasto_id: str,
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
+):
     """Obtém um gasto específico por ID"""
     try:
-        gastos = servico_dados.get_gastos()
-        gasto = next((g for g in gastos if g["id"] == gasto_id), None)
+        campos = campos_projecao(Gasto, fields)
+        gasto = await servico_dados_async.get_gasto(gasto_id)
         
         if not gasto:
             raise HTTPException(status_code=404, detail="Gasto não encontrado")
         
+        if campos:
+            return resposta_projetada(Gasto, campos, gasto)
         return gasto
     except HTTPException:
         raise
@@ -83,12 +159,14 @@ async def atualizar_gasto(gasto_id: str, gasto: GastoUpdate):
         if isinstance(gasto_dict.get("data_ultima_parcela"), date):
             gasto_dict["data_ultima_parcela"] = gasto_dict["data_ultima_parcela"].isoformat()
         
-        gasto_atualizado = servico_dados.update_gasto(gasto_id, gasto_dict)
+        gasto_atualizado = await servico_dados_async.update_gasto(gasto_id, gasto_dict)
         
         if not gasto_atualizado:
             raise HTTPException(status_code=404, detail="Gasto não encontrado")
         
         return gasto_atualizado
+    except ConflitoVersao as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -98,7 +176,7 @@ async def atualizar_gasto(gasto_id: str, gasto: GastoUpdate):
 async def deletar_gasto(gasto_id: str):
     """Remove um gasto"""
     try:
-        sucesso = servico_dados.delete_gasto(gasto_id)
+        sucesso = await servico_dados_async.delete_gasto(gasto_id)
         
         if not sucesso:
             raise HTTPException(status_code=404, detail="Gasto não encontrado")
@@ -111,13 +189,21 @@ async def deletar_gasto(gasto_id: str):
 
 # === ENDPOINTS DE RECEITAS ===
 
-@router.get("/receitas", response_model=List[Receita])
+@router.get("/receitas", response_model=Union[List[Receita], Pagina[Receita]], dependencies=[versionado("receitas")])
 async def listar_receitas(
+    request: Request,
     categoria: Optional[str] = Query(None, description="Filtrar por categoria"),
     data_inicio: Optional[date] = Query(None, description="Data de início do período"),
-    data_fim: Optional[date] = Query(None, description="Data de fim do período")
+    data_fim: Optional[date] = Query(None, description="Data de fim do período"),
+    limit: Optional[int] = Query(None, ge=1, le=settings.PAGINACAO_LIMITE_MAXIMO, description="Tamanho da página (ativa a paginação por cursor)"),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
 ):
-    """Lista todas as receitas com filtros opcionais"""
+    """Lista todas as receitas com filtros opcionais
+    
+    Com Accept: application/x-ndjson as receitas são enviadas em streaming,
+    uma por linha, em ordem decrescente de data.
+    """
     try:
         filtros = {}
         if categoria:
@@ -127,8 +213,22 @@ async def listar_receitas(
         if data_fim:
             filtros["data_fim"] = data_fim
         
-        receitas = servico_dados.get_receitas(filtros)
+        campos = campos_projecao(Receita, fields)
+        if aceita_ndjson(request):
+            return resposta_ndjson(recortar(servico_dados_async.servico.iterar("receitas", filtros), campos))
+        
+        if limit is not None or cursor is not None:
+            receitas = await servico_dados_async.paginar("receitas", limit or settings.PAGINACAO_LIMITE_PADRAO, cursor, filtros)
+        else:
+            receitas = await servico_dados_async.get_receitas(filtros)
+        
+        if campos:
+            return resposta_projetada(Receita, campos, receitas)
         return receitas
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
@@ -143,21 +243,62 @@ async def criar_receita(receita: ReceitaCreate):
         if isinstance(receita_dict.get("data"), date):
             receita_dict["data"] = receita_dict["data"].isoformat()
         
-        receita_criada = servico_dados.create_receita(receita_dict)
+        receita_criada = await servico_dados_async.create_receita(receita_dict)
         return receita_criada
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
-@router.get("/receitas/{receita_id}", response_model=Receita)
-async def obter_receita(receita_id: str):
+@router.post("/receitas/batch", response_model=ResultadoLote[Receita])
+async def criar_receitas_lote(itens: List[ReceitaCreate]):
+    """Cria várias receitas numa única gravação (todas ou nenhuma)"""
+    try:
+        return await _criar_em_lote("receitas", itens)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.patch("/receitas/batch", response_model=ResultadoLote[Receita])
+async def atualizar_receitas_lote(itens: List[ReceitaUpdateLote]):
+    """Atualiza várias receitas numa única gravação (todas ou nenhuma)"""
+    try:
+        return await _atualizar_em_lote("receitas", itens)
+    except RegistroInexistente as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ConflitoVersao as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.delete("/receitas/batch", response_model=ResultadoLote[Receita])
+async def remover_receitas_lote(lote: RemocaoLote):
+    """Remove várias receitas numa única gravação (todas ou nenhuma)"""
+    try:
+        return await _remover_em_lote("receitas", lote.ids)
+    except RegistroInexistente as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.get("/receitas/{receita_id}", response_model=Receita, dependencies=[versionado("receitas")])
+async def obter_receita(
+    receita_id: str,
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,data,valor)")
+):
     """Obtém uma receita específica por ID"""
     try:
-        receitas = servico_dados.get_receitas()
-        receita = next((r for r in receitas if r["id"] == receita_id), None)
+        campos = campos_projecao(Receita, fields)
+        receita = await servico_dados_async.get_receita(receita_id)
         
         if not receita:
             raise HTTPException(status_code=404, detail="Receita não encontrada")
         
+        if campos:
+            return resposta_projetada(Receita, campos, receita)
         return receita
     except HTTPException:
         raise
@@ -174,12 +315,14 @@ async def atualizar_receita(receita_id: str, receita: ReceitaUpdate):
         if isinstance(receita_dict.get("data"), date):
             receita_dict["data"] = receita_dict["data"].isoformat()
         
-        receita_atualizada = servico_dados.update_receita(receita_id, receita_dict)
+        receita_atualizada = await servico_dados_async.update_receita(receita_id, receita_dict)
         
         if not receita_atualizada:
             raise HTTPException(status_code=404, detail="Receita não encontrada")
         
         return receita_atualizada
+    except ConflitoVersao as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
@@ -189,7 +332,7 @@ async def atualizar_receita(receita_id: str, receita: ReceitaUpdate):
 async def deletar_receita(receita_id: str):
     """Remove uma receita"""
     try:
-        sucesso = servico_dados.delete_receita(receita_id)
+        sucesso = await servico_dados_async.delete_receita(receita_id)
         
         if not sucesso:
             raise HTTPException(status_code=404, detail="Receita não encontrada")
@@ -202,62 +345,156 @@ async def deletar_receita(receita_id: str):
 
 # === ENDPOINTS DE CATEGORIAS ===
 
-@router.get("/categorias")
+@router.get("/categorias", dependencies=[versionado("categorias")])
 async def listar_categorias():
     """Lista todas as categorias de gastos e receitas"""
     try:
-        categorias = servico_dados.get_categorias()
+        categorias = await servico_dados_async.get_categorias()
         return categorias
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
 
 # === ENDPOINTS DE RELATÓRIOS ===
 
-@router.get("/relatorios/resumo-mensal")
+@router.get("/relatorios/resumo-mensal", dependencies=[versionado("gastos", "receitas")])
+@em_cache("gastos", "receitas")
 async def resumo_mensal(
     ano: int = Query(..., description="Ano do relatório"),
-    mes: int = Query(..., description="Mês do relatório (1-12)")
+    mes: int = Query(..., ge=1, le=12, description="Mês do relatório (1-12)")
 ):
     """Gera resumo mensal de gastos e receitas"""
     try:
-        # Filtrar transações do mês
-        data_inicio = f"{ano}-{mes:02d}-01"
-        if mes == 12:
-            data_fim = f"{ano + 1}-01-01"
-        else:
-            data_fim = f"{ano}-{mes + 1:02d}-01"
-        
-        gastos = servico_dados.get_gastos({"data_inicio": data_inicio, "data_fim": data_fim})
-        receitas = servico_dados.get_receitas({"data_inicio": data_inicio, "data_fim": data_fim})
-        
-        # Calcular totais
-        total_gastos = sum(float(g.get("valor", 0)) for g in gastos)
-        total_receitas = sum(float(r.get("valor", 0)) for r in receitas)
-        saldo = total_receitas - total_gastos
-        
-        # Agrupar por categoria
-        gastos_por_categoria = {}
-        for gasto in gastos:
-            categoria = gasto.get("categoria", "Outros")
-            if categoria not in gastos_por_categoria:
-                gastos_por_categoria[categoria] = 0
-            gastos_por_categoria[categoria] += float(gasto.get("valor", 0))
+        # Consulta aos resumos mensais mantidos a cada inclusão/alteração/remoção
+        resumo = await servico_dados_async.resumo_mensal(ano, mes)
+        return _montar_resumo_mensal(ano, mes, resumo["gastos"], resumo["receitas"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@router.get("/relatorios/periodo", dependencies=[versionado("gastos", "receitas")])
+async def relatorio_periodo(
+    data_inicio: date = Query(..., description="Data inicial (inclusiva)"),
+    data_fim: date = Query(..., description="Data final (inclusiva)"),
+    agrupamento: str = Query("mes", description="Tamanho do período: dia, semana, mes, trimestre ou ano")
+):
+    """Gera relatório de gastos e receitas por período, com saldo acumulado"""
+    try:
+        if agrupamento not in PERIODOS:
+            raise HTTPException(status_code=400, detail=f"Agrupamento inválido. Use: {', '.join(PERIODOS)}")
+        if data_fim < data_inicio:
+            raise HTTPException(status_code=400, detail="data_fim deve ser posterior a data_inicio")
         
-        receitas_por_categoria = {}
-        for receita in receitas:
-            categoria = receita.get("categoria", "Outros")
-            if categoria not in receitas_por_categoria:
-                receitas_por_categoria[categoria] = 0
-            receitas_por_categoria[categoria] += float(receita.get("valor", 0))
+        relatorio = await servico_dados_async.relatorio_periodo(data_inicio, data_fim, agrupamento)
         
         return {
-            "periodo": f"{mes:02d}/{ano}",
-            "total_gastos": round(total_gastos, 2),
-            "total_receitas": round(total_receitas, 2),
-            "saldo": round(saldo, 2),
-            "gastos_por_categoria": gastos_por_categoria,
-            "receitas_por_categoria": receitas_por_categoria,
-            "quantidade_transacoes": len(gastos) + len(receitas)
+            "data_inicio": data_inicio.isoformat(),
+            "data_fim": data_fim.isoformat(),
+            "agrupamento": agrupamento,
+            **relatorio
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+# === DASHBOARD ===
+
+@router.get("/dashboard", dependencies=[versionado("gastos", "receitas", "contas")])
+async def dashboard(
+    ano: Optional[int] = Query(None, description="Ano do resumo (padrão: atual)"),
+    mes: Optional[int] = Query(None, ge=1, le=12, description="Mês do resumo (padrão: atual)"),
+    limite: int = Query(5, ge=1, le=50, description="Quantidade de gastos e de receitas recentes")
+):
+    """Dados do dashboard (resumo do mês, transações recentes e saldos) em uma única chamada"""
+    try:
+        hoje = date.today()
+        return await _dashboard(ano or hoje.year, mes or hoje.month, limite)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro interno: {str(e)}")
+
+@em_cache("gastos", "receitas", "contas")
+async def _dashboard(ano: int, mes: int, limite: int) -> Dict[str, Any]:
+    """Dashboard de um mês já resolvido (a chave do cache não depende da data de hoje)"""
+    dados = await servico_dados_async.dashboard(ano, mes, limite)
+    
+    return {
+        "resumo": _montar_resumo_mensal(ano, mes, dados["gastos"], dados["receitas"]),
+        "gastos_recentes": dados["gastos_recentes"],
+        "receitas_recentes": dados["receitas_recentes"],
+        "contas": dados["contas"]
+    }
+
+def _montar_resumo_mensal(ano: int, mes: int, gastos: Dict[str, Any], receitas: Dict[str, Any]) -> Dict[str, Any]:
+    """Resposta do resumo mensal a partir dos totais de gastos e receitas do mês"""
+    total_gastos = gastos["total"]
+    total_receitas = receitas["total"]
+    saldo = total_receitas - total_gastos
+    
+    return {
+        "periodo": f"{mes:02d}/{ano}",
+        "total_gastos": round(total_gastos, 2),
+        "total_receitas": round(total_receitas, 2),
+        "saldo": round(saldo, 2),
+        "gastos_por_categoria": gastos["por_categoria"],
+        "receitas_por_categoria": receitas["por_categoria"],
+        "quantidade_transacoes": gastos["quantidade"] + receitas["quantidade"]
+    }
+
+# === OPERAÇÕES EM LOTE ===
+
+async def _criar_em_lote(colecao: str, itens: List[BaseModel]) -> Dict[str, Any]:
+    _conferir_tamanho_lote(itens)
+    unidade = UnidadeTrabalho()
+    criado_em = datetime.now().isoformat()
+    for item in itens:
+        dados = _datas_iso(item.dict())
+        dados["id"] = str(uuid.uuid4())
+        dados["created_at"] = criado_em
+        unidade.inserir(colecao, dados)
+    
+    registros = await servico_dados_async.confirmar(unidade)
+    return _resultado_lote("criado", [registro["id"] for registro in registros], registros)
+
+async def _atualizar_em_lote(colecao: str, itens: List[BaseModel]) -> Dict[str, Any]:
+    _conferir_tamanho_lote(itens)
+    unidade = UnidadeTrabalho()
+    ids = []
+    for item in itens:
+        dados = _datas_iso(item.dict(exclude_unset=True))
+        ids.append(dados.pop("id"))
+        unidade.atualizar(colecao, ids[-1], dados)
+    
+    registros = await servico_dados_async.confirmar(unidade)
+    return _resultado_lote("atualizado", ids, registros)
+
+async def _remover_em_lote(colecao: str, ids: List[str]) -> Dict[str, Any]:
+    _conferir_tamanho_lote(ids)
+    unidade = UnidadeTrabalho()
+    for item_id in ids:
+        unidade.remover(colecao, item_id)
+    
+    await servico_dados_async.confirmar(unidade)
+    return _resultado_lote("removido", ids, [None] * len(ids))
+
+def _conferir_tamanho_lote(itens: List[Any]) -> None:
+    if len(itens) > settings.LOTE_MAXIMO_ITENS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lote muito grande ({len(itens)} itens). Máximo: {settings.LOTE_MAXIMO_ITENS}"
+        )
+
+def _datas_iso(dados: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte os campos date para string ISO"""
+    for campo in ("data", "data_ultima_parcela"):
+        if isinstance(dados.get(campo), date):
+            dados[campo] = dados[campo].isoformat()
+    return dados
+
+def _resultado_lote(status: str, ids: List[str], registros: List[Optional[Dict]]) -> Dict[str, Any]:
+    """Resultado por item, na ordem em que os itens foram enviados"""
+    return {
+        "total": len(ids),
+        "itens": [
+            {"indice": indice, "id": item_id, "status": status, "registro": registro}
+            for indice, (item_id, registro) in enumerate(zip(ids, registros))
+        ]
+    }
@@ -0,0 +1,24 @@
+import json
+from typing import Any, AsyncIterator, Iterable
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from ...services.servico_dados_assincrono import servico_dados_async
+
+MIDIA_NDJSON = "application/x-ndjson"
+
+def aceita_ndjson(request: Request) -> bool:
+    """O cliente pediu a resposta em streaming (Accept: application/x-ndjson)"""
+    return MIDIA_NDJSON in request.headers.get("accept", "")
+
+def resposta_ndjson(registros: Iterable[Any]) -> StreamingResponse:
+    """Resposta com um objeto JSON por linha, produzida enquanto é lida
+    
+    Os registros são serializados como estão no armazenamento (sem passar
+    pelos modelos Pydantic), lote a lote no pool do serviço de dados.
+    """
+    return StreamingResponse(_blocos(registros), media_type=MIDIA_NDJSON)
+
+async def _blocos(registros: Iterable[Any]) -> AsyncIterator[str]:
+    linhas = (json.dumps(registro, ensure_ascii=False, default=str) + "\n" for registro in registros)
+    async for lote in servico_dados_async.em_lotes(linhas):
+        yield "".join(lote)
@@ -0,0 +1,51 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+from fastapi import HTTPException
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter, create_model
+from ...models.paginacao import Pagina
+
+def campos_projecao(modelo: Type[BaseModel], fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Campos pedidos em fields= (separados por vírgula), conferidos com o modelo
+    
+    Retorna None quando a resposta deve ser completa.
+    """
+    if not fields:
+        return None
+    campos = tuple(dict.fromkeys(campo.strip() for campo in fields.split(",") if campo.strip()))
+    desconhecidos = [campo for campo in campos if campo not in modelo.model_fields]
+    if desconhecidos:
+        raise HTTPException(status_code=400, detail=f"Campos desconhecidos: {', '.join(desconhecidos)}")
+    return campos or None
+
+def resposta_projetada(modelo: Type[BaseModel], campos: Tuple[str, ...], dados: Any) -> Response:
+    """Serializa só os campos pedidos de um registro, lista ou página
+    
+    A validação usa um modelo parcial com os mesmos tipos e padrões do
+    modelo completo, então os campos omitidos não são validados nem
+    serializados.
+    """
+    if isinstance(dados, list):
+        forma = "lista"
+    elif isinstance(dados, dict) and set(dados) == {"items", "next_cursor"}:
+        forma = "pagina"
+    else:
+        forma = "item"
+    adaptador = _adaptador(modelo, campos, forma)
+    return Response(adaptador.dump_json(adaptador.validate_python(dados)), media_type="application/json")
+
+def recortar(registros: Iterable[Dict[str, Any]], campos: Optional[Tuple[str, ...]]) -> Iterator[Dict[str, Any]]:
+    """Registros só com os campos pedidos (para respostas em streaming)"""
+    if not campos:
+        return iter(registros)
+    return ({campo: registro.get(campo) for campo in campos} for registro in registros)
+
+@lru_cache(maxsize=128)
+def _adaptador(modelo: Type[BaseModel], campos: Tuple[str, ...], forma: str) -> TypeAdapter:
+    definicoes = {campo: (modelo.model_fields[campo].annotation, modelo.model_fields[campo]) for campo in campos}
+    parcial = create_model(f"{modelo.__name__}Parcial", **definicoes)
+    if forma == "lista":
+        return TypeAdapter(List[parcial])
+    if forma == "pagina":
+        return TypeAdapter(Pagina[parcial])
+    return TypeAdapter(parcial)
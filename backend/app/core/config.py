@@ -31,6 +31,54 @@ class Settings:
     # Configurações de dados
     DATA_FILE_PATH: str = os.path.join(os.path.dirname(__file__), "..", "data", "schemas.json")
     
+    # Backend de armazenamento: "json" (schemas.json) ou "sqlite"
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "json").lower()
+    SQLITE_DB_PATH: str = os.getenv(
+        "SQLITE_DB_PATH",
+        os.path.join(os.path.dirname(__file__), "..", "data", "financeiro.db")
+    )
+    
+    # Armazenamento fragmentado: um arquivo JSON por coleção (gastos.json,
+    # receitas.json...) em DATA_SHARDS_DIR (padrão: data/colecoes)
+    DATA_SHARDED_ENABLED: bool = os.getenv("DATA_SHARDED_ENABLED", "false").lower() == "true"
+    DATA_SHARDS_DIR: Optional[str] = os.getenv("DATA_SHARDS_DIR")
+    
+    # Modo diário (write-ahead log): mutações são anexadas a um log em vez de
+    # reescrever o arquivo inteiro; o log é compactado periodicamente no snapshot
+    DATA_JOURNAL_ENABLED: bool = os.getenv("DATA_JOURNAL_ENABLED", "false").lower() == "true"
+    DATA_JOURNAL_FSYNC_BATCH: int = int(os.getenv("DATA_JOURNAL_FSYNC_BATCH", "32"))
+    DATA_JOURNAL_FSYNC_INTERVAL_MS: int = int(os.getenv("DATA_JOURNAL_FSYNC_INTERVAL_MS", "50"))
+    DATA_JOURNAL_COMPACT_RECORDS: int = int(os.getenv("DATA_JOURNAL_COMPACT_RECORDS", "5000"))
+    
+    # Commit em grupo: mutações concorrentes que chegam dentro desta janela
+    # são gravadas em disco numa única escrita atômica
+    DATA_GROUP_COMMIT_MS: int = int(os.getenv("DATA_GROUP_COMMIT_MS", "5"))
+    
+    # Threads do pool que executa as operações de armazenamento fora do event loop
+    DATA_EXECUTOR_WORKERS: int = int(os.getenv("DATA_EXECUTOR_WORKERS", "4"))
+    
+    # Paginação por cursor das listagens (tamanho padrão e máximo de uma página)
+    PAGINACAO_LIMITE_PADRAO: int = int(os.getenv("PAGINACAO_LIMITE_PADRAO", "50"))
+    PAGINACAO_LIMITE_MAXIMO: int = int(os.getenv("PAGINACAO_LIMITE_MAXIMO", "500"))
+    
+    # Máximo de itens por requisição dos endpoints em lote (/gastos/batch, /receitas/batch)
+    LOTE_MAXIMO_ITENS: int = int(os.getenv("LOTE_MAXIMO_ITENS", "5000"))
+    
+    # Respostas em streaming (NDJSON): registros lidos do armazenamento por lote
+    STREAMING_LOTE: int = int(os.getenv("STREAMING_LOTE", "500"))
+    
+    # Cache das respostas dos relatórios (invalidado pela versão das coleções lidas)
+    CACHE_RESPOSTAS_ENABLED: bool = os.getenv("CACHE_RESPOSTAS_ENABLED", "true").lower() == "true"
+    CACHE_RESPOSTAS_MAX_ENTRADAS: int = int(os.getenv("CACHE_RESPOSTAS_MAX_ENTRADAS", "256"))
+    CACHE_RESPOSTAS_MAX_BYTES: int = int(os.getenv("CACHE_RESPOSTAS_MAX_BYTES", str(8 * 1024 * 1024)))
+    
+    # Extração de texto de PDFs fora do event loop: pool de processos ("process") ou de threads ("thread")
+    PDF_EXECUTOR_MODO: str = os.getenv("PDF_EXECUTOR_MODO", "process")
+    PDF_EXECUTOR_WORKERS: int = int(os.getenv("PDF_EXECUTOR_WORKERS", "2"))
+    # Tempo máximo de uma extração (segundos) e extrações aceitas ao mesmo tempo (executando + na fila)
+    PDF_EXTRACAO_TIMEOUT: float = float(os.getenv("PDF_EXTRACAO_TIMEOUT", "60"))
+    PDF_EXTRACAO_FILA_MAXIMA: int = int(os.getenv("PDF_EXTRACAO_FILA_MAXIMA", "8"))
+    
     # Configurações de upload
     UPLOAD_DIR: str = os.path.join(os.path.dirname(__file__), "..", "..", "uploads")
 
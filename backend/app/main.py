@@ -1,4 +1,4 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -7,6 +7,7 @@ import sys
 import os
 from .core.config import settings
 from .api.v1.api import api_router
+from .api.v1.condicional import adicionar_validadores
 
 # Configurar logging
 logging.basicConfig(
@@ -33,10 +34,18 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_ORIGINS,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
+# GET condicional: ETag/Last-Modified das rotas com a dependência versionado()
+@app.middleware("http")
+async def validadores_cache(request: Request, call_next):
+    response = await call_next(request)
+    adicionar_validadores(request, response)
+    return response
+
 # Incluir roteadores da API
 app.include_router(api_router, prefix="/api/v1")
 
@@ -66,8 +75,8 @@ async def health_check():
     """Endpoint de verificação de saúde"""
     try:
         # Verificar se o arquivo de dados está acessível
-        from .services.servico_dados import servico_dados
-        data = servico_dados.load_data()
+        from .services.servico_dados_assincrono import servico_dados_async
+        data = await servico_dados_async.load_data()
         
         return {
             "status": "healthy",
@@ -122,7 +131,11 @@ async def startup_event():
     """Executado na inicialização da aplicação"""
     logger.info(f"🚀 Iniciando {settings.APP_NAME} v{settings.VERSION}")
     logger.info(f"📊 Modo debug: {settings.DEBUG}")
-    logger.info(f"📁 Arquivo de dados: {settings.DATA_FILE_PATH}")
+    logger.info(f"🗄️ Backend de armazenamento: {settings.STORAGE_BACKEND}")
+    if settings.STORAGE_BACKEND == "sqlite":
+        logger.info(f"📁 Banco de dados: {settings.SQLITE_DB_PATH}")
+    else:
+        logger.info(f"📁 Arquivo de dados: {settings.DATA_FILE_PATH}")
     
     # Verificar se o arquivo de dados existe e é acessível
     try:
@@ -138,6 +151,18 @@ async def startup_event():
 async def shutdown_event():
     """Executado no encerramento da aplicação"""
     logger.info(f"🛑 Encerrando {settings.APP_NAME}")
+    
+    # Compactar o diário de mutações (modo journal) antes de sair
+    try:
+        from .services.servico_dados_assincrono import servico_dados_async
+        servico_dados_async.encerrar()
+        servico_dados_async.servico.fechar()
+    except Exception as e:
+        logger.error(f"❌ Erro ao fechar armazenamento de dados: {str(e)}")
+    
+    # Encerrar o pool de extração de PDFs
+    from .services.extracao_pdf import extrator_pdf
+    extrator_pdf.encerrar()
 
 # Servir arquivos estáticos do frontend (deve ser o último mount)
 static_dir = os.path.join(os.path.dirname(__file__), "static")
@@ -19,6 +19,7 @@ class Conta(BaseModel):
     limite_credito: Optional[float] = None
     saldo_atual: float = 0.0
     eh_conta_salario: bool = False
+    versao: int = 1
     created_at: datetime = Field(default_factory=datetime.now)
 
 class ContaCreate(BaseModel):
@@ -38,3 +39,5 @@ class ContaUpdate(BaseModel):
     limite_credito: Optional[float] = None
     saldo_atual: Optional[float] = None
     eh_conta_salario: Optional[bool] = None
+    # Versão esperada do registro (controle de concorrência otimista)
+    versao: Optional[int] = None
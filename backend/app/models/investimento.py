@@ -31,6 +31,7 @@ class Investimento(BaseModel):
     rentabilidade_mes: Optional[float] = None
     observacoes: Optional[str] = None
     ativo: bool = True
+    versao: int = 1
     created_at: datetime = Field(default_factory=datetime.now)
 
 class InvestimentoCreate(BaseModel):
@@ -54,6 +55,8 @@ class InvestimentoUpdate(BaseModel):
     rentabilidade_mes: Optional[float] = None
     observacoes: Optional[str] = None
     ativo: Optional[bool] = None
+    # Versão esperada do registro (controle de concorrência otimista)
+    versao: Optional[int] = None
 
 class Meta(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -65,6 +68,7 @@ class Meta(BaseModel):
     categoria: Optional[str] = None
     descricao: Optional[str] = None
     ativa: bool = True
+    versao: int = 1
     created_at: datetime = Field(default_factory=datetime.now)
 
 class MetaCreate(BaseModel):
@@ -84,3 +88,5 @@ class MetaUpdate(BaseModel):
     categoria: Optional[str] = None
     descricao: Optional[str] = None
     ativa: Optional[bool] = None
+    # Versão esperada do registro (controle de concorrência otimista)
+    versao: Optional[int] = None
@@ -0,0 +1,20 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class RemocaoLote(BaseModel):
+    """Ids dos registros a remover em lote"""
+    ids: List[str]
+
+class ItemLote(BaseModel, Generic[T]):
+    """Resultado de um item de uma operação em lote, na posição em que foi enviado"""
+    indice: int
+    id: str
+    status: str  # "criado", "atualizado" ou "removido"
+    registro: Optional[T] = None
+
+class ResultadoLote(BaseModel, Generic[T]):
+    """Resultado de uma operação em lote (aplicada por inteiro ou não aplicada)"""
+    total: int
+    itens: List[ItemLote[T]]
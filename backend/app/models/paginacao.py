@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class Pagina(BaseModel, Generic[T]):
+    """Página de uma listagem paginada por cursor"""
+    items: List[T]
+    next_cursor: Optional[str] = None
@@ -26,6 +26,7 @@ class Gasto(BaseModel):
     data_ultima_parcela: Optional[date] = None
     pensao_alimenticia: bool = False
     observacoes: Optional[str] = None
+    versao: int = 1
     created_at: datetime = Field(default_factory=datetime.now)
 
 class GastoCreate(BaseModel):
@@ -53,6 +54,11 @@ class GastoUpdate(BaseModel):
     data_ultima_parcela: Optional[date] = None
     pensao_alimenticia: Optional[bool] = None
     observacoes: Optional[str] = None
+    # Versão esperada do registro (controle de concorrência otimista)
+    versao: Optional[int] = None
+
+class GastoUpdateLote(GastoUpdate):
+    id: str
 
 class Receita(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -63,6 +69,7 @@ class Receita(BaseModel):
     conta_id: Optional[str] = None
     forma_pagamento: Optional[str] = None
     observacoes: Optional[str] = None
+    versao: int = 1
     created_at: datetime = Field(default_factory=datetime.now)
 
 class ReceitaCreate(BaseModel):
@@ -82,6 +89,11 @@ class ReceitaUpdate(BaseModel):
     conta_id: Optional[str] = None
     forma_pagamento: Optional[str] = None
     observacoes: Optional[str] = None
+    # Versão esperada do registro (controle de concorrência otimista)
+    versao: Optional[int] = None
+
+class ReceitaUpdateLote(ReceitaUpdate):
+    id: str
 
 class Categoria(BaseModel):
     id: str
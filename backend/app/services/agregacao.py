@@ -0,0 +1,257 @@
+from datetime import date
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+import numpy as np
+from .colunar import TabelaColunar, Dicionario, valor_em_centavos
+from .filtros import Filtro
+
+# Agrupamentos aceitos para gastos e receitas
+AGRUPAMENTOS = ("categoria", "forma_pagamento", "conta_id", "mes")
+
+# Tamanhos de período aceitos pelos relatórios por período
+PERIODOS = ("dia", "semana", "mes", "trimestre", "ano")
+
+# Ordinal de 1970-01-01, o dia zero de datetime64
+ORDINAL_EPOCA = date(1970, 1, 1).toordinal()
+
+def agregar_tabela(
+    tabela: TabelaColunar,
+    por: Optional[str] = None,
+    filtro: Optional[Filtro] = None,
+    rotulo_ausente: Optional[str] = None
+) -> Dict[str, Any]:
+    """Soma, quantidade, mínimo e máximo dos valores de uma tabela colunar
+    
+    Com `por`, também agrupa por categoria, forma_pagamento, conta_id ou mês
+    (AAAA-MM). Registros sem o campo do agrupamento ficam sob
+    `rotulo_ausente`. Os valores são somados em centavos (int64), sem erro
+    de arredondamento, e devolvidos em reais.
+    """
+    if por is not None and por not in AGRUPAMENTOS:
+        raise ValueError(f"Agrupamento desconhecido: {por}")
+    
+    mascara = mascara_filtro(tabela, filtro)
+    valores = _coluna(tabela.centavos, np.int64)[mascara].reshape(-1, 1)
+    resultado: Dict[str, Any] = {"total": _estatisticas(*_reduzir_tudo(valores))}
+    
+    if por is None:
+        return resultado
+    
+    if por == "mes":
+        chaves = _meses(_coluna(tabela.dias, np.int64)[mascara])
+        rotulo = lambda chave: rotulo_ausente if chave < 0 else f"{1970 + chave // 12}-{chave % 12 + 1:02d}"
+    else:
+        chaves = _coluna(tabela.codigos[por], np.int32)[mascara]
+        dicionario = tabela.dicionarios[por]
+        rotulo = lambda chave: dicionario.decodificar(chave) if chave else rotulo_ausente
+    
+    grupos: Dict[Optional[str], Dict[str, Any]] = {}
+    for chave, quantidade, somas, minimos, maximos in zip(*_reduzir(chaves, valores)):
+        _acumular(grupos, rotulo(int(chave)), _estatisticas(int(quantidade), somas, minimos, maximos))
+    resultado["grupos"] = grupos
+    return resultado
+
+def agregar_periodos(
+    tabela: TabelaColunar,
+    periodo: str,
+    filtro: Optional[Filtro] = None,
+    rotulo_ausente: Optional[str] = None
+) -> Dict[int, Dict[str, Any]]:
+    """Total, quantidade e somas por categoria de cada período com movimento
+    
+    As chaves do resultado vêm de chaves_periodo(). Os totais por período e
+    por (período, categoria) saem da mesma máscara, sem uma consulta por
+    período.
+    """
+    mascara = mascara_filtro(tabela, filtro) & (_coluna(tabela.dias, np.int64) > 0)
+    chaves = chaves_periodo(_coluna(tabela.dias, np.int64)[mascara], periodo)
+    codigos = _coluna(tabela.codigos["categoria"], np.int32)[mascara].astype(np.int64)
+    valores = _coluna(tabela.centavos, np.int64)[mascara].reshape(-1, 1)
+    
+    periodos: Dict[int, Dict[str, Any]] = {}
+    for chave, quantidade, somas, _, _ in zip(*_reduzir(chaves, valores)):
+        periodos[int(chave)] = {"total": int(somas[0]) / 100, "quantidade": int(quantidade), "por_categoria": {}}
+    
+    # Chave composta (período, categoria) para agrupar os dois níveis de uma vez
+    base = len(tabela.dicionarios["categoria"].valores)
+    dicionario = tabela.dicionarios["categoria"]
+    for chave, _, somas, _, _ in zip(*_reduzir(chaves * base + codigos, valores)):
+        chave_periodo, codigo = divmod(int(chave), base)
+        rotulo = dicionario.decodificar(codigo) if codigo else rotulo_ausente
+        por_categoria = periodos[chave_periodo]["por_categoria"]
+        por_categoria[rotulo] = round(por_categoria.get(rotulo, 0) + int(somas[0]) / 100, 2)
+    return periodos
+
+def chaves_periodo(dias: np.ndarray, periodo: str) -> np.ndarray:
+    """Chave inteira do período de cada ordinal de dia (crescente no tempo)
+    
+    dia e semana usam o ordinal do dia (semana: a segunda-feira); mes,
+    trimestre e ano contam a partir de 1970.
+    """
+    if periodo == "dia":
+        return dias
+    if periodo == "semana":
+        # O ordinal 1 (0001-01-01) é uma segunda-feira
+        return dias - (dias - 1) % 7
+    meses = _meses(dias)
+    if periodo == "mes":
+        return meses
+    if periodo == "trimestre":
+        return meses // 3
+    if periodo == "ano":
+        return meses // 12
+    raise ValueError(f"Período desconhecido: {periodo}")
+
+def sequencia_periodos(inicio: date, fim: date, periodo: str) -> List[int]:
+    """Chaves de todos os períodos entre duas datas (inclusive)"""
+    primeira, ultima = chaves_periodo(np.array([inicio.toordinal(), fim.toordinal()], dtype=np.int64), periodo)
+    passo = 7 if periodo == "semana" else 1
+    return list(range(int(primeira), int(ultima) + 1, passo))
+
+def inicio_periodo(chave: int, periodo: str) -> date:
+    """Primeiro dia do período de uma chave"""
+    if periodo in ("dia", "semana"):
+        return date.fromordinal(chave)
+    meses = {"mes": 1, "trimestre": 3, "ano": 12}[periodo] * chave
+    return date(1970 + meses // 12, meses % 12 + 1, 1)
+
+def rotulo_periodo(chave: int, periodo: str) -> str:
+    """Rótulo do período: AAAA-MM-DD, AAAA-MM, AAAA-T1..T4 ou AAAA"""
+    inicio = inicio_periodo(chave, periodo)
+    if periodo in ("dia", "semana"):
+        return inicio.isoformat()
+    if periodo == "mes":
+        return f"{inicio.year}-{inicio.month:02d}"
+    if periodo == "trimestre":
+        return f"{inicio.year}-T{(inicio.month - 1) // 3 + 1}"
+    return str(inicio.year)
+
+def agregar_registros(
+    registros: List[Dict[str, Any]],
+    campos: Sequence[str],
+    por: Optional[str] = None,
+    rotulo_ausente: Optional[str] = None
+) -> Dict[str, Any]:
+    """Soma de campos numéricos de uma lista de registros, opcionalmente agrupada
+    
+    Usado pelas coleções que não mantêm tabela colunar (investimentos,
+    metas): as colunas são montadas uma vez e reduzidas de forma vetorizada.
+    """
+    valores = colunas_em_centavos(registros, campos)
+    quantidade, somas, _, _ = _reduzir_tudo(valores)
+    resultado: Dict[str, Any] = {"total": _somas(quantidade, campos, somas)}
+    
+    if por is None:
+        return resultado
+    
+    dicionario = Dicionario()
+    chaves = np.fromiter(
+        (dicionario.codificar(registro.get(por)) for registro in registros),
+        dtype=np.int32, count=len(registros)
+    )
+    grupos: Dict[Optional[str], Dict[str, Any]] = {}
+    for chave, quantidade, somas, _, _ in zip(*_reduzir(chaves, valores)):
+        rotulo = dicionario.decodificar(int(chave)) if chave else rotulo_ausente
+        grupo = _somas(int(quantidade), campos, somas)
+        if rotulo in grupos:
+            grupo = {campo: round(grupos[rotulo][campo] + valor, 2) for campo, valor in grupo.items()}
+        grupos[rotulo] = grupo
+    resultado["grupos"] = grupos
+    return resultado
+
+def colunas_em_centavos(registros: List[Dict[str, Any]], campos: Sequence[str]) -> np.ndarray:
+    """Matriz int64 (registros x campos) com os valores em centavos"""
+    valores = np.fromiter(
+        (valor_em_centavos(registro.get(campo)) for registro in registros for campo in campos),
+        dtype=np.int64, count=len(registros) * len(campos)
+    )
+    return valores.reshape(len(registros), len(campos))
+
+def contar_atingidos(registros: List[Dict[str, Any]], campo: str, referencia: str) -> int:
+    """Quantidade de registros em que `campo` alcança o valor de `referencia`"""
+    valores = colunas_em_centavos(registros, (campo, referencia))
+    return int(np.count_nonzero(valores[:, 0] >= valores[:, 1]))
+
+def mascara_filtro(tabela: TabelaColunar, filtro: Optional[Filtro] = None) -> np.ndarray:
+    """Linhas ativas da tabela que atendem ao filtro"""
+    mascara = _coluna(tabela.ativo, np.int8).astype(bool)
+    if filtro is None:
+        return mascara
+    
+    for campo, valor in filtro.igualdades.items():
+        if campo not in tabela.dicionarios:
+            raise ValueError(f"Filtro sem coluna na tabela colunar: {campo}")
+        codigo = tabela.dicionarios[campo].codigo(valor)
+        if codigo is None:
+            return np.zeros_like(mascara)
+        mascara &= _coluna(tabela.codigos[campo], np.int32) == codigo
+    
+    if filtro.data_inicio is not None or filtro.data_fim is not None:
+        dias = _coluna(tabela.dias, np.int64)
+        # Dia 0 marca data inválida, que nunca entra num período
+        mascara &= dias > 0
+        if filtro.data_inicio is not None:
+            mascara &= dias >= date.fromisoformat(filtro.data_inicio).toordinal()
+        if filtro.data_fim is not None:
+            mascara &= dias <= date.fromisoformat(filtro.data_fim).toordinal()
+    return mascara
+
+def _coluna(buffer, tipo) -> np.ndarray:
+    """Visão NumPy (sem cópia) de um buffer da tabela"""
+    return np.frombuffer(buffer, dtype=tipo) if len(buffer) else np.empty(0, dtype=tipo)
+
+def _meses(dias: np.ndarray) -> np.ndarray:
+    """Meses desde 1970-01 para cada ordinal de dia (-1 para data inválida)"""
+    meses = (dias - ORDINAL_EPOCA).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    return np.where(dias > 0, meses, -1)
+
+def _reduzir(chaves: np.ndarray, valores: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Chaves distintas e, por chave, quantidade, somas, mínimos e máximos
+    
+    Ordena uma vez pelas chaves e reduz cada faixa contígua com reduceat.
+    """
+    if not len(chaves):
+        vazio = np.empty((0, valores.shape[1]), dtype=np.int64)
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), vazio, vazio, vazio
+    
+    ordem = np.argsort(chaves, kind="stable")
+    chaves = chaves[ordem]
+    valores = valores[ordem]
+    inicios = np.flatnonzero(np.concatenate(([True], chaves[1:] != chaves[:-1])))
+    quantidades = np.diff(np.append(inicios, len(chaves)))
+    return (
+        chaves[inicios],
+        quantidades,
+        np.add.reduceat(valores, inicios, axis=0),
+        np.minimum.reduceat(valores, inicios, axis=0),
+        np.maximum.reduceat(valores, inicios, axis=0)
+    )
+
+def _reduzir_tudo(valores: np.ndarray) -> Tuple[int, np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+    if not len(valores):
+        return 0, np.zeros(valores.shape[1], dtype=np.int64), None, None
+    return len(valores), valores.sum(axis=0), valores.min(axis=0), valores.max(axis=0)
+
+def _estatisticas(quantidade: int, somas, minimos, maximos) -> Dict[str, Any]:
+    return {
+        "total": int(somas[0]) / 100,
+        "quantidade": quantidade,
+        "minimo": int(minimos[0]) / 100 if minimos is not None else None,
+        "maximo": int(maximos[0]) / 100 if maximos is not None else None
+    }
+
+def _somas(quantidade: int, campos: Sequence[str], somas) -> Dict[str, Any]:
+    resultado: Dict[str, Any] = {"quantidade": quantidade}
+    for campo, soma in zip(campos, somas):
+        resultado[campo] = int(soma) / 100
+    return resultado
+
+def _acumular(grupos: Dict[Optional[str], Dict[str, Any]], rotulo: Optional[str], estatisticas: Dict[str, Any]) -> None:
+    """Inclui as estatísticas do grupo, combinando rótulos repetidos"""
+    atual = grupos.get(rotulo)
+    if atual is None:
+        grupos[rotulo] = estatisticas
+        return
+    atual["total"] = round(atual["total"] + estatisticas["total"], 2)
+    atual["quantidade"] += estatisticas["quantidade"]
+    atual["minimo"] = min(atual["minimo"], estatisticas["minimo"])
+    atual["maximo"] = max(atual["maximo"], estatisticas["maximo"])
@@ -0,0 +1,690 @@
+import heapq
+import time
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple, Union, Callable
+from datetime import date, datetime
+from ..core.config import settings
+from .concorrencia import LockLeituraEscrita
+from .agregacao import (
+    PERIODOS, agregar_tabela, agregar_periodos, agregar_registros, contar_atingidos,
+    sequencia_periodos, inicio_periodo, rotulo_periodo
+)
+from .colunar import TabelaColunar, construir_tabela
+from .filtros import Filtro, compilar_filtros, data_registro
+from .indices import chave_ordenacao
+from .paginacao import CAMPOS_PAGINACAO, codificar_cursor, decodificar_cursor
+from .resumos import ResumoMensal, construir_resumo
+from .unidade_trabalho import UnidadeTrabalho
+
+# Coleções do documento que são listas de registros com "id"
+COLECOES = [
+    "gastos",
+    "receitas",
+    "contas",
+    "investimentos",
+    "contracheques_processados",
+    "extratos_bancarios_processados",
+    "extratos_cartao_processados",
+    "llm_configs",
+    "metas",
+    "gastos_recorrentes",
+    "compras_parceladas"
+]
+
+class ConflitoVersao(Exception):
+    """A versão esperada do registro não é mais a atual"""
+    
+    def __init__(self, colecao: str, item_id: str, esperada: int, atual: int):
+        super().__init__(
+            f"Registro {item_id} de {colecao} foi alterado por outra operação "
+            f"(versão esperada {esperada}, atual {atual})"
+        )
+        self.esperada = esperada
+        self.atual = atual
+
+class RegistroInexistente(Exception):
+    """Uma operação de um lote se refere a um registro que não existe"""
+    
+    def __init__(self, colecao: str, item_id: str):
+        super().__init__(f"Registro {item_id} de {colecao} não encontrado")
+        self.colecao = colecao
+        self.item_id = item_id
+
+class ServicosDadosBase:
+    """Operações de domínio comuns a todos os backends de armazenamento
+    
+    Os backends implementam load_data/save_data e as primitivas _obter_chave,
+    _listar, _buscar, _inserir, _atualizar e _remover.
+    
+    Várias mutações podem ser gravadas de uma vez por uma UnidadeTrabalho
+    (ver confirmar), que os backends aplicam com _aplicar_operacoes.
+    
+    Cada registro carrega um campo "versao", incrementado a cada atualização.
+    Se os dados de uma atualização trazem "versao", ela é a versão esperada
+    do registro e a atualização falha com ConflitoVersao se ele já mudou.
+    """
+    
+    def __init__(self):
+        self._lock = LockLeituraEscrita()
+        
+        # Versão de cada chave do documento, avançada a cada alteração (ETags).
+        # Os contadores recomeçam a cada execução; a época os distingue.
+        self._inicio = time.time()
+        self._epoca = format(int(self._inicio * 1000), "x")
+        self._versoes_chaves: Dict[str, int] = {}
+        self._alteracoes: Dict[str, float] = {}
+        self._versao_total = 0
+    
+    def _dados_iniciais(self) -> Dict[str, Any]:
+        """Documento inicial do sistema"""
+        return {
+            "gastos": [],
+            "receitas": [],
+            "contas": [],
+            "categorias": {
+                "gastos": [
+                    {"id": "cat-gasto-1", "nome": "Alimentação", "tipo": "gasto", "cor": "#FF6B6B", "icone": "utensils", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-2", "nome": "Transporte", "tipo": "gasto", "cor": "#4ECDC4", "icone": "car", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-3", "nome": "Saúde", "tipo": "gasto", "cor": "#45B7D1", "icone": "heart", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-4", "nome": "Educação", "tipo": "gasto", "cor": "#F7DC6F", "icone": "book", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-5", "nome": "Lazer", "tipo": "gasto", "cor": "#BB8FCE", "icone": "smile", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-6", "nome": "Casa", "tipo": "gasto", "cor": "#85C1E9", "icone": "home", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-7", "nome": "Impostos e taxas públicas", "tipo": "gasto", "cor": "#EC7063", "icone": "file-text", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-8", "nome": "Empréstimos", "tipo": "gasto", "cor": "#F1948A", "icone": "credit-card", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-9", "nome": "Pensão alimentícia", "tipo": "gasto", "cor": "#D7BDE2", "icone": "heart-handshake", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-10", "nome": "Previdência pública", "tipo": "gasto", "cor": "#A9DFBF", "icone": "shield", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-11", "nome": "Previdência privada", "tipo": "gasto", "cor": "#A2D9CE", "icone": "umbrella", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-12", "nome": "Associação", "tipo": "gasto", "cor": "#F9E79F", "icone": "users", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-13", "nome": "Abate teto", "tipo": "gasto", "cor": "#FADBD8", "icone": "trending-down", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-gasto-14", "nome": "Outros", "tipo": "gasto", "cor": "#95A5A6", "icone": "more-horizontal", "created_at": "2024-01-01T00:00:00Z"}
+                ],
+                "receitas": [
+                    {"id": "cat-receita-1", "nome": "Salário", "tipo": "receita", "cor": "#27AE60", "icone": "briefcase", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-2", "nome": "Aulas/Palestras", "tipo": "receita", "cor": "#3498DB", "icone": "graduation-cap", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-3", "nome": "Investimentos", "tipo": "receita", "cor": "#E74C3C", "icone": "trending-up", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-4", "nome": "Vendas", "tipo": "receita", "cor": "#9B59B6", "icone": "shopping-bag", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-5", "nome": "Restituição de imposto de renda", "tipo": "receita", "cor": "#1ABC9C", "icone": "refund", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-6", "nome": "Reembolsos", "tipo": "receita", "cor": "#F39C12", "icone": "rotate-ccw", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-7", "nome": "Ações judiciais", "tipo": "receita", "cor": "#8E44AD", "icone": "scales", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-8", "nome": "Adicionais", "tipo": "receita", "cor": "#2ECC71", "icone": "plus", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-9", "nome": "Gratificação", "tipo": "receita", "cor": "#E67E22", "icone": "award", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-10", "nome": "Verbas indenizatórias", "tipo": "receita", "cor": "#16A085", "icone": "shield-check", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-11", "nome": "Resgates de investimentos", "tipo": "receita", "cor": "#C0392B", "icone": "piggy-bank", "created_at": "2024-01-01T00:00:00Z"},
+                    {"id": "cat-receita-12", "nome": "Outros", "tipo": "receita", "cor": "#95A5A6", "icone": "more-horizontal", "created_at": "2024-01-01T00:00:00Z"}
+                ]
+            },
+            "investimentos": [],
+            "contracheques_processados": [],
+            "extratos_bancarios_processados": [],
+            "extratos_cartao_processados": [],
+            "llm_configs": [],
+            "metas": [],
+            "gastos_recorrentes": [],
+            "compras_parceladas": [],
+            "backup_metadata": {
+                "last_backup": None,
+                "version": "1.0.0",
+                "total_records": 0
+            }
+        }
+    
+    def _atualizar_metadata(self, data: Dict[str, Any]) -> None:
+        """Atualiza a metadata de backup do documento"""
+        data["backup_metadata"]["last_backup"] = datetime.now().isoformat()
+        data["backup_metadata"]["total_records"] = (
+            len(data.get("gastos", [])) + 
+            len(data.get("receitas", [])) + 
+            len(data.get("contas", [])) + 
+            len(data.get("investimentos", []))
+        )
+    
+    def _preparar_atualizacao(self, colecao: str, item: Dict, campos: Union[Dict, Callable[[Dict], Dict]]) -> Dict:
+        """Resolve os campos de uma atualização e aplica o controle de versão"""
+        campos = dict(campos(item) if callable(campos) else campos)
+        esperada = campos.pop("versao", None)
+        atual = item.get("versao", 1)
+        if esperada is not None and int(esperada) != atual:
+            raise ConflitoVersao(colecao, item.get("id"), int(esperada), atual)
+        campos["versao"] = atual + 1
+        return campos
+    
+    def resetar(self) -> None:
+        """Recria o armazenamento com os dados iniciais"""
+        self.save_data(self._dados_iniciais())
+    
+    # Versões por coleção
+    def _marcar_alteracao(self, chaves: Iterable[str]) -> None:
+        """Avança a versão das chaves alteradas (chamado pelos backends)"""
+        agora = time.time()
+        for chave in chaves:
+            self._versoes_chaves[chave] = self._versoes_chaves.get(chave, 0) + 1
+            self._alteracoes[chave] = agora
+            self._versao_total += 1
+    
+    def versao_colecoes(self, colecoes: Optional[Iterable[str]] = None) -> Tuple[str, float]:
+        """Marca de versão e instante da última alteração das coleções (None = documento)
+        
+        Os contadores só crescem, então a soma muda sempre que alguma das
+        coleções muda. Não lê os dados.
+        """
+        if colecoes is None:
+            versao = self._versao_total
+            alterado_em = max(list(self._alteracoes.values()), default=self._inicio)
+        else:
+            chaves = list(colecoes)
+            versao = sum(self._versoes_chaves.get(chave, 0) for chave in chaves)
+            alterado_em = max((self._alteracoes.get(chave, self._inicio) for chave in chaves), default=self._inicio)
+        return f"{self._epoca}-{versao}", alterado_em
+    
+    def versao_documento(self) -> int:
+        """Total de alterações já registradas em memória (sem lock e sem E/S)"""
+        return self._versao_total
+    
+    # Interface do backend
+    def load_data(self) -> Dict[str, Any]:
+        raise NotImplementedError
+    
+    def save_data(self, data: Dict[str, Any]) -> None:
+        raise NotImplementedError
+    
+    def invalidar_cache(self) -> None:
+        pass
+    
+    def estatisticas_cache(self) -> Dict[str, Any]:
+        return {"hits": 0, "misses": 0, "taxa_acerto": 0.0, "versao": 0}
+    
+    def compactar(self) -> None:
+        pass
+    
+    def fechar(self) -> None:
+        pass
+    
+    def _obter_chave(self, chave: str) -> Any:
+        """Valor de uma chave do documento que não é coleção (ex.: categorias)"""
+        raise NotImplementedError
+    
+    def _chaves_avulsas(self) -> List[str]:
+        """Chaves do documento que não são coleções (categorias, backup_metadata...)"""
+        raise NotImplementedError
+    
+    def _listar(self, colecao: str) -> List[Dict]:
+        raise NotImplementedError
+    
+    def _buscar(self, colecao: str, item_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+    
+    def _consultar(self, colecao: str, filtro: Filtro) -> List[Dict]:
+        """Registros que atendem ao filtro; backends com índices sobrescrevem"""
+        return [item for item in self._listar(colecao) if filtro.aceita(item)]
+    
+    def _existe(self, colecao: str, filtro: Filtro) -> bool:
+        """Verifica se algum registro atende ao filtro"""
+        return any(filtro.aceita(item) for item in self._listar(colecao))
+    
+    def tabela_colunar(self, colecao: str) -> TabelaColunar:
+        """Representação colunar de uma coleção (valores, datas e códigos)"""
+        return construir_tabela(self._listar(colecao))
+    
+    def _pagina(self, colecao: str, limite: int, antes: Optional[Tuple[str, str]], filtro: Filtro) -> List[Dict]:
+        """Até `limite` registros com chave (campo, id) menor que `antes`, em ordem decrescente
+        
+        Backends com índice ordenado sobrescrevem para não ordenar a coleção inteira.
+        """
+        campo = CAMPOS_PAGINACAO[colecao]
+        itens = [
+            item for item in self._consultar(colecao, filtro)
+            if antes is None or chave_ordenacao(item, campo) < antes
+        ]
+        return heapq.nlargest(limite, itens, key=lambda item: chave_ordenacao(item, campo))
+    
+    def _recentes(self, colecao: str, limite: int) -> List[Dict]:
+        """Os `limite` registros de data mais recente; backends com índice de data sobrescrevem"""
+        return heapq.nlargest(limite, self._listar(colecao), key=data_registro)
+    
+    def _resumo_mensal(self, colecao: str) -> ResumoMensal:
+        """Resumo mensal materializado da coleção; backends que o mantêm sobrescrevem
+        
+        Chamado com o lock do backend adquirido (leitura ou escrita).
+        """
+        return construir_resumo(self._listar(colecao))
+    
+    def _substituir_resumo(self, colecao: str, resumo: ResumoMensal) -> None:
+        """Troca o resumo mensal mantido pelo backend (chamado com o lock de escrita)"""
+        pass
+    
+    def _inserir(self, colecao: str, item: Dict) -> Dict:
+        raise NotImplementedError
+    
+    def _atualizar(self, colecao: str, item_id: str, campos: Union[Dict, Callable[[Dict], Dict]]) -> Optional[Dict]:
+        """Atualiza um item; `campos` pode ser uma função do item atual
+        
+        A função é avaliada sob o lock do backend, o que torna atômicas as
+        operações de leitura-modificação-escrita.
+        """
+        raise NotImplementedError
+    
+    def _remover(self, colecao: str, item_id: str) -> bool:
+        raise NotImplementedError
+    
+    def _aplicar_operacoes(self, operacoes: List[Dict[str, Any]]) -> List[Any]:
+        """Aplica e persiste um lote de operações de forma atômica"""
+        raise NotImplementedError
+    
+    def _preparar_operacoes(self, operacoes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Confere um lote e resolve os campos das atualizações (chamado com o lock de escrita)
+        
+        Cada operação enxerga o efeito das anteriores do mesmo lote. Falha com
+        RegistroInexistente ou ConflitoVersao antes de qualquer alteração.
+        """
+        estado: Dict[Tuple[str, str], Optional[Dict]] = {}
+        registros = []
+        for operacao in operacoes:
+            registro = dict(operacao)
+            colecao = registro["colecao"]
+            if registro["op"] == "inserir":
+                # Cópia: o dict da unidade continua com quem a montou e não
+                # pode ser o mesmo objeto entregue depois aos leitores
+                registro["dados"] = {"versao": 1, **registro["dados"]}
+                estado[(colecao, registro["dados"]["id"])] = registro["dados"]
+                registros.append(registro)
+                continue
+            
+            chave = (colecao, registro["id"])
+            item = estado[chave] if chave in estado else self._buscar(colecao, registro["id"])
+            if item is None:
+                raise RegistroInexistente(colecao, registro["id"])
+            if registro["op"] == "atualizar":
+                registro["dados"] = self._preparar_atualizacao(colecao, item, registro["dados"])
+                estado[chave] = {**item, **registro["dados"]}
+            else:
+                estado[chave] = None
+            registros.append(registro)
+        return registros
+    
+    # Unidade de trabalho
+    def unidade_trabalho(self) -> UnidadeTrabalho:
+        """Unidade de trabalho confirmada ao sair do bloco `with`"""
+        return UnidadeTrabalho(self)
+    
+    def confirmar(self, unidade: UnidadeTrabalho) -> List[Any]:
+        """Aplica as operações da unidade numa única gravação atômica
+        
+        Retorna (e guarda em unidade.resultados) o registro resultante de cada
+        inclusão ou alteração e True para cada remoção. Se alguma operação
+        falha nada é alterado.
+        """
+        unidade.resultados = self._aplicar_operacoes(unidade.operacoes) if unidade.operacoes else []
+        unidade.operacoes = []
+        return unidade.resultados
+    
+    # Paginação por cursor
+    def paginar(self, colecao: str, limite: int, cursor: Optional[str] = None, filtros: Optional[Dict] = None) -> Dict[str, Any]:
+        """Página de uma coleção em ordem decrescente de (data, id)
+        
+        `cursor` é o next_cursor da página anterior; a resposta traz
+        next_cursor None quando não há mais registros.
+        """
+        if colecao not in CAMPOS_PAGINACAO:
+            raise ValueError(f"Coleção sem paginação: {colecao}")
+        antes = decodificar_cursor(cursor)
+        
+        # Um registro a mais indica se existe próxima página
+        itens = self._pagina(colecao, limite + 1, antes, compilar_filtros(filtros))
+        proximo = None
+        if len(itens) > limite:
+            itens = itens[:limite]
+            proximo = codificar_cursor(chave_ordenacao(itens[-1], CAMPOS_PAGINACAO[colecao]))
+        return {"items": itens, "next_cursor": proximo}
+    
+    # Leitura em streaming
+    def iterar(self, colecao: str, filtros: Optional[Dict] = None, lote: Optional[int] = None) -> Iterator[Dict]:
+        """Percorre os registros de uma coleção sem materializá-la
+        
+        Coleções paginadas são lidas lote a lote pelo cursor, em ordem
+        decrescente de (data, id), sem manter o lock entre os lotes; as
+        demais são pequenas e vêm da listagem comum.
+        """
+        filtro = compilar_filtros(filtros)
+        if colecao not in CAMPOS_PAGINACAO:
+            yield from (self._listar(colecao) if filtro.vazio else self._consultar(colecao, filtro))
+            return
+        
+        lote = lote or settings.STREAMING_LOTE
+        antes = None
+        while True:
+            itens = self._pagina(colecao, lote, antes, filtro)
+            yield from itens
+            if len(itens) < lote:
+                return
+            antes = chave_ordenacao(itens[-1], CAMPOS_PAGINACAO[colecao])
+    
+    def iterar_documento(self) -> Iterator[Dict[str, Any]]:
+        """Percorre o documento inteiro (exportação) sem montá-lo na memória
+        
+        Gera {"chave", "valor"} para cada chave avulsa e {"colecao",
+        "registro"} para cada registro das coleções.
+        """
+        for chave in self._chaves_avulsas():
+            yield {"chave": chave, "valor": self._obter_chave(chave)}
+        for colecao in COLECOES:
+            for registro in self.iterar(colecao):
+                yield {"colecao": colecao, "registro": registro}
+    
+    # Métodos para gastos
+    def get_gastos(self, filtros: Optional[Dict] = None) -> List[Dict]:
+        """Obtém lista de gastos com filtros opcionais"""
+        filtro = compilar_filtros(filtros)
+        if filtro.vazio:
+            return self._listar("gastos")
+        return self._consultar("gastos", filtro)
+    
+    def get_gasto(self, gasto_id: str) -> Optional[Dict]:
+        """Obtém um gasto pelo id"""
+        return self._buscar("gastos", gasto_id)
+    
+    def create_gasto(self, gasto_data: Dict) -> Dict:
+        """Cria um novo gasto"""
+        gasto_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("gastos", gasto_data)
+    
+    def update_gasto(self, gasto_id: str, gasto_data: Dict) -> Optional[Dict]:
+        """Atualiza um gasto existente"""
+        return self._atualizar("gastos", gasto_id, gasto_data)
+    
+    def delete_gasto(self, gasto_id: str) -> bool:
+        """Remove um gasto"""
+        return self._remover("gastos", gasto_id)
+    
+    # Métodos para receitas
+    def get_receitas(self, filtros: Optional[Dict] = None) -> List[Dict]:
+        """Obtém lista de receitas com filtros opcionais"""
+        filtro = compilar_filtros(filtros)
+        if filtro.vazio:
+            return self._listar("receitas")
+        return self._consultar("receitas", filtro)
+    
+    def get_receita(self, receita_id: str) -> Optional[Dict]:
+        """Obtém uma receita pelo id"""
+        return self._buscar("receitas", receita_id)
+    
+    def create_receita(self, receita_data: Dict) -> Dict:
+        """Cria uma nova receita"""
+        receita_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("receitas", receita_data)
+    
+    def update_receita(self, receita_id: str, receita_data: Dict) -> Optional[Dict]:
+        """Atualiza uma receita existente"""
+        return self._atualizar("receitas", receita_id, receita_data)
+    
+    def delete_receita(self, receita_id: str) -> bool:
+        """Remove uma receita"""
+        return self._remover("receitas", receita_id)
+    
+    # Métodos para contas
+    def get_contas(self) -> List[Dict]:
+        """Obtém lista de contas"""
+        return self._listar("contas")
+    
+    def get_conta(self, conta_id: str) -> Optional[Dict]:
+        """Obtém uma conta pelo id"""
+        return self._buscar("contas", conta_id)
+    
+    def create_conta(self, conta_data: Dict) -> Dict:
+        """Cria uma nova conta"""
+        conta_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("contas", conta_data)
+    
+    def update_conta(self, conta_id: str, conta_data: Dict) -> Optional[Dict]:
+        """Atualiza uma conta existente"""
+        return self._atualizar("contas", conta_id, conta_data)
+    
+    def delete_conta(self, conta_id: str) -> bool:
+        """Remove uma conta"""
+        return self._remover("contas", conta_id)
+    
+    def conta_em_uso(self, conta_id: str) -> bool:
+        """Verifica se a conta possui gastos ou receitas associados"""
+        filtro = compilar_filtros({"conta_id": conta_id})
+        return self._existe("gastos", filtro) or self._existe("receitas", filtro)
+    
+    # Métodos para categorias
+    def get_categorias(self) -> Dict[str, List[Dict]]:
+        """Obtém todas as categorias"""
+        return self._obter_chave("categorias") or {"gastos": [], "receitas": []}
+    
+    # Métodos para investimentos
+    def get_investimentos(self) -> List[Dict]:
+        """Obtém lista de investimentos"""
+        return self._listar("investimentos")
+    
+    def get_investimento(self, investimento_id: str) -> Optional[Dict]:
+        """Obtém um investimento pelo id"""
+        return self._buscar("investimentos", investimento_id)
+    
+    def create_investimento(self, investimento_data: Dict) -> Dict:
+        """Cria um novo investimento"""
+        investimento_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("investimentos", investimento_data)
+    
+    def update_investimento(self, investimento_id: str, investimento_data: Dict) -> Optional[Dict]:
+        """Atualiza um investimento existente"""
+        return self._atualizar("investimentos", investimento_id, investimento_data)
+    
+    def delete_investimento(self, investimento_id: str) -> bool:
+        """Remove um investimento"""
+        return self._remover("investimentos", investimento_id)
+    
+    # Métodos para metas
+    def get_metas(self) -> List[Dict]:
+        """Obtém lista de metas"""
+        return self._listar("metas")
+    
+    def get_meta(self, meta_id: str) -> Optional[Dict]:
+        """Obtém uma meta pelo id"""
+        return self._buscar("metas", meta_id)
+    
+    def create_meta(self, meta_data: Dict) -> Dict:
+        """Cria uma nova meta"""
+        meta_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("metas", meta_data)
+    
+    def update_meta(self, meta_id: str, meta_data: Dict) -> Optional[Dict]:
+        """Atualiza uma meta existente"""
+        return self._atualizar("metas", meta_id, meta_data)
+    
+    def delete_meta(self, meta_id: str) -> bool:
+        """Remove uma meta"""
+        return self._remover("metas", meta_id)
+    
+    def contribuir_meta(self, meta_id: str, valor: float) -> Optional[Dict]:
+        """Adiciona valor ao valor atual de uma meta"""
+        return self._atualizar(
+            "metas", meta_id,
+            lambda meta: {"valor_atual": float(meta.get("valor_atual", 0)) + valor}
+        )
+    
+    # Métodos de agregação para relatórios
+    def agregar_transacoes(
+        self,
+        colecao: str,
+        por: Optional[str] = None,
+        filtros: Optional[Dict] = None,
+        rotulo_ausente: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Soma, quantidade, mínimo e máximo de gastos ou receitas
+        
+        Calculados sobre a tabela colunar da coleção; com `por` (categoria,
+        forma_pagamento, conta_id ou mes) também devolve os grupos.
+        """
+        if colecao not in ("gastos", "receitas"):
+            raise ValueError(f"Coleção sem tabela colunar: {colecao}")
+        return agregar_tabela(self.tabela_colunar(colecao), por, compilar_filtros(filtros), rotulo_ausente)
+    
+    def resumo_mensal(self, ano: int, mes: int) -> Dict[str, Dict[str, Any]]:
+        """Totais de gastos e receitas de um mês, lidos dos resumos materializados"""
+        with self._lock.leitura():
+            return {
+                "gastos": self._resumo_mensal("gastos").mes(ano, mes, "Outros"),
+                "receitas": self._resumo_mensal("receitas").mes(ano, mes, "Outros")
+            }
+    
+    def totais_conta(self, conta_id: str) -> Dict[str, Dict[str, Any]]:
+        """Total e quantidade de gastos e receitas de uma conta em todo o histórico
+        
+        Lidos dos resumos materializados: o custo não depende do número de transações.
+        """
+        with self._lock.leitura():
+            return {
+                "gastos": self._resumo_mensal("gastos").conta(conta_id),
+                "receitas": self._resumo_mensal("receitas").conta(conta_id)
+            }
+    
+    def dashboard(self, ano: int, mes: int, limite: int = 5) -> Dict[str, Any]:
+        """Resumo do mês, transações recentes e saldos das contas numa única leitura
+        
+        Tudo vem dos resumos materializados e do índice de data, então o custo
+        não cresce com o histórico de transações.
+        """
+        with self._lock.leitura():
+            resumo_gastos = self._resumo_mensal("gastos")
+            resumo_receitas = self._resumo_mensal("receitas")
+            
+            contas = []
+            for conta in self._listar("contas"):
+                gastos_conta = resumo_gastos.conta(conta.get("id"))
+                receitas_conta = resumo_receitas.conta(conta.get("id"))
+                saldo_inicial = float(conta.get("saldo_atual", 0))
+                contas.append({
+                    "conta_id": conta.get("id"),
+                    "nome_conta": conta.get("nome"),
+                    "tipo_conta": conta.get("tipo_conta"),
+                    "saldo_inicial": round(saldo_inicial, 2),
+                    "total_receitas": receitas_conta["total"],
+                    "total_gastos": gastos_conta["total"],
+                    "saldo_atual": round(saldo_inicial + receitas_conta["total"] - gastos_conta["total"], 2)
+                })
+            
+            return {
+                "gastos": resumo_gastos.mes(ano, mes, "Outros"),
+                "receitas": resumo_receitas.mes(ano, mes, "Outros"),
+                "gastos_recentes": self._recentes("gastos", limite),
+                "receitas_recentes": self._recentes("receitas", limite),
+                "contas": contas
+            }
+    
+    def reconstruir_resumos(self) -> Dict[str, List[str]]:
+        """Recalcula os resumos mensais a partir das transações
+        
+        Devolve, por coleção, os meses em que o resumo mantido
+        incrementalmente divergia do recalculado.
+        """
+        divergencias: Dict[str, List[str]] = {}
+        with self._lock:
+            for colecao in ("gastos", "receitas"):
+                recalculado = construir_resumo(self._listar(colecao))
+                divergencias[colecao] = self._resumo_mensal(colecao).divergencias(recalculado)
+                self._substituir_resumo(colecao, recalculado)
+        return divergencias
+    
+    def relatorio_periodo(self, data_inicio: date, data_fim: date, periodo: str = "mes") -> Dict[str, Any]:
+        """Gastos, receitas e saldo acumulado por período entre duas datas
+        
+        As duas tabelas colunares são copiadas sob a mesma leitura e cada
+        uma é agregada de uma vez para todos os períodos. Períodos sem
+        movimento aparecem zerados; o saldo acumulado parte de zero em
+        data_inicio.
+        """
+        if periodo not in PERIODOS:
+            raise ValueError(f"Período desconhecido: {periodo}")
+        filtro = compilar_filtros({"data_inicio": data_inicio, "data_fim": data_fim})
+        
+        with self._lock.leitura():
+            tabela_gastos = self.tabela_colunar("gastos")
+            tabela_receitas = self.tabela_colunar("receitas")
+        gastos = agregar_periodos(tabela_gastos, periodo, filtro, "Outros")
+        receitas = agregar_periodos(tabela_receitas, periodo, filtro, "Outros")
+        
+        vazio = {"total": 0.0, "quantidade": 0, "por_categoria": {}}
+        periodos = []
+        saldo_acumulado = 0.0
+        for chave in sequencia_periodos(data_inicio, data_fim, periodo):
+            gastos_periodo = gastos.get(chave, vazio)
+            receitas_periodo = receitas.get(chave, vazio)
+            saldo = round(receitas_periodo["total"] - gastos_periodo["total"], 2)
+            saldo_acumulado = round(saldo_acumulado + saldo, 2)
+            periodos.append({
+                "periodo": rotulo_periodo(chave, periodo),
+                "inicio": max(inicio_periodo(chave, periodo), data_inicio).isoformat(),
+                "total_gastos": gastos_periodo["total"],
+                "total_receitas": receitas_periodo["total"],
+                "saldo": saldo,
+                "saldo_acumulado": saldo_acumulado,
+                "quantidade_transacoes": gastos_periodo["quantidade"] + receitas_periodo["quantidade"],
+                "gastos_por_categoria": gastos_periodo["por_categoria"],
+                "receitas_por_categoria": receitas_periodo["por_categoria"]
+            })
+        
+        return {
+            "periodos": periodos,
+            "total_gastos": round(sum(p["total_gastos"] for p in periodos), 2),
+            "total_receitas": round(sum(p["total_receitas"] for p in periodos), 2),
+            "saldo": saldo_acumulado,
+            "gastos_por_categoria": _somar_categorias(p["gastos_por_categoria"] for p in periodos),
+            "receitas_por_categoria": _somar_categorias(p["receitas_por_categoria"] for p in periodos)
+        }
+    
+    def agregar_investimentos(self) -> Dict[str, Any]:
+        """Valores aplicado e atual dos investimentos ativos, total e por tipo"""
+        ativos = [i for i in self._listar("investimentos") if i.get("ativo", True)]
+        return agregar_registros(ativos, ("valor_inicial", "valor_atual"), por="tipo_investimento", rotulo_ausente="outros")
+    
+    def agregar_metas(self) -> Dict[str, Any]:
+        """Valores objetivo e atual das metas ativas e quantas já foram atingidas"""
+        ativas = [m for m in self._listar("metas") if m.get("ativa", True)]
+        resumo = agregar_registros(ativas, ("valor_objetivo", "valor_atual"))
+        resumo["atingidas"] = contar_atingidos(ativas, "valor_atual", "valor_objetivo")
+        return resumo
+    
+    # Métodos para processamento de documentos
+    def save_contracheque_processado(self, contracheque_data: Dict) -> Dict:
+        """Salva um contracheque processado"""
+        contracheque_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("contracheques_processados", contracheque_data)
+    
+    def save_extrato_bancario_processado(self, extrato_data: Dict) -> Dict:
+        """Salva um extrato bancário processado"""
+        extrato_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("extratos_bancarios_processados", extrato_data)
+    
+    def save_extrato_cartao_processado(self, extrato_data: Dict) -> Dict:
+        """Salva um extrato de cartão processado"""
+        extrato_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("extratos_cartao_processados", extrato_data)
+    
+    # Métodos para configurações LLM
+    def get_llm_configs(self) -> List[Dict]:
+        """Obtém configurações de LLM"""
+        return self._listar("llm_configs")
+    
+    def save_llm_config(self, config_data: Dict) -> Dict:
+        """Salva configuração de LLM"""
+        config_data["created_at"] = datetime.now().isoformat()
+        return self._inserir("llm_configs", config_data)
+    
+    def delete_llm_config(self, config_id: str) -> bool:
+        """Remove uma configuração de LLM"""
+        return self._remover("llm_configs", config_id)
+    
+    def toggle_llm_config(self, config_id: str) -> Optional[Dict]:
+        """Ativa/desativa uma configuração de LLM"""
+        return self._atualizar(
+            "llm_configs", config_id,
+            lambda config: {"is_active": not config.get("is_active", True)}
+        )
+
+def _somar_categorias(grupos: Iterable[Dict[str, float]]) -> Dict[str, float]:
+    """Soma por categoria de vários períodos"""
+    somas: Dict[str, float] = {}
+    for grupo in grupos:
+        for categoria, valor in grupo.items():
+            somas[categoria] = round(somas.get(categoria, 0) + valor, 2)
+    return somas
@@ -0,0 +1,122 @@
+from array import array
+from typing import Dict, Any, List, Optional, Iterable
+from .filtros import Filtro, texto_campo
+from .indices import IndiceSecundario, ordinal_data
+
+# Colunas categóricas codificadas por dicionário
+COLUNAS_CODIFICADAS = ("categoria", "forma_pagamento", "conta_id", "descricao")
+
+class Dicionario:
+    """Codificação por dicionário: cada texto distinto recebe um código inteiro
+    
+    O código 0 é reservado para valores ausentes (None).
+    """
+    
+    def __init__(self):
+        self.valores: List[Optional[str]] = [None]
+        self.codigos: Dict[str, int] = {}
+    
+    def codificar(self, valor: Any) -> int:
+        if valor is None:
+            return 0
+        texto = texto_campo(valor)
+        codigo = self.codigos.get(texto)
+        if codigo is None:
+            codigo = len(self.valores)
+            self.codigos[texto] = codigo
+            self.valores.append(texto)
+        return codigo
+    
+    def decodificar(self, codigo: int) -> Optional[str]:
+        return self.valores[codigo]
+    
+    def codigo(self, valor: Any) -> Optional[int]:
+        """Código de um valor já conhecido (None se nunca foi visto)"""
+        if valor is None:
+            return 0
+        return self.codigos.get(texto_campo(valor))
+
+class TabelaColunar(IndiceSecundario):
+    """Gastos ou receitas em colunas contíguas, alinhadas à lista da coleção
+    
+    A linha i corresponde à posição i da lista em IndiceColecao, então a
+    tabela é mantida pelos mesmos ganchos dos índices secundários:
+    valor em centavos (int64), data como ordinal do dia (int64, 0 quando
+    inválida), categoria/forma_pagamento/conta_id/descrição como códigos de
+    dicionário (int32) e uma coluna "ativo" que marca as lápides.
+    
+    É uma cópia adicional, mantida só para as agregações: os registros
+    (dicts) continuam sendo a fonte dos dados, então a memória ocupada pela
+    coleção aumenta em vez de diminuir (ver bytes_usados).
+    """
+    
+    def __init__(self):
+        self.dicionarios: Dict[str, Dicionario] = {coluna: Dicionario() for coluna in COLUNAS_CODIFICADAS}
+        self.limpar()
+    
+    def limpar(self) -> None:
+        self.centavos = array('q')
+        self.dias = array('q')
+        self.codigos: Dict[str, array] = {coluna: array('i') for coluna in COLUNAS_CODIFICADAS}
+        self.ativo = array('b')
+    
+    def __len__(self) -> int:
+        return len(self.ativo)
+    
+    def adicionar(self, item: Dict[str, Any], posicao: int) -> None:
+        centavos = valor_em_centavos(item.get("valor"))
+        dia = ordinal_data(item) or 0
+        codigos = {coluna: self.dicionarios[coluna].codificar(item.get(coluna)) for coluna in COLUNAS_CODIFICADAS}
+        
+        if posicao == len(self.ativo):
+            self.centavos.append(centavos)
+            self.dias.append(dia)
+            for coluna, codigo in codigos.items():
+                self.codigos[coluna].append(codigo)
+            self.ativo.append(1)
+            return
+        
+        self.centavos[posicao] = centavos
+        self.dias[posicao] = dia
+        for coluna, codigo in codigos.items():
+            self.codigos[coluna][posicao] = codigo
+        self.ativo[posicao] = 1
+    
+    def remover(self, item: Dict[str, Any], posicao: int) -> None:
+        if posicao < len(self.ativo):
+            self.ativo[posicao] = 0
+    
+    def candidatos(self, filtro: Filtro) -> Optional[set]:
+        return None
+    
+    def copiar(self) -> "TabelaColunar":
+        """Cópia desacoplada (para agregar fora do lock do armazenamento)
+        
+        Os dicionários só crescem (um código nunca muda de valor), então são
+        compartilhados com a cópia em vez de duplicados.
+        """
+        tabela = TabelaColunar.__new__(TabelaColunar)
+        tabela.dicionarios = self.dicionarios
+        tabela.centavos = array('q', self.centavos)
+        tabela.dias = array('q', self.dias)
+        tabela.codigos = {coluna: array('i', codigos) for coluna, codigos in self.codigos.items()}
+        tabela.ativo = array('b', self.ativo)
+        return tabela
+    
+    def bytes_usados(self) -> int:
+        """Memória ocupada pelos buffers das colunas"""
+        buffers = [self.centavos, self.dias, self.ativo, *self.codigos.values()]
+        return sum(buffer.itemsize * len(buffer) for buffer in buffers)
+
+def construir_tabela(itens: Iterable[Dict[str, Any]]) -> TabelaColunar:
+    """Monta uma tabela colunar a partir de uma lista de registros"""
+    tabela = TabelaColunar()
+    for posicao, item in enumerate(itens):
+        tabela.adicionar(item, posicao)
+    return tabela
+
+def valor_em_centavos(valor: Any) -> int:
+    try:
+        return int(round(float(valor or 0) * 100))
+    except (TypeError, ValueError):
+        return 0
@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Set
+
+class LockLeituraEscrita:
+    """Lock de leitura/escrita com preferência para escritores
+    
+    Várias threads podem ler ao mesmo tempo; a escrita é exclusiva. Os dois
+    modos são reentrantes e a thread que detém a escrita também pode ler,
+    mas uma leitura não pode ser promovida a escrita. Usado diretamente
+    (`with lock:`) equivale à escrita.
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._leitores: Dict[int, int] = {}
+        self._escritor: Optional[int] = None
+        self._profundidade_escrita = 0
+        self._escritores_aguardando = 0
+    
+    def adquirir_leitura(self) -> None:
+        eu = threading.get_ident()
+        with self._cond:
+            if self._escritor == eu or eu in self._leitores:
+                self._leitores[eu] = self._leitores.get(eu, 0) + 1
+                return
+            while self._escritor is not None or self._escritores_aguardando:
+                self._cond.wait()
+            self._leitores[eu] = 1
+    
+    def liberar_leitura(self) -> None:
+        eu = threading.get_ident()
+        with self._cond:
+            self._leitores[eu] -= 1
+            if not self._leitores[eu]:
+                del self._leitores[eu]
+                if not self._leitores:
+                    self._cond.notify_all()
+    
+    def adquirir_escrita(self) -> None:
+        eu = threading.get_ident()
+        with self._cond:
+            if self._escritor == eu:
+                self._profundidade_escrita += 1
+                return
+            if eu in self._leitores:
+                raise RuntimeError("Uma leitura não pode ser promovida a escrita")
+            
+            self._escritores_aguardando += 1
+            try:
+                while self._escritor is not None or self._leitores:
+                    self._cond.wait()
+            finally:
+                self._escritores_aguardando -= 1
+            self._escritor = eu
+            self._profundidade_escrita = 1
+    
+    def liberar_escrita(self) -> None:
+        with self._cond:
+            self._profundidade_escrita -= 1
+            if not self._profundidade_escrita:
+                self._escritor = None
+                self._cond.notify_all()
+    
+    @contextmanager
+    def leitura(self) -> Iterator[None]:
+        self.adquirir_leitura()
+        try:
+            yield
+        finally:
+            self.liberar_leitura()
+    
+    @contextmanager
+    def escrita(self) -> Iterator[None]:
+        self.adquirir_escrita()
+        try:
+            yield
+        finally:
+            self.liberar_escrita()
+    
+    def __enter__(self) -> "LockLeituraEscrita":
+        self.adquirir_escrita()
+        return self
+    
+    def __exit__(self, *exc) -> None:
+        self.liberar_escrita()
+
+class CommitEmGrupo:
+    """Agrupa gravações concorrentes em uma única escrita durável
+    
+    A primeira thread que solicita uma gravação vira "líder": espera
+    `janela_ms` para que outras mutações entrem no mesmo lote e então chama
+    `gravar` uma única vez com a união das chaves pendentes. As demais
+    threads apenas aguardam a conclusão do lote em que entraram.
+    """
+    
+    def __init__(self, gravar: Callable[[Set[str]], None], janela_ms: int = 5):
+        self._gravar = gravar
+        self._janela = max(0, janela_ms) / 1000.0
+        self._cond = threading.Condition()
+        self._pendentes: Set[str] = set()
+        self._lote_aberto = 1
+        self._lote_concluido = 0
+        self._gravando = False
+        self._erros: Dict[int, Exception] = {}
+    
+    def solicitar(self, chaves: Set[str]) -> None:
+        """Inclui as chaves no próximo lote e bloqueia até ele estar gravado
+        
+        Não deve ser chamado segurando o lock do armazenamento: o líder
+        precisa dele para serializar o estado em memória.
+        """
+        with self._cond:
+            self._pendentes.update(chaves)
+            lote = self._lote_aberto
+            
+            while self._lote_concluido < lote:
+                if self._gravando:
+                    self._cond.wait()
+                    continue
+                
+                self._gravando = True
+                self._cond.release()
+                try:
+                    self._executar_lote()
+                finally:
+                    self._cond.acquire()
+            
+            erro = self._erros.get(lote)
+        
+        if erro is not None:
+            raise erro
+    
+    def _executar_lote(self) -> None:
+        """Executado pelo líder fora do lock da condição"""
+        if self._janela:
+            time.sleep(self._janela)
+        
+        with self._cond:
+            chaves = self._pendentes
+            self._pendentes = set()
+            lote = self._lote_aberto
+            self._lote_aberto += 1
+        
+        erro: Optional[Exception] = None
+        try:
+            self._gravar(chaves)
+        except Exception as e:
+            erro = e
+        
+        with self._cond:
+            if erro is not None:
+                self._erros[lote] = erro
+            # Mantém apenas os erros recentes
+            for antigo in [l for l in self._erros if l < lote - 100]:
+                del self._erros[antigo]
+            self._lote_concluido = lote
+            self._gravando = False
+            self._cond.notify_all()
+
+class VooUnico:
+    """Coalescência de chamadas assíncronas idênticas e simultâneas (single-flight)
+    
+    Enquanto uma chamada com a mesma chave está em andamento, as seguintes
+    aguardam o mesmo resultado (ou a mesma exceção) em vez de repetir o
+    trabalho. Terminada a chamada a chave é liberada; nada é guardado.
+    Usado só pelo event loop.
+    """
+    
+    def __init__(self):
+        self._em_andamento: Dict[Hashable, asyncio.Future] = {}
+        self.coalescidas = 0
+    
+    async def executar(self, chave: Hashable, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        futuro = self._em_andamento.get(chave)
+        if futuro is not None:
+            self.coalescidas += 1
+        else:
+            futuro = asyncio.ensure_future(funcao())
+            self._em_andamento[chave] = futuro
+            futuro.add_done_callback(lambda _: self._em_andamento.pop(chave, None))
+        # O cancelamento de quem espera não cancela o trabalho compartilhado
+        return await asyncio.shield(futuro)
+
+def chave_chamada(*partes: Any) -> Optional[Hashable]:
+    """Chave hashable para argumentos de uma chamada (None se não for possível)
+    
+    Dicionários e listas (ex.: filtros) viram tuplas ordenadas.
+    """
+    try:
+        chave = _congelar(partes)
+        hash(chave)
+        return chave
+    except TypeError:
+        return None
+
+def _congelar(valor: Any) -> Any:
+    if isinstance(valor, dict):
+        return tuple(sorted((chave, _congelar(item)) for chave, item in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(_congelar(item) for item in valor)
+    if isinstance(valor, (str, int, float, bool, date, type(None))):
+        return valor
+    raise TypeError(f"Argumento sem chave estável: {type(valor).__name__}")
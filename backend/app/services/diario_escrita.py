@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Iterator, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+class DiarioEscrita:
+    """Diário (write-ahead log) append-only de mutações
+    
+    Cada mutação é gravada como uma linha JSON compacta com um número de
+    sequência crescente. O fsync é feito em lotes: a cada `fsync_lote`
+    registros ou quando `fsync_intervalo_ms` se passa desde o último fsync
+    (um timer garante o fsync dos registros que ficarem pendentes).
+    """
+    
+    def __init__(self, caminho: str, fsync_lote: int = 32, fsync_intervalo_ms: int = 50):
+        self.caminho = caminho
+        self.fsync_lote = max(1, fsync_lote)
+        self.fsync_intervalo = max(0, fsync_intervalo_ms) / 1000.0
+        self.seq = 0
+        self.registros_desde_compactacao = 0
+        
+        self._arquivo = None
+        self._lock = threading.RLock()
+        self._pendentes_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+        self._timer: Optional[threading.Timer] = None
+    
+    def ler(self, apos_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """Lê os registros com seq > apos_seq
+        
+        Uma última linha incompleta (queda no meio de uma gravação) é
+        descartada e o arquivo é truncado no último registro válido.
+        """
+        with self._lock:
+            if not os.path.exists(self.caminho):
+                return iter(())
+            
+            registros: List[Dict[str, Any]] = []
+            offset_valido = 0
+            with open(self.caminho, 'rb') as arquivo:
+                for linha in arquivo:
+                    if not linha.endswith(b"\n"):
+                        break
+                    try:
+                        registro = json.loads(linha)
+                    except json.JSONDecodeError:
+                        break
+                    offset_valido += len(linha)
+                    self.seq = max(self.seq, registro.get("seq", 0))
+                    if registro.get("seq", 0) > apos_seq:
+                        registros.append(registro)
+            
+            if offset_valido < os.path.getsize(self.caminho):
+                logger.warning(f"Diário com registro incompleto, truncando em {offset_valido} bytes: {self.caminho}")
+                self._fechar_arquivo()
+                with open(self.caminho, 'r+b') as arquivo:
+                    arquivo.truncate(offset_valido)
+            
+            self.registros_desde_compactacao = len(registros)
+            return iter(registros)
+    
+    def anexar(self, registros: List[Dict[str, Any]]) -> None:
+        """Anexa registros ao diário atribuindo números de sequência"""
+        with self._lock:
+            if self._arquivo is None:
+                self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+            
+            linhas = []
+            for registro in registros:
+                self.seq += 1
+                registro["seq"] = self.seq
+                linhas.append(json.dumps(registro, ensure_ascii=False, separators=(',', ':'), default=str))
+            
+            self._arquivo.write("\n".join(linhas) + "\n")
+            self._arquivo.flush()
+            self.registros_desde_compactacao += len(registros)
+            self._pendentes_fsync += len(registros)
+            
+            if (
+                self._pendentes_fsync >= self.fsync_lote
+                or time.monotonic() - self._ultimo_fsync >= self.fsync_intervalo
+            ):
+                self.sincronizar()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.fsync_intervalo, self.sincronizar)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def sincronizar(self) -> None:
+        """Força o fsync dos registros pendentes"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._arquivo is not None and self._pendentes_fsync:
+                self._arquivo.flush()
+                os.fsync(self._arquivo.fileno())
+            self._pendentes_fsync = 0
+            self._ultimo_fsync = time.monotonic()
+    
+    def truncar(self) -> None:
+        """Esvazia o diário (após a compactação num snapshot)"""
+        with self._lock:
+            self.sincronizar()
+            self._fechar_arquivo()
+            with open(self.caminho, 'w', encoding='utf-8') as arquivo:
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+            self.registros_desde_compactacao = 0
+    
+    def fechar(self) -> None:
+        """Sincroniza e fecha o arquivo do diário"""
+        with self._lock:
+            self.sincronizar()
+            self._fechar_arquivo()
+    
+    def _fechar_arquivo(self) -> None:
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
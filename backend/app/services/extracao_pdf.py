@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+import logging
+import fitz  # PyMuPDF
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class FilaExtracaoCheia(Exception):
+    """Extrações demais em andamento; a requisição deve ser repetida depois"""
+
+def extrair_texto_pdf(file_content: bytes) -> str:
+    """Extrai o texto de todas as páginas de um PDF (executada nos workers)"""
+    doc = fitz.open(stream=file_content, filetype="pdf")
+    try:
+        return "".join(doc.load_page(page_num).get_text() for page_num in range(len(doc)))
+    finally:
+        doc.close()
+
+class ExtratorPDF:
+    """Extração de texto de PDFs num pool limitado, fora do event loop
+    
+    No modo "process" cada PDF é lido num processo separado (sem disputar o
+    GIL com a API); no modo "thread", em threads. O pool é criado no primeiro
+    uso. Extrações em execução e na fila são limitadas a `fila_maxima`: além
+    disso a chamada falha na hora com FilaExtracaoCheia. Uma extração que
+    passa de `timeout` segundos falha com TimeoutError, mas segue ocupando o
+    seu lugar na fila até terminar no worker.
+    """
+    
+    def __init__(self, modo: Optional[str] = None, workers: Optional[int] = None,
+                 timeout: Optional[float] = None, fila_maxima: Optional[int] = None):
+        self.modo = modo or settings.PDF_EXECUTOR_MODO
+        self.workers = max(1, workers or settings.PDF_EXECUTOR_WORKERS)
+        self.timeout = timeout or settings.PDF_EXTRACAO_TIMEOUT
+        self.fila_maxima = max(1, fila_maxima or settings.PDF_EXTRACAO_FILA_MAXIMA)
+        
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._em_andamento = 0
+        self._rejeitadas = 0
+        self._tempo_esgotado = 0
+    
+    def _obter_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.modo == "process":
+                    # spawn: o processo da API tem várias threads, então não é seguro usar fork
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="extracao-pdf")
+            return self._executor
+    
+    def _reservar(self) -> None:
+        with self._lock:
+            if self._em_andamento >= self.fila_maxima:
+                self._rejeitadas += 1
+                raise FilaExtracaoCheia(
+                    f"Muitos arquivos em processamento ({self._em_andamento}). Tente novamente em instantes"
+                )
+            self._em_andamento += 1
+    
+    def _liberar(self, _futuro: Any = None) -> None:
+        with self._lock:
+            self._em_andamento -= 1
+    
+    async def extrair(self, file_content: bytes) -> str:
+        """Texto do PDF, extraído no pool"""
+        self._reservar()
+        executor = self._obter_executor()
+        try:
+            futuro = executor.submit(extrair_texto_pdf, file_content)
+        except Exception as e:
+            self._liberar()
+            if isinstance(e, BrokenProcessPool):
+                self._descartar_executor(executor)
+            raise
+        # Libera a vaga quando o worker termina, mesmo que a espera já tenha expirado
+        futuro.add_done_callback(self._liberar)
+        
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(futuro), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._tempo_esgotado += 1
+            raise TimeoutError(f"Extração do PDF excedeu {self.timeout:g}s")
+        except BrokenProcessPool:
+            # Um worker morreu (ex.: PDF que derruba o MuPDF): recria o pool no próximo uso
+            logger.error("Pool de extração de PDF quebrado; será recriado")
+            self._descartar_executor(executor)
+            raise
+    
+    def _descartar_executor(self, executor: Executor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+    
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "modo": self.modo,
+                "workers": self.workers,
+                "em_andamento": self._em_andamento,
+                "fila_maxima": self.fila_maxima,
+                "rejeitadas": self._rejeitadas,
+                "tempo_esgotado": self._tempo_esgotado
+            }
+    
+    def encerrar(self) -> None:
+        """Encerra o pool sem esperar extrações abandonadas"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# Instância global do extrator
+extrator_pdf = ExtratorPDF()
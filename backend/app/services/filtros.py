@@ -0,0 +1,84 @@
+from datetime import date
+from enum import Enum
+from typing import Dict, Any, Callable, List, Optional
+
+# Filtros aceitos por igualdade (comparados como texto)
+CAMPOS_IGUALDADE = ("categoria", "forma_pagamento", "conta_id", "tipo_investimento", "ativo", "ativa")
+
+class Filtro:
+    """Filtros de uma consulta compilados num único predicado
+    
+    Mantém também os critérios em forma estruturada para que o backend de
+    armazenamento possa resolvê-los com índices (ou SQL) antes de aplicar o
+    predicado sobre os candidatos.
+    """
+    
+    def __init__(
+        self,
+        igualdades: Optional[Dict[str, str]] = None,
+        data_inicio: Optional[str] = None,
+        data_fim: Optional[str] = None
+    ):
+        self.igualdades = igualdades or {}
+        self.data_inicio = data_inicio
+        self.data_fim = data_fim
+        self.aceita: Callable[[Dict[str, Any]], bool] = self._compilar()
+    
+    @property
+    def vazio(self) -> bool:
+        return not self.igualdades and self.data_inicio is None and self.data_fim is None
+    
+    def _compilar(self) -> Callable[[Dict[str, Any]], bool]:
+        testes: List[Callable[[Dict[str, Any]], bool]] = [
+            lambda item, campo=campo, valor=valor: texto_campo(item.get(campo)) == valor
+            for campo, valor in self.igualdades.items()
+        ]
+        
+        # Datas ISO (AAAA-MM-DD) comparadas como texto preservam a ordem
+        inicio, fim = self.data_inicio, self.data_fim
+        if inicio is not None and fim is not None:
+            testes.append(lambda item: inicio <= data_registro(item) <= fim)
+        elif inicio is not None:
+            testes.append(lambda item: data_registro(item) >= inicio)
+        elif fim is not None:
+            testes.append(lambda item: data_registro(item) <= fim)
+        
+        if not testes:
+            return lambda item: True
+        if len(testes) == 1:
+            return testes[0]
+        return lambda item: all(teste(item) for teste in testes)
+
+def compilar_filtros(filtros: Optional[Dict[str, Any]]) -> Filtro:
+    """Compila o dicionário de filtros dos endpoints (data_fim é inclusiva)"""
+    igualdades: Dict[str, str] = {}
+    data_inicio = data_fim = None
+    
+    for campo, valor in (filtros or {}).items():
+        if valor is None:
+            continue
+        if campo in CAMPOS_IGUALDADE:
+            igualdades[campo] = texto_campo(valor)
+        elif campo == "data_inicio":
+            data_inicio = _data_iso(valor)
+        elif campo == "data_fim":
+            data_fim = _data_iso(valor)
+        else:
+            raise ValueError(f"Filtro desconhecido: {campo}")
+    
+    return Filtro(igualdades, data_inicio, data_fim)
+
+def data_registro(item: Dict[str, Any]) -> str:
+    """Data do registro como texto AAAA-MM-DD"""
+    return str(item.get("data") or "")[:10]
+
+def texto_campo(valor: Any) -> Optional[str]:
+    """Valor de um campo como texto (enums pelo seu valor)"""
+    if isinstance(valor, Enum):
+        return str(valor.value)
+    return None if valor is None else str(valor)
+
+def _data_iso(valor: Any) -> str:
+    if isinstance(valor, date):
+        return valor.isoformat()[:10]
+    return date.fromisoformat(str(valor)[:10]).isoformat()
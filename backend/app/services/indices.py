@@ -0,0 +1,311 @@
+import bisect
+from datetime import date
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple
+from .filtros import Filtro, data_registro, texto_campo
+
+# Lápides acumuladas antes de compactar a lista (e no mínimo metade dela)
+LAPIDES_MINIMAS_COMPACTACAO = 64
+
+class IndiceSecundario:
+    """Índice secundário sobre as posições de uma IndiceColecao"""
+    
+    def limpar(self) -> None:
+        raise NotImplementedError
+    
+    def adicionar(self, item: Dict[str, Any], posicao: int) -> None:
+        raise NotImplementedError
+    
+    def remover(self, item: Dict[str, Any], posicao: int) -> None:
+        raise NotImplementedError
+    
+    def carregar(self, itens: List[Optional[Dict[str, Any]]]) -> None:
+        """Recria o índice a partir da lista inteira (sem lápides)"""
+        self.limpar()
+        for posicao, item in enumerate(itens):
+            self.adicionar(item, posicao)
+    
+    def candidatos(self, filtro: Filtro) -> Optional[Set[int]]:
+        """Posições que podem atender ao filtro, ou None se o índice não ajuda"""
+        return None
+
+class IndiceData(IndiceSecundario):
+    """Índice ordenado pela data do registro (ordinal do dia)
+    
+    Guarda os dias distintos numa lista ordenada e, para cada dia, o
+    conjunto de posições. Uma consulta por período faz duas buscas binárias
+    e percorre só os dias do intervalo: O(log n + k).
+    """
+    
+    def __init__(self):
+        self.limpar()
+    
+    def limpar(self) -> None:
+        self.dias: List[int] = []
+        self.posicoes_por_dia: Dict[int, Set[int]] = {}
+        # Registros sem data válida entram em qualquer consulta (o predicado decide)
+        self.sem_data: Set[int] = set()
+    
+    def adicionar(self, item: Dict[str, Any], posicao: int) -> None:
+        dia = ordinal_data(item)
+        if dia is None:
+            self.sem_data.add(posicao)
+            return
+        posicoes = self.posicoes_por_dia.get(dia)
+        if posicoes is None:
+            posicoes = self.posicoes_por_dia[dia] = set()
+            bisect.insort(self.dias, dia)
+        posicoes.add(posicao)
+    
+    def remover(self, item: Dict[str, Any], posicao: int) -> None:
+        dia = ordinal_data(item)
+        if dia is None:
+            self.sem_data.discard(posicao)
+            return
+        posicoes = self.posicoes_por_dia.get(dia)
+        if posicoes is None:
+            return
+        posicoes.discard(posicao)
+        if not posicoes:
+            del self.posicoes_por_dia[dia]
+            del self.dias[bisect.bisect_left(self.dias, dia)]
+    
+    def candidatos(self, filtro: Filtro) -> Optional[Set[int]]:
+        if filtro.data_inicio is None and filtro.data_fim is None:
+            return None
+        
+        inicio = 0
+        fim = len(self.dias)
+        if filtro.data_inicio is not None:
+            inicio = bisect.bisect_left(self.dias, date.fromisoformat(filtro.data_inicio).toordinal())
+        if filtro.data_fim is not None:
+            fim = bisect.bisect_right(self.dias, date.fromisoformat(filtro.data_fim).toordinal())
+        
+        resultado = set(self.sem_data)
+        for dia in self.dias[inicio:fim]:
+            resultado |= self.posicoes_por_dia[dia]
+        return resultado
+    
+    def mais_recentes(self, limite: int) -> List[int]:
+        """Posições dos `limite` registros de data mais recente
+        
+        Percorre os dias do fim para o início; no mesmo dia, o registro
+        incluído por último vem primeiro. Registros sem data ficam no fim.
+        """
+        posicoes: List[int] = []
+        for dia in reversed(self.dias):
+            if len(posicoes) >= limite:
+                break
+            posicoes.extend(sorted(self.posicoes_por_dia[dia], reverse=True))
+        if len(posicoes) < limite:
+            posicoes.extend(sorted(self.sem_data, reverse=True))
+        return posicoes[:limite]
+
+class IndiceCampo(IndiceSecundario):
+    """Índice de igualdade (hash) valor do campo → posições"""
+    
+    campo = ""
+    
+    def __init__(self):
+        self.limpar()
+    
+    def limpar(self) -> None:
+        self.posicoes_por_valor: Dict[str, Set[int]] = {}
+    
+    def adicionar(self, item: Dict[str, Any], posicao: int) -> None:
+        valor = item.get(self.campo)
+        if valor is not None:
+            self.posicoes_por_valor.setdefault(str(valor), set()).add(posicao)
+    
+    def remover(self, item: Dict[str, Any], posicao: int) -> None:
+        valor = item.get(self.campo)
+        posicoes = self.posicoes_por_valor.get(str(valor)) if valor is not None else None
+        if posicoes is None:
+            return
+        posicoes.discard(posicao)
+        if not posicoes:
+            del self.posicoes_por_valor[str(valor)]
+    
+    def candidatos(self, filtro: Filtro) -> Optional[Set[int]]:
+        if self.campo not in filtro.igualdades:
+            return None
+        return self.posicoes_por_valor.get(filtro.igualdades[self.campo], set())
+
+class IndiceConta(IndiceCampo):
+    """Transações por conta_id"""
+    
+    campo = "conta_id"
+
+class IndiceOrdenado(IndiceSecundario):
+    """Chaves (campo, id) em ordem crescente, para paginação por cursor
+    
+    Uma página é uma busca binária pela chave do cursor seguida de uma
+    fatia da lista: O(log n + limite).
+    """
+    
+    def __init__(self, campo: str):
+        self.campo = campo
+        self.limpar()
+    
+    def limpar(self) -> None:
+        self.chaves: List[Tuple[str, str]] = []
+    
+    def carregar(self, itens: List[Optional[Dict[str, Any]]]) -> None:
+        # Ordenar uma vez evita o custo quadrático de n inserções ordenadas
+        self.chaves = sorted(chave_ordenacao(item, self.campo) for item in itens)
+    
+    def adicionar(self, item: Dict[str, Any], posicao: int) -> None:
+        chave = chave_ordenacao(item, self.campo)
+        if not self.chaves or chave >= self.chaves[-1]:
+            self.chaves.append(chave)
+        else:
+            bisect.insort(self.chaves, chave)
+    
+    def remover(self, item: Dict[str, Any], posicao: int) -> None:
+        chave = chave_ordenacao(item, self.campo)
+        indice = bisect.bisect_left(self.chaves, chave)
+        if indice < len(self.chaves) and self.chaves[indice] == chave:
+            del self.chaves[indice]
+    
+    def decrescentes(self, antes: Optional[Tuple[str, str]] = None) -> Iterator[Tuple[str, str]]:
+        """Chaves em ordem decrescente, começando pela primeira menor que `antes`"""
+        fim = len(self.chaves) if antes is None else bisect.bisect_left(self.chaves, antes)
+        for indice in range(fim - 1, -1, -1):
+            yield self.chaves[indice]
+
+def chave_ordenacao(item: Dict[str, Any], campo: str) -> Tuple[str, str]:
+    """Chave (valor do campo, id) da paginação; valores ausentes vêm por último"""
+    return (texto_campo(item.get(campo)) or "", str(item.get("id") or ""))
+
+def ordinal_data(item: Dict[str, Any]) -> Optional[int]:
+    """Ordinal do dia do registro, ou None se a data não for válida"""
+    try:
+        return date.fromisoformat(data_registro(item)).toordinal()
+    except ValueError:
+        return None
+
+class IndiceColecao:
+    """Índices em memória sobre a lista de uma coleção do documento
+    
+    Mantém id → posição na lista, permitindo buscar, atualizar e remover um
+    registro em tempo constante. A remoção deixa uma lápide (None) no lugar
+    do registro em vez de deslocar o restante da lista; as lápides são
+    eliminadas em lote quando passam a ocupar metade da lista.
+    
+    Os índices secundários informados são mantidos junto com o primário e
+    usados por consultar() para reduzir os candidatos de um filtro.
+    """
+    
+    def __init__(self, itens: List[Optional[Dict[str, Any]]], secundarios: Optional[List[IndiceSecundario]] = None):
+        self.itens = itens
+        self.secundarios = secundarios or []
+        self.posicoes: Dict[str, int] = {}
+        self.lapides = 0
+        self.reconstruir()
+    
+    def reconstruir(self) -> None:
+        """Elimina as lápides e recria os índices a partir da lista"""
+        if self.lapides or any(item is None for item in self.itens):
+            self.itens[:] = [item for item in self.itens if item is not None]
+        self.lapides = 0
+        self.posicoes = {
+            item.get("id"): posicao
+            for posicao, item in enumerate(self.itens)
+            if item.get("id") is not None
+        }
+        for secundario in self.secundarios:
+            secundario.carregar(self.itens)
+    
+    def __len__(self) -> int:
+        return len(self.itens) - self.lapides
+    
+    def registros(self) -> List[Dict[str, Any]]:
+        """Cópia da lista sem as lápides (segura para iterar fora do lock)"""
+        if not self.lapides:
+            return list(self.itens)
+        return [item for item in self.itens if item is not None]
+    
+    def consultar(self, filtro: Filtro) -> List[Dict[str, Any]]:
+        """Registros que atendem ao filtro, na ordem da coleção
+        
+        Usa o índice secundário mais seletivo disponível e aplica o
+        predicado completo apenas sobre os candidatos.
+        """
+        candidatos = self._candidatos(filtro)
+        if candidatos is None:
+            return [item for item in self.itens if item is not None and filtro.aceita(item)]
+        return [
+            item for item in (self.itens[posicao] for posicao in sorted(candidatos))
+            if filtro.aceita(item)
+        ]
+    
+    def existe(self, filtro: Filtro) -> bool:
+        """Verifica se algum registro atende ao filtro (para no primeiro)"""
+        candidatos = self._candidatos(filtro)
+        if candidatos is None:
+            return any(item is not None and filtro.aceita(item) for item in self.itens)
+        return any(filtro.aceita(self.itens[posicao]) for posicao in candidatos)
+    
+    def _candidatos(self, filtro: Filtro) -> Optional[Set[int]]:
+        melhores: Optional[Set[int]] = None
+        for secundario in self.secundarios:
+            candidatos = secundario.candidatos(filtro)
+            if candidatos is not None and (melhores is None or len(candidatos) < len(melhores)):
+                melhores = candidatos
+        return melhores
+    
+    def buscar(self, item_id: str) -> Optional[Dict[str, Any]]:
+        posicao = self.posicoes.get(item_id)
+        return self.itens[posicao] if posicao is not None else None
+    
+    def inserir(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Acrescenta o registro; um id já existente é substituído"""
+        posicao = self.posicoes.get(item.get("id"))
+        if posicao is not None:
+            self._desindexar(self.itens[posicao], posicao)
+            self.itens[posicao] = item
+        else:
+            posicao = len(self.itens)
+            self.itens.append(item)
+        self._indexar(item, posicao)
+        return item
+    
+    def atualizar(self, item_id: str, campos: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Substitui o registro por uma cópia com os campos alterados
+        
+        O dict anterior nunca é modificado: leitores que já o receberam
+        (e o serializam fora do lock) continuam vendo um registro íntegro.
+        """
+        posicao = self.posicoes.get(item_id)
+        if posicao is None:
+            return None
+        item = self.itens[posicao]
+        novo = {**item, **campos}
+        self._desindexar(item, posicao)
+        self.itens[posicao] = novo
+        self._indexar(novo, posicao)
+        return novo
+    
+    def remover(self, item_id: str) -> Optional[Dict[str, Any]]:
+        posicao = self.posicoes.get(item_id)
+        if posicao is None:
+            return None
+        item = self.itens[posicao]
+        self._desindexar(item, posicao)
+        self.itens[posicao] = None
+        self.lapides += 1
+        
+        if self.lapides >= LAPIDES_MINIMAS_COMPACTACAO and self.lapides * 2 >= len(self.itens):
+            self.reconstruir()
+        return item
+    
+    def _indexar(self, item: Dict[str, Any], posicao: int) -> None:
+        item_id = item.get("id")
+        if item_id is not None:
+            self.posicoes[item_id] = posicao
+        for secundario in self.secundarios:
+            secundario.adicionar(item, posicao)
+    
+    def _desindexar(self, item: Dict[str, Any], posicao: int) -> None:
+        self.posicoes.pop(item.get("id"), None)
+        for secundario in self.secundarios:
+            secundario.remover(item, posicao)
@@ -0,0 +1,32 @@
+import base64
+import json
+from typing import Optional, Tuple
+
+# Campo que ordena cada coleção paginada (junto com o id, em ordem decrescente)
+CAMPOS_PAGINACAO = {
+    "gastos": "data",
+    "receitas": "data",
+    "investimentos": "data_aplicacao",
+    "metas": "data_inicio",
+    "contracheques_processados": "created_at",
+    "extratos_bancarios_processados": "created_at",
+    "extratos_cartao_processados": "created_at"
+}
+
+def codificar_cursor(chave: Tuple[str, str]) -> str:
+    """Cursor opaco a partir da chave (valor, id) do último registro da página"""
+    texto = json.dumps(list(chave), ensure_ascii=False, separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decodificar_cursor(cursor: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Chave (valor, id) de um cursor; ValueError se ele não for válido"""
+    if not cursor:
+        return None
+    try:
+        texto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        valor, item_id = json.loads(texto)
+    except Exception:
+        raise ValueError("Cursor inválido")
+    if not isinstance(valor, str) or not isinstance(item_id, str):
+        raise ValueError("Cursor inválido")
+    return valor, item_id
@@ -1,7 +1,6 @@
 import base64
 import json
 import logging
-import fitz  # PyMuPDF
 from typing import Dict, Any, Optional, List
 from datetime import datetime, date
 import uuid
@@ -10,6 +9,7 @@ import openai
 import anthropic
 import google.generativeai as genai
 from ..core.config import settings
+from .extracao_pdf import FilaExtracaoCheia, extrator_pdf
 
 logger = logging.getLogger(__name__)
 
@@ -28,18 +28,12 @@ class ProcessamentoArquivos:
         if settings.GOOGLE_API_KEY:
             genai.configure(api_key=settings.GOOGLE_API_KEY)
     
-    def _extrair_texto_pdf(self, file_content: bytes) -> str:
-        """Extrai texto de um arquivo PDF"""
+    async def _extrair_texto_pdf(self, file_content: bytes) -> str:
+        """Extrai texto de um arquivo PDF (no pool de extração, fora do event loop)"""
         try:
-            doc = fitz.open(stream=file_content, filetype="pdf")
-            texto_completo = ""
-            
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                texto_completo += page.get_text()
-            
-            doc.close()
-            return texto_completo
+            return await extrator_pdf.extrair(file_content)
+        except (FilaExtracaoCheia, TimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Erro ao extrair texto do PDF: {e}")
             raise Exception(f"Erro ao processar PDF: {e}")
@@ -129,7 +123,7 @@ class ProcessamentoArquivos:
         try:
             # Extrair texto do arquivo
             if mime_type == 'application/pdf':
-                texto_extraido = self._extrair_texto_pdf(file_content)
+                texto_extraido = await self._extrair_texto_pdf(file_content)
             else:
                 raise Exception("Tipo de arquivo não suportado para contracheque")
             
@@ -194,6 +188,8 @@ ESTRUTURA DE RESPOSTA OBRIGATÓRIA:
                 logger.error(f"Erro ao parsear JSON: {json_error}")
                 raise Exception(f"Erro ao processar resposta da IA: {json_error}")
                 
+        except (FilaExtracaoCheia, TimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Erro no processamento do contracheque: {str(e)}")
             raise Exception(f"Erro no processamento: {str(e)}")
@@ -203,7 +199,7 @@ ESTRUTURA DE RESPOSTA OBRIGATÓRIA:
         try:
             # Extrair texto do arquivo
             if mime_type == 'application/pdf':
-                texto_extraido = self._extrair_texto_pdf(file_content)
+                texto_extraido = await self._extrair_texto_pdf(file_content)
             else:
                 raise Exception("Tipo de arquivo não suportado para extrato bancário")
             
@@ -275,6 +271,8 @@ ESTRUTURA DE RESPOSTA OBRIGATÓRIA:
                 logger.error(f"Erro ao parsear JSON: {json_error}")
                 raise Exception(f"Erro ao processar resposta da IA: {json_error}")
                 
+        except (FilaExtracaoCheia, TimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Erro no processamento do extrato bancário: {str(e)}")
             raise Exception(f"Erro no processamento: {str(e)}")
@@ -284,7 +282,7 @@ ESTRUTURA DE RESPOSTA OBRIGATÓRIA:
         try:
             # Extrair texto do arquivo
             if mime_type == 'application/pdf':
-                texto_extraido = self._extrair_texto_pdf(file_content)
+                texto_extraido = await self._extrair_texto_pdf(file_content)
             else:
                 raise Exception("Tipo de arquivo não suportado para extrato de cartão")
             
@@ -354,6 +352,8 @@ ESTRUTURA DE RESPOSTA OBRIGATÓRIA:
                 logger.error(f"Erro ao parsear JSON: {json_error}")
                 raise Exception(f"Erro ao processar resposta da IA: {json_error}")
                 
+        except (FilaExtracaoCheia, TimeoutError):
+            raise
         except Exception as e:
             logger.error(f"Erro no processamento do extrato de cartão: {str(e)}")
             raise Exception(f"Erro no processamento: {str(e)}")
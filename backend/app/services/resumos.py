@@ -0,0 +1,104 @@
+from datetime import date
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from .colunar import valor_em_centavos
+from .filtros import Filtro, texto_campo
+from .indices import IndiceSecundario, ordinal_data
+
+class ResumoMensal(IndiceSecundario):
+    """Totais materializados por mês de gastos ou receitas
+    
+    Para cada (ano, mês) guarda centavos e quantidade por categoria e por
+    conta_id, além do total de cada conta em todo o histórico. É atualizado
+    a cada inclusão, alteração e remoção (pelos ganchos de índice
+    secundário), então o resumo de um mês ou o saldo de uma conta é uma
+    consulta direta, sem percorrer as transações.
+    """
+    
+    def __init__(self):
+        self.limpar()
+    
+    def limpar(self) -> None:
+        self.meses: Dict[Tuple[int, int], Dict[str, Dict[Optional[str], List[int]]]] = {}
+        self.contas: Dict[str, List[int]] = {}
+    
+    def adicionar(self, item: Dict[str, Any], posicao: int = 0) -> None:
+        self._somar(item, 1)
+    
+    def remover(self, item: Dict[str, Any], posicao: int = 0) -> None:
+        self._somar(item, -1)
+    
+    def candidatos(self, filtro: Filtro) -> Optional[set]:
+        return None
+    
+    def _somar(self, item: Dict[str, Any], sinal: int) -> None:
+        centavos = valor_em_centavos(item.get("valor")) * sinal
+        conta_id = texto_campo(item.get("conta_id"))
+        if conta_id is not None:
+            _acumular(self.contas, conta_id, centavos, sinal)
+        
+        # Sem data válida o registro não pertence a nenhum mês
+        dia = ordinal_data(item)
+        if dia is None:
+            return
+        data = date.fromordinal(dia)
+        chave = (data.year, data.month)
+        
+        mes = self.meses.get(chave)
+        if mes is None:
+            mes = self.meses[chave] = {"categorias": {}, "contas": {}}
+        _acumular(mes["categorias"], texto_campo(item.get("categoria")), centavos, sinal)
+        _acumular(mes["contas"], conta_id, centavos, sinal)
+        if not mes["categorias"]:
+            del self.meses[chave]
+    
+    def mes(self, ano: int, mes: int, rotulo_ausente: Optional[str] = None) -> Dict[str, Any]:
+        """Total, quantidade e somas por categoria e por conta de um mês (em reais)"""
+        grupos = self.meses.get((ano, mes), {"categorias": {}, "contas": {}})
+        categorias = grupos["categorias"]
+        return {
+            "total": sum(totais[0] for totais in categorias.values()) / 100,
+            "quantidade": sum(totais[1] for totais in categorias.values()),
+            "por_categoria": _em_reais(categorias, rotulo_ausente),
+            "por_conta": _em_reais(grupos["contas"], rotulo_ausente)
+        }
+    
+    def conta(self, conta_id: str) -> Dict[str, Any]:
+        """Total e quantidade das transações de uma conta em todo o histórico"""
+        centavos, quantidade = self.contas.get(conta_id, (0, 0))
+        return {"total": centavos / 100, "quantidade": quantidade}
+    
+    def divergencias(self, outro: "ResumoMensal") -> List[str]:
+        """Meses (AAAA-MM) cujos totais diferem dos de outro resumo
+        
+        Diferenças nos totais por conta do histórico aparecem como "contas".
+        """
+        meses = [
+            f"{ano}-{mes:02d}"
+            for ano, mes in sorted(set(self.meses) | set(outro.meses))
+            if self.meses.get((ano, mes)) != outro.meses.get((ano, mes))
+        ]
+        if self.contas != outro.contas:
+            meses.append("contas")
+        return meses
+
+def construir_resumo(itens: Iterable[Dict[str, Any]]) -> ResumoMensal:
+    """Monta o resumo mensal a partir de uma lista de registros"""
+    resumo = ResumoMensal()
+    for item in itens:
+        resumo.adicionar(item)
+    return resumo
+
+def _em_reais(grupos: Dict[Optional[str], List[int]], rotulo_ausente: Optional[str]) -> Dict[Optional[str], float]:
+    somas: Dict[Optional[str], int] = {}
+    for valor, totais in grupos.items():
+        rotulo = rotulo_ausente if valor is None else valor
+        somas[rotulo] = somas.get(rotulo, 0) + totais[0]
+    return {rotulo: centavos / 100 for rotulo, centavos in somas.items()}
+
+def _acumular(grupos: Dict[Any, List[int]], chave: Any, centavos: int, sinal: int) -> None:
+    """Soma centavos e quantidade na chave, descartando-a quando zera"""
+    totais = grupos.setdefault(chave, [0, 0])
+    totais[0] += centavos
+    totais[1] += sinal
+    if not totais[1]:
+        del grupos[chave]
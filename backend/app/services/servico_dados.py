@@ -1,298 +1,715 @@
 import json
 import os
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+import stat
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Iterator, Set, Type, Union, Callable
 import logging
 from ..core.config import settings
+from .base_dados import ServicosDadosBase, COLECOES
+from .concorrencia import CommitEmGrupo
+from .diario_escrita import DiarioEscrita
+from .filtros import Filtro
+from .colunar import TabelaColunar
+from .indices import IndiceColecao, IndiceSecundario, IndiceData, IndiceConta, IndiceOrdenado
+from .paginacao import CAMPOS_PAGINACAO
+from .resumos import ResumoMensal
 
 logger = logging.getLogger(__name__)
 
-class ServicosDados:
-    def __init__(self):
-        self.data_file_path = settings.DATA_FILE_PATH
+# Índices secundários (e a tabela colunar e os resumos mensais) mantidos para cada coleção em cache
+INDICES_SECUNDARIOS: Dict[str, List[Type[IndiceSecundario]]] = {
+    "gastos": [IndiceData, IndiceConta, TabelaColunar, ResumoMensal],
+    "receitas": [IndiceData, IndiceConta, TabelaColunar, ResumoMensal],
+}
+
+class ServicosDados(ServicosDadosBase):
+    """Armazenamento em arquivo JSON (schemas.json)
+    
+    Com DATA_SHARDED_ENABLED cada chave do documento (gastos, receitas,
+    contracheques_processados...) fica no seu próprio arquivo, lido sob
+    demanda no primeiro acesso e regravado apenas quando é alterado.
+    
+    Os arquivos são sempre gravados de forma atômica (arquivo temporário,
+    fsync e rename). Fora do modo diário, mutações concorrentes são
+    aplicadas em memória sob o lock e persistidas por commit em grupo.
+    """
+    
+    def __init__(self, data_file_path: Optional[str] = None):
+        super().__init__()
+        self.data_file_path = data_file_path or settings.DATA_FILE_PATH
+        self.fragmentado = settings.DATA_SHARDED_ENABLED
+        self.diretorio_fragmentos = settings.DATA_SHARDS_DIR or os.path.join(
+            os.path.dirname(self.data_file_path), "colecoes"
+        )
+        
+        # Cache em memória do documento (write-through), por chave
+        self._cache: Dict[str, Any] = {}
+        self._cache_assinaturas: Dict[str, Optional[Tuple[int, int]]] = {}
+        self._versao = 0
+        self._cache_hits = 0
+        self._cache_misses = 0
+        
+        # Leituras rodam em paralelo sob o lock de leitura; o carregamento
+        # preguiçoso do cache durante uma leitura é serializado por este lock
+        self._lock_carga = threading.RLock()
+        
+        # Índices id → registro das coleções em cache
+        self._indices: Dict[str, IndiceColecao] = {}
+        
+        # Geração do estado em memória e a última geração gravada por arquivo:
+        # impede que um lote serializado antes de uma gravação mais nova a
+        # sobrescreva
+        self._geracao = 0
+        self._geracao_gravada: Dict[str, int] = {}
+        self._commit = CommitEmGrupo(self._gravar_lote, settings.DATA_GROUP_COMMIT_MS)
+        
+        # Diário de mutações (modo journal)
+        self._diario: Optional[DiarioEscrita] = None
+        self._chaves_sujas = set()
+        if settings.DATA_JOURNAL_ENABLED:
+            self._diario = DiarioEscrita(
+                f"{self.data_file_path}.journal",
+                fsync_lote=settings.DATA_JOURNAL_FSYNC_BATCH,
+                fsync_intervalo_ms=settings.DATA_JOURNAL_FSYNC_INTERVAL_MS
+            )
+        
         self._ensure_data_file_exists()
     
     def _ensure_data_file_exists(self):
         """Garante que o arquivo de dados existe"""
-        if not os.path.exists(self.data_file_path):
+        if self.fragmentado:
+            if not os.path.isdir(self.diretorio_fragmentos):
+                if os.path.exists(self.data_file_path):
+                    self._migrar_para_fragmentos()
+                else:
+                    self._create_initial_data_file()
+        elif not os.path.exists(self.data_file_path):
             os.makedirs(os.path.dirname(self.data_file_path), exist_ok=True)
             self._create_initial_data_file()
     
     def _create_initial_data_file(self):
         """Cria o arquivo de dados inicial"""
-        initial_data = {
-            "gastos": [],
-            "receitas": [],
-            "contas": [],
-            "categorias": {
-                "gastos": [
-                    {"id": "cat-gasto-1", "nome": "Alimentação", "tipo": "gasto", "cor": "#FF6B6B", "icone": "utensils", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-2", "nome": "Transporte", "tipo": "gasto", "cor": "#4ECDC4", "icone": "car", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-3", "nome": "Saúde", "tipo": "gasto", "cor": "#45B7D1", "icone": "heart", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-4", "nome": "Educação", "tipo": "gasto", "cor": "#F7DC6F", "icone": "book", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-5", "nome": "Lazer", "tipo": "gasto", "cor": "#BB8FCE", "icone": "smile", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-6", "nome": "Casa", "tipo": "gasto", "cor": "#85C1E9", "icone": "home", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-7", "nome": "Impostos e taxas públicas", "tipo": "gasto", "cor": "#EC7063", "icone": "file-text", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-8", "nome": "Empréstimos", "tipo": "gasto", "cor": "#F1948A", "icone": "credit-card", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-9", "nome": "Pensão alimentícia", "tipo": "gasto", "cor": "#D7BDE2", "icone": "heart-handshake", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-10", "nome": "Previdência pública", "tipo": "gasto", "cor": "#A9DFBF", "icone": "shield", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-11", "nome": "Previdência privada", "tipo": "gasto", "cor": "#A2D9CE", "icone": "umbrella", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-12", "nome": "Associação", "tipo": "gasto", "cor": "#F9E79F", "icone": "users", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-13", "nome": "Abate teto", "tipo": "gasto", "cor": "#FADBD8", "icone": "trending-down", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-gasto-14", "nome": "Outros", "tipo": "gasto", "cor": "#95A5A6", "icone": "more-horizontal", "created_at": "2024-01-01T00:00:00Z"}
-                ],
-                "receitas": [
-                    {"id": "cat-receita-1", "nome": "Salário", "tipo": "receita", "cor": "#27AE60", "icone": "briefcase", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-2", "nome": "Aulas/Palestras", "tipo": "receita", "cor": "#3498DB", "icone": "graduation-cap", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-3", "nome": "Investimentos", "tipo": "receita", "cor": "#E74C3C", "icone": "trending-up", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-4", "nome": "Vendas", "tipo": "receita", "cor": "#9B59B6", "icone": "shopping-bag", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-5", "nome": "Restituição de imposto de renda", "tipo": "receita", "cor": "#1ABC9C", "icone": "refund", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-6", "nome": "Reembolsos", "tipo": "receita", "cor": "#F39C12", "icone": "rotate-ccw", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-7", "nome": "Ações judiciais", "tipo": "receita", "cor": "#8E44AD", "icone": "scales", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-8", "nome": "Adicionais", "tipo": "receita", "cor": "#2ECC71", "icone": "plus", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-9", "nome": "Gratificação", "tipo": "receita", "cor": "#E67E22", "icone": "award", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-10", "nome": "Verbas indenizatórias", "tipo": "receita", "cor": "#16A085", "icone": "shield-check", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-11", "nome": "Resgates de investimentos", "tipo": "receita", "cor": "#C0392B", "icone": "piggy-bank", "created_at": "2024-01-01T00:00:00Z"},
-                    {"id": "cat-receita-12", "nome": "Outros", "tipo": "receita", "cor": "#95A5A6", "icone": "more-horizontal", "created_at": "2024-01-01T00:00:00Z"}
-                ]
-            },
-            "investimentos": [],
-            "contracheques_processados": [],
-            "extratos_bancarios_processados": [],
-            "extratos_cartao_processados": [],
-            "llm_configs": [],
-            "metas": [],
-            "gastos_recorrentes": [],
-            "compras_parceladas": [],
-            "backup_metadata": {
-                "last_backup": None,
-                "version": "1.0.0",
-                "total_records": 0
-            }
-        }
-        self.save_data(initial_data)
+        self.save_data(self._dados_iniciais())
     
-    def load_data(self) -> Dict[str, Any]:
-        """Carrega os dados do arquivo JSON"""
+    def _migrar_para_fragmentos(self) -> None:
+        """Divide um schemas.json existente em um arquivo por coleção"""
+        logger.info(f"Dividindo {self.data_file_path} em {self.diretorio_fragmentos}")
+        self.fragmentado = False
+        data = self.load_data()
+        self.fragmentado = True
+        self._cache = {}
+        self._cache_assinaturas = {}
+        self.save_data(data)
+    
+    # Arquivos e assinaturas
+    def _caminho_fragmento(self, chave: str) -> str:
+        return os.path.join(self.diretorio_fragmentos, f"{chave}.json")
+    
+    def _chaves_fragmentos(self) -> List[str]:
+        return sorted(
+            nome[:-len(".json")] for nome in os.listdir(self.diretorio_fragmentos)
+            if nome.endswith(".json")
+        )
+    
+    def _assinatura(self, caminho: str) -> Optional[Tuple[int, int]]:
+        """Retorna (mtime_ns, tamanho) do arquivo, ou None se não existir"""
         try:
-            with open(self.data_file_path, 'r', encoding='utf-8') as file:
-                return json.load(file)
+            info = os.stat(caminho)
         except FileNotFoundError:
-            logger.warning(f"Arquivo de dados não encontrado: {self.data_file_path}")
-            self._create_initial_data_file()
-            return self.load_data()
+            return None
+        return (info.st_mtime_ns, info.st_size)
+    
+    def _cache_valido(self, caminho: str) -> bool:
+        """Verifica se o arquivo (e o diário) não mudaram desde a leitura"""
+        if caminho not in self._cache_assinaturas:
+            return False
+        if self._cache_assinaturas[caminho] != self._assinatura(caminho):
+            return False
+        if self._diario and self._cache_assinaturas.get(self._diario.caminho) != self._assinatura(self._diario.caminho):
+            return False
+        return True
+    
+    def _registrar_assinaturas(self, caminhos: Iterable[str]) -> None:
+        for caminho in caminhos:
+            self._cache_assinaturas[caminho] = self._assinatura(caminho)
+        if self._diario:
+            self._cache_assinaturas[self._diario.caminho] = self._assinatura(self._diario.caminho)
+    
+    def _ler_json(self, caminho: str) -> Any:
+        try:
+            with open(caminho, 'r', encoding='utf-8') as file:
+                return json.load(file)
         except json.JSONDecodeError as e:
             logger.error(f"Erro ao decodificar JSON: {e}")
             raise Exception(f"Arquivo de dados corrompido: {e}")
     
-    def save_data(self, data: Dict[str, Any]) -> None:
-        """Salva os dados no arquivo JSON"""
-        try:
-            # Atualizar metadata de backup
-            data["backup_metadata"]["last_backup"] = datetime.now().isoformat()
-            data["backup_metadata"]["total_records"] = (
-                len(data.get("gastos", [])) + 
-                len(data.get("receitas", [])) + 
-                len(data.get("contas", [])) + 
-                len(data.get("investimentos", []))
-            )
+    # Leitura
+    def load_data(self) -> Dict[str, Any]:
+        """Carrega os dados do arquivo JSON
+        
+        O documento fica em cache na memória e só é relido do disco quando o
+        mtime/tamanho do arquivo ou o contador de versão mudam. Os valores
+        retornados são compartilhados com o cache: alterações devem ser
+        persistidas com save_data().
+        """
+        with self._lock.leitura():
+            if self.fragmentado:
+                chaves = set(self._chaves_fragmentos()) | set(self._cache)
+                return {chave: self._sem_lapides(chave, self._obter_chave(chave)) for chave in sorted(chaves)}
+            return self._documento_sem_lapides(self._carregar_documento())
+    
+    def _carregar_documento(self) -> Dict[str, Any]:
+        """Documento em cache (modo arquivo único), relido do disco se mudou"""
+        with self._lock.leitura():
+            if self._cache and self._cache_valido(self.data_file_path):
+                self._cache_hits += 1
+                return self._cache
             
-            with open(self.data_file_path, 'w', encoding='utf-8') as file:
-                json.dump(data, file, ensure_ascii=False, indent=2, default=str)
-        except Exception as e:
-            logger.error(f"Erro ao salvar dados: {e}")
-            raise Exception(f"Erro ao salvar dados: {e}")
+            with self._lock_carga:
+                if self._cache and self._cache_valido(self.data_file_path):
+                    return self._cache
+                
+                self._cache_misses += 1
+                if os.path.exists(self.data_file_path):
+                    data = self._ler_json(self.data_file_path)
+                else:
+                    # O arquivo é recriado na próxima gravação
+                    logger.warning(f"Arquivo de dados não encontrado: {self.data_file_path}")
+                    data = self._dados_iniciais()
+                if self._diario:
+                    self._reaplicar_diario(data)
+                
+                self._cache = data
+                self._registrar_assinaturas([self.data_file_path])
+                self._marcar_alteracao(data)
+                return data
     
-    # Métodos para gastos
-    def get_gastos(self, filtros: Optional[Dict] = None) -> List[Dict]:
-        """Obtém lista de gastos com filtros opcionais"""
-        data = self.load_data()
-        gastos = data.get("gastos", [])
-        
-        if filtros:
-            # Implementar filtros aqui (por data, categoria, etc.)
-            pass
+    def _obter_chave(self, chave: str) -> Any:
+        with self._lock.leitura():
+            if not self.fragmentado:
+                return self._carregar_documento().get(chave)
+            
+            caminho = self._caminho_fragmento(chave)
+            if chave in self._cache and self._cache_valido(caminho):
+                self._cache_hits += 1
+                return self._cache[chave]
+            
+            with self._lock_carga:
+                if chave in self._cache and self._cache_valido(caminho):
+                    return self._cache[chave]
+                
+                self._cache_misses += 1
+                data = {chave: self._ler_json(caminho)} if os.path.exists(caminho) else {}
+                if self._diario:
+                    self._reaplicar_diario(data, chave)
+                
+                self._cache[chave] = data.get(chave)
+                self._registrar_assinaturas([caminho])
+                self._marcar_alteracao((chave,))
+                return self._cache[chave]
+    
+    def _chaves_avulsas(self) -> List[str]:
+        with self._lock.leitura():
+            if self.fragmentado:
+                chaves = set(self._chaves_fragmentos()) | set(self._cache)
+            else:
+                chaves = set(self._carregar_documento())
+        return sorted(chaves - set(COLECOES))
+    
+    def versao_colecoes(self, colecoes: Optional[Iterable[str]] = None) -> Tuple[str, float]:
+        """Confere antes se os arquivos mudaram fora deste processo
         
-        return gastos
+        Um arquivo alterado é relido aqui, e a releitura avança a versão.
+        """
+        with self._lock.leitura():
+            if not self.fragmentado:
+                if not self._cache_valido(self.data_file_path):
+                    self._carregar_documento()
+            else:
+                for chave in (set(self._cache) if colecoes is None else colecoes):
+                    if not self._cache_valido(self._caminho_fragmento(chave)):
+                        self._obter_chave(chave)
+            return super().versao_colecoes(colecoes)
     
-    def create_gasto(self, gasto_data: Dict) -> Dict:
-        """Cria um novo gasto"""
-        data = self.load_data()
-        gasto_data["created_at"] = datetime.now().isoformat()
-        data["gastos"].append(gasto_data)
-        self.save_data(data)
-        return gasto_data
+    def _indice(self, colecao: str) -> IndiceColecao:
+        """Índice da coleção, (re)construído quando a lista em cache muda"""
+        with self._lock.leitura():
+            itens = self._obter_chave(colecao)
+            indice = self._indices.get(colecao)
+            if indice is not None and indice.itens is itens:
+                return indice
+            
+            with self._lock_carga:
+                itens = self._obter_chave(colecao)
+                indice = self._indices.get(colecao)
+                if indice is not None and indice.itens is itens:
+                    return indice
+                
+                if itens is None:
+                    itens = []
+                    self._cache[colecao] = itens
+                    if self.fragmentado:
+                        self._registrar_assinaturas([self._caminho_fragmento(colecao)])
+                secundarios = [classe() for classe in INDICES_SECUNDARIOS.get(colecao, [])]
+                if colecao in CAMPOS_PAGINACAO:
+                    secundarios.append(IndiceOrdenado(CAMPOS_PAGINACAO[colecao]))
+                indice = IndiceColecao(itens, secundarios)
+                self._indices[colecao] = indice
+                return indice
     
-    def update_gasto(self, gasto_id: str, gasto_data: Dict) -> Optional[Dict]:
-        """Atualiza um gasto existente"""
-        data = self.load_data()
-        gastos = data.get("gastos", [])
+    def _sem_lapides(self, chave: str, valor: Any) -> Any:
+        """Valor da chave sem as lápides deixadas por remoções"""
+        indice = self._indices.get(chave)
+        if indice is not None and indice.itens is valor and indice.lapides:
+            return indice.registros()
+        return valor
+    
+    def _documento_sem_lapides(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {chave: self._sem_lapides(chave, valor) for chave, valor in data.items()}
+    
+    def _listar(self, colecao: str) -> List[Dict]:
+        return self._indice(colecao).registros()
+    
+    def _buscar(self, colecao: str, item_id: str) -> Optional[Dict]:
+        return self._indice(colecao).buscar(item_id)
+    
+    def _consultar(self, colecao: str, filtro: Filtro) -> List[Dict]:
+        with self._lock.leitura():
+            return self._indice(colecao).consultar(filtro)
+    
+    def _existe(self, colecao: str, filtro: Filtro) -> bool:
+        with self._lock.leitura():
+            return self._indice(colecao).existe(filtro)
+    
+    def _secundario(self, colecao: str, classe: Type[IndiceSecundario]) -> Optional[IndiceSecundario]:
+        return next((s for s in self._indice(colecao).secundarios if isinstance(s, classe)), None)
+    
+    def tabela_colunar(self, colecao: str) -> TabelaColunar:
+        """Cópia da tabela colunar mantida junto com os índices da coleção"""
+        with self._lock.leitura():
+            tabela = self._secundario(colecao, TabelaColunar)
+            if tabela is None:
+                return super().tabela_colunar(colecao)
+            return tabela.copiar()
+    
+    def _pagina(self, colecao: str, limite: int, antes: Optional[Tuple[str, str]], filtro: Filtro) -> List[Dict]:
+        with self._lock.leitura():
+            indice = self._indice(colecao)
+            ordenado = self._secundario(colecao, IndiceOrdenado)
+            if ordenado is None:
+                return super()._pagina(colecao, limite, antes, filtro)
+            
+            # Ordenando pela data, o período do filtro também limita o percurso
+            por_data = ordenado.campo == "data"
+            if por_data and filtro.data_fim is not None:
+                teto = (filtro.data_fim + "\uffff", "")
+                antes = min(antes, teto) if antes is not None else teto
+            
+            itens: List[Dict] = []
+            for valor, item_id in ordenado.decrescentes(antes):
+                if por_data and filtro.data_inicio is not None and valor[:10] < filtro.data_inicio:
+                    break
+                item = indice.buscar(item_id)
+                if item is not None and filtro.aceita(item):
+                    itens.append(item)
+                    if len(itens) >= limite:
+                        break
+            return itens
+    
+    def _recentes(self, colecao: str, limite: int) -> List[Dict]:
+        with self._lock.leitura():
+            indice = self._indice(colecao)
+            datas = self._secundario(colecao, IndiceData)
+            if datas is None:
+                return super()._recentes(colecao, limite)
+            return [indice.itens[posicao] for posicao in datas.mais_recentes(limite)]
+    
+    def _resumo_mensal(self, colecao: str) -> ResumoMensal:
+        resumo = self._secundario(colecao, ResumoMensal)
+        if resumo is None:
+            return super()._resumo_mensal(colecao)
+        return resumo
+    
+    def _substituir_resumo(self, colecao: str, resumo: ResumoMensal) -> None:
+        secundarios = self._indice(colecao).secundarios
+        for posicao, secundario in enumerate(secundarios):
+            if isinstance(secundario, ResumoMensal):
+                secundarios[posicao] = resumo
+    
+    def _reaplicar_diario(self, data: Dict[str, Any], chave: Optional[str] = None) -> None:
+        """Reaplica sobre o snapshot os registros do diário ainda não compactados
         
-        for i, gasto in enumerate(gastos):
-            if gasto.get("id") == gasto_id:
-                gastos[i].update(gasto_data)
-                self.save_data(data)
-                return gastos[i]
+        Com `chave`, apenas os registros daquela coleção são reaplicados.
+        """
+        if self.fragmentado:
+            caminho_metadata = self._caminho_fragmento("backup_metadata")
+            metadata = self._ler_json(caminho_metadata) if os.path.exists(caminho_metadata) else {}
+        else:
+            metadata = data.get("backup_metadata", {})
+        seq_snapshot = metadata.get("journal_seq", 0)
+        self._diario.seq = max(self._diario.seq, seq_snapshot)
         
-        return None
-    
-    def delete_gasto(self, gasto_id: str) -> bool:
-        """Remove um gasto"""
-        data = self.load_data()
-        gastos = data.get("gastos", [])
+        reaplicados = 0
+        indices: Dict[str, IndiceColecao] = {}
+        for registro in _expandir_lotes(self._diario.ler(seq_snapshot)):
+            colecao = registro["colecao"]
+            if chave is not None and colecao != chave:
+                continue
+            if colecao not in indices:
+                indices[colecao] = IndiceColecao(data.setdefault(colecao, []))
+            self._aplicar_registro(indices[colecao], registro)
+            reaplicados += 1
         
-        for i, gasto in enumerate(gastos):
-            if gasto.get("id") == gasto_id:
-                del gastos[i]
-                self.save_data(data)
-                return True
+        for indice in indices.values():
+            indice.reconstruir()
         
-        return False
+        if reaplicados:
+            logger.info(f"Diário reaplicado: {reaplicados} registros após seq {seq_snapshot}")
     
-    # Métodos para receitas
-    def get_receitas(self, filtros: Optional[Dict] = None) -> List[Dict]:
-        """Obtém lista de receitas com filtros opcionais"""
-        data = self.load_data()
-        receitas = data.get("receitas", [])
-        
-        if filtros:
-            # Implementar filtros aqui
-            pass
+    # Escrita
+    def save_data(self, data: Dict[str, Any]) -> None:
+        """Salva os dados no arquivo JSON
         
-        return receitas
+        No modo diário, gravar o documento inteiro equivale a uma compactação:
+        o snapshot registra a última sequência incorporada e o diário é esvaziado.
+        """
+        try:
+            with self._lock:
+                self._geracao += 1
+                self._atualizar_metadata(data)
+                if self._diario:
+                    self._diario.sincronizar()
+                    data["backup_metadata"]["journal_seq"] = self._diario.seq
+                
+                if self.fragmentado:
+                    os.makedirs(self.diretorio_fragmentos, exist_ok=True)
+                    for chave in self._chaves_fragmentos():
+                        if chave not in data:
+                            os.remove(self._caminho_fragmento(chave))
+                    self._cache = dict(data)
+                    self._gravar(list(data.keys()))
+                else:
+                    self._cache = data
+                    self._gravar()
+                
+                if self._diario:
+                    self._diario.truncar()
+                    self._chaves_sujas.clear()
+                    self._registrar_assinaturas([])
+                self._marcar_alteracao(set(data) | set(COLECOES))
+        except Exception as e:
+            self.invalidar_cache()
+            logger.error(f"Erro ao salvar dados: {e}")
+            raise Exception(f"Erro ao salvar dados: {e}")
     
-    def create_receita(self, receita_data: Dict) -> Dict:
-        """Cria uma nova receita"""
-        data = self.load_data()
-        receita_data["created_at"] = datetime.now().isoformat()
-        data["receitas"].append(receita_data)
-        self.save_data(data)
-        return receita_data
+    def _gravar(self, chaves: Optional[Iterable[str]] = None) -> None:
+        """Grava o cache em disco (chamado com o lock adquirido)
+        
+        No modo fragmentado apenas os arquivos das `chaves` informadas são
+        regravados; caso contrário o documento inteiro é gravado.
+        """
+        geracao = self._geracao
+        temporarios = self._escrever_temporarios(self._serializar(chaves))
+        self._publicar(temporarios, geracao)
     
-    def update_receita(self, receita_id: str, receita_data: Dict) -> Optional[Dict]:
-        """Atualiza uma receita existente"""
-        data = self.load_data()
-        receitas = data.get("receitas", [])
+    def _gravar_lote(self, chaves: Set[str]) -> None:
+        """Grava um lote do commit em grupo (chamado pela thread líder)
         
-        for i, receita in enumerate(receitas):
-            if receita.get("id") == receita_id:
-                receitas[i].update(receita_data)
-                self.save_data(data)
-                return receitas[i]
+        Só a serialização e o rename acontecem sob o lock; a escrita e o
+        fsync dos arquivos temporários ficam fora dele.
+        """
+        try:
+            with self._lock.leitura(), self._lock_carga:
+                geracao = self._geracao
+                conteudos = self._serializar(chaves)
+            temporarios = self._escrever_temporarios(conteudos)
+            with self._lock:
+                self._publicar(temporarios, geracao)
+        except Exception as e:
+            self.invalidar_cache()
+            logger.error(f"Erro ao salvar dados: {e}")
+            raise Exception(f"Erro ao salvar dados: {e}")
+    
+    def _serializar(self, chaves: Optional[Iterable[str]]) -> List[Tuple[str, str]]:
+        """Retorna (caminho, conteúdo JSON) dos arquivos a gravar"""
+        if not self.fragmentado:
+            if not self._cache:
+                return []
+            documento = self._documento_sem_lapides(self._cache)
+            return [(self.data_file_path, json.dumps(documento, ensure_ascii=False, indent=2, default=str))]
         
-        return None
+        # backup_metadata por último: ela registra a sequência do diário
+        return [
+            (self._caminho_fragmento(chave), json.dumps(self._sem_lapides(chave, self._cache[chave]), ensure_ascii=False, indent=2, default=str))
+            for chave in sorted(chaves or [], key=lambda c: c == "backup_metadata")
+            if chave in self._cache
+        ]
     
-    def delete_receita(self, receita_id: str) -> bool:
-        """Remove uma receita"""
-        data = self.load_data()
-        receitas = data.get("receitas", [])
+    def _escrever_temporarios(self, conteudos: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+        """Grava cada conteúdo num arquivo temporário ao lado do destino"""
+        temporarios = []
+        try:
+            for caminho, conteudo in conteudos:
+                temporarios.append((caminho, _escrever_temporario(caminho, conteudo)))
+        except Exception:
+            for _, temporario in temporarios:
+                _remover_silenciosamente(temporario)
+            raise
+        return temporarios
+    
+    def _publicar(self, temporarios: List[Tuple[str, str]], geracao: int) -> None:
+        """Substitui os arquivos pelos temporários (rename atômico)
         
-        for i, receita in enumerate(receitas):
-            if receita.get("id") == receita_id:
-                del receitas[i]
-                self.save_data(data)
-                return True
+        Um arquivo já gravado com uma geração mais nova não é sobrescrito.
+        """
+        caminhos = []
+        for caminho, temporario in temporarios:
+            if geracao < self._geracao_gravada.get(caminho, -1):
+                _remover_silenciosamente(temporario)
+                continue
+            os.replace(temporario, caminho)
+            self._geracao_gravada[caminho] = geracao
+            caminhos.append(caminho)
         
-        return False
+        for diretorio in {os.path.dirname(caminho) for caminho in caminhos}:
+            _sincronizar_diretorio(diretorio)
+        
+        # Write-through: o cache passa a refletir o que foi gravado
+        self._versao += 1
+        self._registrar_assinaturas(caminhos)
     
-    # Métodos para contas
-    def get_contas(self) -> List[Dict]:
-        """Obtém lista de contas"""
-        data = self.load_data()
-        return data.get("contas", [])
+    def _metadata_atualizada(self) -> Dict[str, Any]:
+        """Atualiza backup_metadata no cache a partir das coleções principais"""
+        metadata = self._obter_chave("backup_metadata")
+        if metadata is None:
+            metadata = {}
+            self._cache["backup_metadata"] = metadata
+        self._atualizar_metadata({
+            "backup_metadata": metadata,
+            "gastos": self._indice("gastos"),
+            "receitas": self._indice("receitas"),
+            "contas": self._indice("contas"),
+            "investimentos": self._indice("investimentos")
+        })
+        return metadata
     
-    def create_conta(self, conta_data: Dict) -> Dict:
-        """Cria uma nova conta"""
-        data = self.load_data()
-        conta_data["created_at"] = datetime.now().isoformat()
-        data["contas"].append(conta_data)
-        self.save_data(data)
-        return conta_data
+    def compactar(self) -> None:
+        """Incorpora o diário ao snapshot (sem efeito fora do modo diário)"""
+        if not self._diario:
+            return
+        with self._lock:
+            if not self.fragmentado:
+                self.save_data(self.load_data())
+                return
+            
+            # No modo fragmentado só as coleções alteradas desde a última
+            # compactação são regravadas
+            try:
+                # Coleções com registros de execuções anteriores ainda não
+                # carregadas também precisam ser incorporadas
+                metadata = self._metadata_atualizada()
+                pendentes = {r["colecao"] for r in _expandir_lotes(self._diario.ler(metadata.get("journal_seq", 0)))}
+                for chave in pendentes:
+                    self._indice(chave)
+                self._chaves_sujas |= pendentes
+                
+                self._diario.sincronizar()
+                metadata["journal_seq"] = self._diario.seq
+                self._gravar(list(self._chaves_sujas | {"backup_metadata"}))
+                self._diario.truncar()
+                self._chaves_sujas.clear()
+                self._registrar_assinaturas([])
+            except Exception as e:
+                self.invalidar_cache()
+                logger.error(f"Erro ao compactar diário: {e}")
+                raise Exception(f"Erro ao salvar dados: {e}")
     
-    def update_conta(self, conta_id: str, conta_data: Dict) -> Optional[Dict]:
-        """Atualiza uma conta existente"""
-        data = self.load_data()
-        contas = data.get("contas", [])
-        
-        for i, conta in enumerate(contas):
-            if conta.get("id") == conta_id:
-                contas[i].update(conta_data)
-                self.save_data(data)
-                return contas[i]
-        
-        return None
+    def fechar(self) -> None:
+        """Compacta e fecha o diário no encerramento da aplicação"""
+        if not self._diario:
+            return
+        with self._lock:
+            if self._diario.registros_desde_compactacao:
+                self.compactar()
+            self._diario.fechar()
     
-    def delete_conta(self, conta_id: str) -> bool:
-        """Remove uma conta"""
-        data = self.load_data()
-        contas = data.get("contas", [])
-        
-        for i, conta in enumerate(contas):
-            if conta.get("id") == conta_id:
-                del contas[i]
-                self.save_data(data)
-                return True
-        
-        return False
+    def invalidar_cache(self) -> None:
+        """Força a releitura dos arquivos no próximo acesso"""
+        with self._lock:
+            self._versao += 1
+            self._cache = {}
+            self._cache_assinaturas = {}
+            self._indices = {}
     
-    # Métodos para categorias
-    def get_categorias(self) -> Dict[str, List[Dict]]:
-        """Obtém todas as categorias"""
-        data = self.load_data()
-        return data.get("categorias", {"gastos": [], "receitas": []})
+    def estatisticas_cache(self) -> Dict[str, Any]:
+        """Retorna os contadores de acerto/falha do cache"""
+        with self._lock.leitura():
+            total = self._cache_hits + self._cache_misses
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "taxa_acerto": round(self._cache_hits / total, 4) if total else 0.0,
+                "versao": self._versao
+            }
     
-    # Métodos para investimentos
-    def get_investimentos(self) -> List[Dict]:
-        """Obtém lista de investimentos"""
-        data = self.load_data()
-        return data.get("investimentos", [])
+    # Primitivas de mutação
+    def _aplicar_registro(self, indice: IndiceColecao, registro: Dict[str, Any]) -> Optional[Dict]:
+        """Aplica um registro de mutação a uma coleção em memória
+        
+        Retorna o item afetado, ou None se o id não foi encontrado. Uma
+        inserção de id já existente substitui o item: ao reaplicar o diário no
+        modo fragmentado o snapshot de uma coleção pode já conter registros
+        posteriores à sequência gravada na backup_metadata.
+        """
+        op = registro["op"]
+        if op == "inserir":
+            return indice.inserir(registro["dados"])
+        if op == "atualizar":
+            return indice.atualizar(registro["id"], registro["dados"])
+        if op == "remover":
+            return indice.remover(registro["id"])
+        raise ValueError(f"Operação de diário desconhecida: {op}")
     
-    def create_investimento(self, investimento_data: Dict) -> Dict:
-        """Cria um novo investimento"""
-        data = self.load_data()
-        investimento_data["created_at"] = datetime.now().isoformat()
-        data["investimentos"].append(investimento_data)
-        self.save_data(data)
-        return investimento_data
+    def _mutar(self, registro: Dict[str, Any]) -> Optional[Dict]:
+        """Aplica uma mutação ao documento e a persiste
+        
+        No modo diário a mutação é anexada ao log; caso contrário o arquivo
+        afetado (o documento inteiro, ou só a coleção no modo fragmentado) é
+        regravado por commit em grupo, depois de liberado o lock. A aplicação
+        em memória é serializada pelo lock, então nenhuma atualização
+        concorrente se perde.
+        """
+        chave = registro["colecao"]
+        with self._lock:
+            if registro["op"] == "inserir":
+                registro["dados"].setdefault("versao", 1)
+            elif registro["op"] == "atualizar":
+                # Resolve campos calculados e confere a versão esperada
+                item = self._buscar(chave, registro["id"])
+                if item is None:
+                    return None
+                registro["dados"] = self._preparar_atualizacao(chave, item, registro["dados"])
+            
+            resultado = self._aplicar_registro(self._indice(chave), registro)
+            if resultado is None:
+                return None
+            pendentes = self._registrar_mutacoes([registro])
+        
+        if pendentes:
+            self._commit.solicitar(pendentes)
+        return resultado
     
-    # Métodos para processamento de documentos
-    def save_contracheque_processado(self, contracheque_data: Dict) -> Dict:
-        """Salva um contracheque processado"""
-        data = self.load_data()
-        contracheque_data["created_at"] = datetime.now().isoformat()
-        data["contracheques_processados"].append(contracheque_data)
-        self.save_data(data)
-        return contracheque_data
+    def _aplicar_operacoes(self, operacoes: List[Dict[str, Any]]) -> List[Any]:
+        """Aplica um lote em memória e o persiste numa única gravação
+        
+        No modo diário o lote inteiro vira um só registro (uma linha), então
+        uma queda no meio da gravação o descarta por completo ao reaplicar.
+        """
+        with self._lock:
+            registros = self._preparar_operacoes(operacoes)
+            try:
+                resultados = []
+                for registro in registros:
+                    resultado = self._aplicar_registro(self._indice(registro["colecao"]), registro)
+                    resultados.append(True if registro["op"] == "remover" else resultado)
+            except Exception:
+                # Lote aplicado pela metade em memória: volta ao estado gravado
+                self.invalidar_cache()
+                raise
+            pendentes = self._registrar_mutacoes(registros)
+        
+        if pendentes:
+            self._commit.solicitar(pendentes)
+        return resultados
     
-    def save_extrato_bancario_processado(self, extrato_data: Dict) -> Dict:
-        """Salva um extrato bancário processado"""
-        data = self.load_data()
-        extrato_data["created_at"] = datetime.now().isoformat()
-        data["extratos_bancarios_processados"].append(extrato_data)
-        self.save_data(data)
-        return extrato_data
+    def _registrar_mutacoes(self, registros: List[Dict[str, Any]]) -> Optional[Set[str]]:
+        """Registra mutações já aplicadas em memória (chamado com o lock de escrita)
+        
+        Anexa-as ao diário, ou retorna as chaves a gravar pelo commit em
+        grupo (fora do lock).
+        """
+        chaves = {registro["colecao"] for registro in registros}
+        self._marcar_alteracao(chaves | {"backup_metadata"})
+        
+        try:
+            self._metadata_atualizada()
+            self._geracao += 1
+            if self._diario:
+                self._diario.anexar(registros if len(registros) == 1 else [{"op": "lote", "registros": registros}])
+                self._chaves_sujas |= chaves
+                self._versao += 1
+                self._registrar_assinaturas([])
+        except Exception as e:
+            self.invalidar_cache()
+            logger.error(f"Erro ao salvar dados: {e}")
+            raise Exception(f"Erro ao salvar dados: {e}")
+        
+        if not self._diario:
+            return chaves | {"backup_metadata"}
+        if self._diario.registros_desde_compactacao >= settings.DATA_JOURNAL_COMPACT_RECORDS:
+            self.compactar()
+        return None
     
-    def save_extrato_cartao_processado(self, extrato_data: Dict) -> Dict:
-        """Salva um extrato de cartão processado"""
-        data = self.load_data()
-        extrato_data["created_at"] = datetime.now().isoformat()
-        data["extratos_cartao_processados"].append(extrato_data)
-        self.save_data(data)
-        return extrato_data
+    def _inserir(self, colecao: str, item: Dict) -> Dict:
+        return self._mutar({"op": "inserir", "colecao": colecao, "dados": item})
     
-    # Métodos para configurações LLM
-    def get_llm_configs(self) -> List[Dict]:
-        """Obtém configurações de LLM"""
-        data = self.load_data()
-        return data.get("llm_configs", [])
+    def _atualizar(self, colecao: str, item_id: str, campos: Union[Dict, Callable[[Dict], Dict]]) -> Optional[Dict]:
+        return self._mutar({"op": "atualizar", "colecao": colecao, "id": item_id, "dados": campos})
     
-    def save_llm_config(self, config_data: Dict) -> Dict:
-        """Salva configuração de LLM"""
-        data = self.load_data()
-        config_data["created_at"] = datetime.now().isoformat()
-        data["llm_configs"].append(config_data)
-        self.save_data(data)
-        return config_data
+    def _remover(self, colecao: str, item_id: str) -> bool:
+        return self._mutar({"op": "remover", "colecao": colecao, "id": item_id}) is not None
+
+def _expandir_lotes(registros: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Registros do diário com os lotes de uma unidade de trabalho desdobrados"""
+    for registro in registros:
+        if registro["op"] == "lote":
+            yield from registro["registros"]
+        else:
+            yield registro
+
+def _escrever_temporario(caminho: str, conteudo: str) -> str:
+    """Grava o conteúdo (com fsync) num arquivo temporário no diretório do destino"""
+    diretorio = os.path.dirname(caminho) or "."
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix=f"{os.path.basename(caminho)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(conteudo)
+            file.flush()
+            os.fsync(file.fileno())
+        # mkstemp cria o arquivo com permissão 0600: preserva a do destino
+        modo = stat.S_IMODE(os.stat(caminho).st_mode) if os.path.exists(caminho) else 0o644
+        os.chmod(temporario, modo)
+    except Exception:
+        _remover_silenciosamente(temporario)
+        raise
+    return temporario
+
+def _sincronizar_diretorio(diretorio: str) -> None:
+    """fsync do diretório para tornar o rename durável (sem efeito no Windows)"""
+    try:
+        fd = os.open(diretorio or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+def _remover_silenciosamente(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except OSError:
+        pass
+
+def criar_servico_dados() -> ServicosDadosBase:
+    """Cria o serviço de dados conforme settings.STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "sqlite":
+        from .servico_dados_sqlite import ServicosDadosSQLite
+        return ServicosDadosSQLite()
+    return ServicosDados()
 
 # Instância global do serviço
-servico_dados = ServicosDados()
+servico_dados = criar_servico_dados()
@@ -0,0 +1,81 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Iterable, List, Optional
+from ..core.config import settings
+from .base_dados import ServicosDadosBase
+from .concorrencia import VooUnico, chave_chamada
+from .servico_dados import servico_dados
+
+# Métodos de leitura além dos get_*: chamadas idênticas simultâneas são coalescidas
+LEITURAS = {
+    "load_data", "conta_em_uso", "paginar", "agregar_transacoes", "agregar_investimentos",
+    "agregar_metas", "resumo_mensal", "totais_conta", "relatorio_periodo", "dashboard"
+}
+
+class ServicosDadosAssincrono:
+    """API assíncrona do serviço de dados
+    
+    Expõe os mesmos métodos públicos do serviço síncrono (get_gastos,
+    create_gasto, load_data...) como corrotinas executadas num pool de
+    threads dedicado, de forma que a leitura/gravação dos arquivos e a
+    (de)serialização JSON não bloqueiem o event loop.
+    
+    Leituras idênticas e simultâneas compartilham uma única execução. A
+    versão do documento faz parte da chave, então uma leitura iniciada
+    depois de uma gravação nunca recebe o resultado de antes dela.
+    """
+    
+    def __init__(self, servico: ServicosDadosBase, max_workers: Optional[int] = None):
+        self.servico = servico
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or settings.DATA_EXECUTOR_WORKERS,
+            thread_name_prefix="servico-dados"
+        )
+        self.voo_unico = VooUnico()
+    
+    async def executar(self, funcao: Callable[..., Any], *args, **kwargs) -> Any:
+        """Executa uma função síncrona no pool do serviço de dados"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(funcao, *args, **kwargs))
+    
+    async def em_lotes(self, itens: Iterable[Any], tamanho: Optional[int] = None) -> AsyncIterator[List[Any]]:
+        """Consome um iterável síncrono (ex.: servico.iterar) no pool, lote a lote
+        
+        Cada lote é produzido numa chamada ao pool, então geradores que leem
+        o armazenamento não bloqueiam o event loop.
+        """
+        iterador = iter(itens)
+        tamanho = tamanho or settings.STREAMING_LOTE
+        while True:
+            lote = await self.executar(lambda: list(islice(iterador, tamanho)))
+            if not lote:
+                return
+            yield lote
+    
+    def __getattr__(self, nome: str) -> Any:
+        if nome.startswith("_"):
+            raise AttributeError(nome)
+        
+        atributo = getattr(self.servico, nome)
+        if not callable(atributo):
+            return atributo
+        
+        leitura = nome in LEITURAS or nome.startswith("get_")
+        
+        @functools.wraps(atributo)
+        async def metodo(*args, **kwargs):
+            chave = chave_chamada(nome, args, kwargs, self.servico.versao_documento()) if leitura else None
+            if chave is None:
+                return await self.executar(atributo, *args, **kwargs)
+            return await self.voo_unico.executar(chave, lambda: self.executar(atributo, *args, **kwargs))
+        
+        return metodo
+    
+    def encerrar(self) -> None:
+        """Aguarda as operações pendentes e encerra o pool de threads"""
+        self._executor.shutdown(wait=True)
+
+# Instância global do serviço assíncrono
+servico_dados_async = ServicosDadosAssincrono(servico_dados)
@@ -0,0 +1,418 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Dict, Any, List, Optional, Tuple, Union, Callable
+import logging
+from ..core.config import settings
+from .base_dados import ServicosDadosBase, COLECOES
+from .colunar import TabelaColunar, construir_tabela
+from .indices import LAPIDES_MINIMAS_COMPACTACAO
+from .resumos import ResumoMensal
+from .filtros import Filtro
+from .paginacao import CAMPOS_PAGINACAO
+
+logger = logging.getLogger(__name__)
+
+# Colunas indexáveis extraídas de cada registro (o registro completo fica em "dados")
+COLUNAS_TRANSACAO = ["data", "categoria", "conta_id", "forma_pagamento", "valor"]
+COLUNAS = {
+    "gastos": COLUNAS_TRANSACAO,
+    "receitas": COLUNAS_TRANSACAO,
+}
+INDICES = {
+    "gastos": ["data", "categoria", "conta_id", "forma_pagamento"],
+    "receitas": ["data", "categoria", "conta_id", "forma_pagamento"],
+}
+
+class ServicosDadosSQLite(ServicosDadosBase):
+    """Armazenamento em SQLite (modo WAL) com a mesma interface de ServicosDados
+    
+    Cada coleção é uma tabela com o registro serializado em "dados" e, para
+    gastos e receitas, colunas indexadas de data, categoria, conta_id e
+    forma_pagamento. Chaves do documento que não são coleções (categorias,
+    backup_metadata) ficam na tabela "documento".
+    """
+    
+    def __init__(self, db_path: Optional[str] = None, migrar_automaticamente: bool = True):
+        super().__init__()
+        self.db_path = db_path or settings.SQLITE_DB_PATH
+        self._local = threading.local()
+        self._versao = 0
+        # Tabelas colunares por coleção (com id → linha) para as agregações, montadas no primeiro uso
+        # e mantidas a cada mutação; ficam em memória além das linhas do banco, não no lugar delas
+        self._tabelas: Dict[str, Tuple[TabelaColunar, Dict[str, int]]] = {}
+        # Resumos mensais por coleção, montados no primeiro uso e depois mantidos a cada mutação
+        self._resumos: Dict[str, ResumoMensal] = {}
+        
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._criar_esquema()
+        
+        # Primeira execução: migrar o schemas.json existente (uma única vez)
+        if migrar_automaticamente and self._obter_chave("backup_metadata") is None:
+            if os.path.exists(settings.DATA_FILE_PATH):
+                self.migrar_de_json(settings.DATA_FILE_PATH)
+            else:
+                self.resetar()
+    
+    # Conexão e esquema
+    def _conexao(self) -> sqlite3.Connection:
+        """Conexão SQLite da thread atual"""
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.db_path, timeout=30)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexao = conexao
+        return conexao
+    
+    def _criar_esquema(self) -> None:
+        conexao = self._conexao()
+        with conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS documento (chave TEXT PRIMARY KEY, valor TEXT NOT NULL)"
+            )
+            for colecao in COLECOES:
+                colunas = "".join(f", {coluna} {'REAL' if coluna == 'valor' else 'TEXT'}" for coluna in COLUNAS.get(colecao, []))
+                conexao.execute(
+                    f"CREATE TABLE IF NOT EXISTS {colecao} ("
+                    f"seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL UNIQUE{colunas}, dados TEXT NOT NULL)"
+                )
+                for coluna in INDICES.get(colecao, []):
+                    conexao.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{colecao}_{coluna} ON {colecao} ({coluna})"
+                    )
+                if colecao in CAMPOS_PAGINACAO:
+                    conexao.execute(
+                        f"CREATE INDEX IF NOT EXISTS idx_{colecao}_paginacao "
+                        f"ON {colecao} ({_expressao_paginacao(colecao)}, id)"
+                    )
+    
+    def _valores_colunas(self, colecao: str, item: Dict) -> List[Any]:
+        valores = []
+        for coluna in COLUNAS.get(colecao, []):
+            valor = item.get(coluna)
+            if coluna == "data" and valor is not None:
+                valor = str(valor)[:10]
+            elif coluna == "valor":
+                valor = float(valor or 0)
+            valores.append(valor)
+        return valores
+    
+    def _gravar_linha(self, conexao: sqlite3.Connection, colecao: str, item: Dict) -> None:
+        colunas = COLUNAS.get(colecao, [])
+        nomes = ", ".join(["id"] + colunas + ["dados"])
+        marcadores = ", ".join("?" * (len(colunas) + 2))
+        conexao.execute(
+            f"INSERT INTO {colecao} ({nomes}) VALUES ({marcadores})",
+            [item["id"]] + self._valores_colunas(colecao, item) + [_serializar(item)]
+        )
+    
+    # Documento completo
+    def load_data(self) -> Dict[str, Any]:
+        """Monta o documento completo (mesmo formato do schemas.json)"""
+        data: Dict[str, Any] = {}
+        with self._lock.leitura():
+            for chave, valor in self._conexao().execute("SELECT chave, valor FROM documento"):
+                data[chave] = json.loads(valor)
+            for colecao in COLECOES:
+                data[colecao] = self._listar(colecao)
+        return data
+    
+    def save_data(self, data: Dict[str, Any]) -> None:
+        """Substitui todo o conteúdo do banco pelo documento informado"""
+        try:
+            with self._lock:
+                data.setdefault("backup_metadata", {})
+                self._atualizar_metadata(data)
+                
+                conexao = self._conexao()
+                with conexao:
+                    conexao.execute("DELETE FROM documento")
+                    for chave, valor in data.items():
+                        if chave in COLECOES:
+                            continue
+                        conexao.execute(
+                            "INSERT INTO documento (chave, valor) VALUES (?, ?)",
+                            (chave, _serializar(valor))
+                        )
+                    for colecao in COLECOES:
+                        conexao.execute(f"DELETE FROM {colecao}")
+                        for item in data.get(colecao, []):
+                            item.setdefault("id", str(uuid.uuid4()))
+                            self._gravar_linha(conexao, colecao, item)
+                self._versao += 1
+                self._resumos = {}
+                self._tabelas = {}
+                self._marcar_alteracao(set(data) | set(COLECOES))
+        except Exception as e:
+            logger.error(f"Erro ao salvar dados: {e}")
+            raise Exception(f"Erro ao salvar dados: {e}")
+    
+    def migrar_de_json(self, caminho_json: Optional[str] = None) -> Dict[str, int]:
+        """Importa o conteúdo de um schemas.json (incluindo o diário, se houver)"""
+        from .servico_dados import ServicosDados
+        
+        caminho_json = caminho_json or settings.DATA_FILE_PATH
+        if not os.path.exists(caminho_json):
+            raise Exception(f"Arquivo de dados não encontrado: {caminho_json}")
+        
+        data = ServicosDados(caminho_json).load_data()
+        self.save_data(json.loads(_serializar(data)))
+        
+        totais = {colecao: len(data.get(colecao, [])) for colecao in COLECOES}
+        logger.info(f"Migração de {caminho_json} para {self.db_path} concluída: {totais}")
+        return totais
+    
+    def estatisticas_cache(self) -> Dict[str, Any]:
+        return {"hits": 0, "misses": 0, "taxa_acerto": 0.0, "versao": self._versao}
+    
+    def fechar(self) -> None:
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is not None:
+            conexao.close()
+            self._local.conexao = None
+    
+    # Primitivas
+    def _obter_chave(self, chave: str) -> Any:
+        linha = self._conexao().execute(
+            "SELECT valor FROM documento WHERE chave = ?", (chave,)
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+    
+    def _chaves_avulsas(self) -> List[str]:
+        cursor = self._conexao().execute("SELECT chave FROM documento ORDER BY chave")
+        return [linha[0] for linha in cursor]
+    
+    def _listar(self, colecao: str) -> List[Dict]:
+        cursor = self._conexao().execute(f"SELECT dados FROM {colecao} ORDER BY seq")
+        return [json.loads(linha[0]) for linha in cursor]
+    
+    def _buscar(self, colecao: str, item_id: str) -> Optional[Dict]:
+        linha = self._conexao().execute(
+            f"SELECT dados FROM {colecao} WHERE id = ?", (item_id,)
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+    
+    def _pagina(self, colecao: str, limite: int, antes: Optional[Tuple[str, str]], filtro: Filtro) -> List[Dict]:
+        """Percorre o índice de paginação a partir do cursor (valor, id)"""
+        expressao = _expressao_paginacao(colecao)
+        where, parametros = self._clausula_filtro(colecao, filtro)
+        if antes is not None:
+            where += f"{' AND' if where else ' WHERE'} ({expressao}, id) < (?, ?)"
+            parametros += list(antes)
+        cursor = self._conexao().execute(
+            f"SELECT dados FROM {colecao}{where} ORDER BY {expressao} DESC, id DESC", parametros
+        )
+        
+        # Critérios sem coluna ficam no predicado; o cursor SQL é lido só até completar a página
+        itens: List[Dict] = []
+        for linha in cursor:
+            item = json.loads(linha[0])
+            if filtro.aceita(item):
+                itens.append(item)
+                if len(itens) >= limite:
+                    break
+        return itens
+    
+    def _recentes(self, colecao: str, limite: int) -> List[Dict]:
+        if "data" not in COLUNAS.get(colecao, []):
+            return super()._recentes(colecao, limite)
+        cursor = self._conexao().execute(
+            f"SELECT dados FROM {colecao} ORDER BY data DESC, seq DESC LIMIT ?", (limite,)
+        )
+        return [json.loads(linha[0]) for linha in cursor]
+    
+    def _consultar(self, colecao: str, filtro: Filtro) -> List[Dict]:
+        """Resolve no SQL os critérios com coluna indexada; o predicado cobre o resto"""
+        where, parametros = self._clausula_filtro(colecao, filtro)
+        cursor = self._conexao().execute(f"SELECT dados FROM {colecao}{where} ORDER BY seq", parametros)
+        return [item for item in (json.loads(linha[0]) for linha in cursor) if filtro.aceita(item)]
+    
+    def _existe(self, colecao: str, filtro: Filtro) -> bool:
+        where, parametros = self._clausula_filtro(colecao, filtro)
+        cursor = self._conexao().execute(f"SELECT dados FROM {colecao}{where}", parametros)
+        return any(filtro.aceita(json.loads(linha[0])) for linha in cursor)
+    
+    def _clausula_filtro(self, colecao: str, filtro: Filtro) -> Tuple[str, List[Any]]:
+        colunas = COLUNAS.get(colecao, [])
+        clausulas: List[str] = []
+        parametros: List[Any] = []
+        for campo, valor in filtro.igualdades.items():
+            if campo in colunas:
+                clausulas.append(f"{campo} = ?")
+                parametros.append(valor)
+        if "data" in colunas:
+            if filtro.data_inicio is not None:
+                clausulas.append("data >= ?")
+                parametros.append(filtro.data_inicio)
+            if filtro.data_fim is not None:
+                clausulas.append("data <= ?")
+                parametros.append(filtro.data_fim)
+        
+        where = f" WHERE {' AND '.join(clausulas)}" if clausulas else ""
+        return where, parametros
+    
+    def tabela_colunar(self, colecao: str) -> TabelaColunar:
+        with self._lock.leitura():
+            mantida = self._tabelas.get(colecao)
+            if mantida is None:
+                itens = self._listar(colecao)
+                posicoes = {item["id"]: posicao for posicao, item in enumerate(itens)}
+                mantida = self._tabelas[colecao] = (construir_tabela(itens), posicoes)
+            return mantida[0].copiar()
+    
+    def _resumo_mensal(self, colecao: str) -> ResumoMensal:
+        resumo = self._resumos.get(colecao)
+        if resumo is None:
+            resumo = self._resumos[colecao] = super()._resumo_mensal(colecao)
+        return resumo
+    
+    def _substituir_resumo(self, colecao: str, resumo: ResumoMensal) -> None:
+        self._resumos[colecao] = resumo
+    
+    def _inserir(self, colecao: str, item: Dict) -> Dict:
+        with self._lock:
+            item.setdefault("id", str(uuid.uuid4()))
+            item.setdefault("versao", 1)
+            conexao = self._conexao()
+            with conexao:
+                self._gravar_linha(conexao, colecao, item)
+            self._versao += 1
+            self._marcar_alteracao((colecao,))
+            self._ajustar_resumo(colecao, None, item)
+            return item
+    
+    def _atualizar(self, colecao: str, item_id: str, campos: Union[Dict, Callable[[Dict], Dict]]) -> Optional[Dict]:
+        with self._lock:
+            conexao = self._conexao()
+            with conexao:
+                item = self._ler_linha(conexao, colecao, item_id)
+                if item is None:
+                    return None
+                
+                anterior = dict(item)
+                item.update(self._preparar_atualizacao(colecao, item, campos))
+                self._regravar_linha(conexao, colecao, item)
+            self._versao += 1
+            self._marcar_alteracao((colecao,))
+            self._ajustar_resumo(colecao, anterior, item)
+            return item
+    
+    def _remover(self, colecao: str, item_id: str) -> bool:
+        with self._lock:
+            conexao = self._conexao()
+            with conexao:
+                anterior = None
+                if colecao in self._resumos or colecao in self._tabelas:
+                    anterior = self._ler_linha(conexao, colecao, item_id)
+                cursor = conexao.execute(f"DELETE FROM {colecao} WHERE id = ?", (item_id,))
+            if cursor.rowcount:
+                self._versao += 1
+                self._marcar_alteracao((colecao,))
+                self._ajustar_resumo(colecao, anterior, None)
+            return cursor.rowcount > 0
+    
+    def _aplicar_operacoes(self, operacoes: List[Dict[str, Any]]) -> List[Any]:
+        """Aplica um lote de operações numa única transação"""
+        with self._lock:
+            registros = self._preparar_operacoes(operacoes)
+            conexao = self._conexao()
+            resultados = []
+            alteracoes = []
+            try:
+                with conexao:
+                    for registro in registros:
+                        colecao = registro["colecao"]
+                        if registro["op"] == "inserir":
+                            item = registro["dados"]
+                            self._gravar_linha(conexao, colecao, item)
+                            alteracoes.append((colecao, None, item))
+                            resultados.append(item)
+                            continue
+                        
+                        # Lê pela mesma conexão: enxerga o que o lote já gravou
+                        item = self._ler_linha(conexao, colecao, registro["id"])
+                        if registro["op"] == "atualizar":
+                            anterior = dict(item)
+                            item.update(registro["dados"])
+                            self._regravar_linha(conexao, colecao, item)
+                            alteracoes.append((colecao, anterior, item))
+                            resultados.append(item)
+                        else:
+                            conexao.execute(f"DELETE FROM {colecao} WHERE id = ?", (registro["id"],))
+                            alteracoes.append((colecao, item, None))
+                            resultados.append(True)
+            except Exception as e:
+                logger.error(f"Erro ao salvar dados: {e}")
+                raise Exception(f"Erro ao salvar dados: {e}")
+            
+            if registros:
+                self._versao += 1
+                self._marcar_alteracao({registro["colecao"] for registro in registros})
+            for colecao, anterior, item in alteracoes:
+                self._ajustar_resumo(colecao, anterior, item)
+            return resultados
+    
+    def _ler_linha(self, conexao: sqlite3.Connection, colecao: str, item_id: str) -> Optional[Dict]:
+        linha = conexao.execute(f"SELECT dados FROM {colecao} WHERE id = ?", (item_id,)).fetchone()
+        return json.loads(linha[0]) if linha else None
+    
+    def _regravar_linha(self, conexao: sqlite3.Connection, colecao: str, item: Dict) -> None:
+        atribuicoes = ", ".join(f"{coluna} = ?" for coluna in COLUNAS.get(colecao, []) + ["dados"])
+        conexao.execute(
+            f"UPDATE {colecao} SET {atribuicoes} WHERE id = ?",
+            self._valores_colunas(colecao, item) + [_serializar(item), item["id"]]
+        )
+    
+    def _ajustar_resumo(self, colecao: str, anterior: Optional[Dict], item: Optional[Dict]) -> None:
+        """Reflete uma mutação já gravada no resumo mensal e na tabela colunar mantidos da coleção"""
+        self._ajustar_tabela(colecao, anterior, item)
+        resumo = self._resumos.get(colecao)
+        if resumo is None:
+            return
+        if anterior is not None:
+            resumo.remover(anterior)
+        if item is not None:
+            resumo.adicionar(item)
+    
+    def _ajustar_tabela(self, colecao: str, anterior: Optional[Dict], item: Optional[Dict]) -> None:
+        """Inclusão acrescenta uma linha, alteração a regrava e remoção a marca inativa
+        
+        Quando as linhas inativas passam a ocupar metade da tabela ela é
+        descartada e remontada no próximo uso.
+        """
+        mantida = self._tabelas.get(colecao)
+        if mantida is None:
+            return
+        tabela, posicoes = mantida
+        if item is not None:
+            posicao = posicoes.setdefault(item["id"], len(tabela))
+            tabela.adicionar(item, posicao)
+            return
+        posicao = posicoes.pop(anterior["id"], None) if anterior is not None else None
+        if posicao is not None:
+            tabela.remover(anterior, posicao)
+        inativas = len(tabela) - len(posicoes)
+        if inativas >= LAPIDES_MINIMAS_COMPACTACAO and inativas * 2 >= len(tabela):
+            del self._tabelas[colecao]
+
+def _expressao_paginacao(colecao: str) -> str:
+    """Expressão SQL da chave de paginação (mesma ordem de chave_ordenacao)"""
+    return f"COALESCE(json_extract(dados, '$.{CAMPOS_PAGINACAO[colecao]}'), '')"
+
+def _serializar(valor: Any) -> str:
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':'), default=str)
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Migra o schemas.json para o banco SQLite")
+    parser.add_argument("--json", default=settings.DATA_FILE_PATH, help="Caminho do schemas.json")
+    parser.add_argument("--db", default=settings.SQLITE_DB_PATH, help="Caminho do banco SQLite")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    servico = ServicosDadosSQLite(args.db, migrar_automaticamente=False)
+    print(servico.migrar_de_json(args.json))
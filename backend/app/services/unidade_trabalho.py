@@ -0,0 +1,40 @@
+import uuid
+from typing import Dict, Any, List, Union, Callable
+
+class UnidadeTrabalho:
+    """Inclusões, alterações e remoções em várias coleções gravadas de uma vez
+    
+    As operações são apenas registradas; `confirmar` do serviço de dados as
+    confere e aplica sob um único lock de escrita e as persiste numa única
+    gravação (tudo ou nada). Também funciona como gerenciador de contexto
+    de `servico.unidade_trabalho()`: ao sair do bloco sem exceção o lote é
+    confirmado, e uma exceção o descarta.
+    """
+    
+    def __init__(self, servico: Any = None):
+        self._servico = servico
+        self.operacoes: List[Dict[str, Any]] = []
+        self.resultados: List[Any] = []
+    
+    def __len__(self) -> int:
+        return len(self.operacoes)
+    
+    def inserir(self, colecao: str, item: Dict) -> Dict:
+        """Registra a inclusão do item (recebe um id se não tiver)"""
+        item.setdefault("id", str(uuid.uuid4()))
+        self.operacoes.append({"op": "inserir", "colecao": colecao, "dados": item})
+        return item
+    
+    def atualizar(self, colecao: str, item_id: str, campos: Union[Dict, Callable[[Dict], Dict]]) -> None:
+        """Registra a alteração; `campos` pode trazer "versao" ou ser uma função do item"""
+        self.operacoes.append({"op": "atualizar", "colecao": colecao, "id": item_id, "dados": campos})
+    
+    def remover(self, colecao: str, item_id: str) -> None:
+        self.operacoes.append({"op": "remover", "colecao": colecao, "id": item_id})
+    
+    def __enter__(self) -> "UnidadeTrabalho":
+        return self
+    
+    def __exit__(self, tipo, valor, rastreamento) -> None:
+        if tipo is None and self._servico is not None:
+            self._servico.confirmar(self)
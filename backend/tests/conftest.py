@@ -0,0 +1,56 @@
+import os
+import tempfile
+import uuid
+import pytest
+from app.core.config import settings
+
+# Os serviços globais são criados na importação dos módulos da API: apontá-los
+# para um diretório temporário antes disso, para nunca tocar em app/data
+_DIRETORIO_SESSAO = tempfile.mkdtemp(prefix="financeiro-testes-")
+settings.DATA_FILE_PATH = os.path.join(_DIRETORIO_SESSAO, "data", "schemas.json")
+settings.SQLITE_DB_PATH = os.path.join(_DIRETORIO_SESSAO, "data", "financeiro.db")
+settings.STORAGE_BACKEND = "json"
+settings.DATA_SHARDED_ENABLED = False
+settings.DATA_JOURNAL_ENABLED = False
+
+from app.services.servico_dados import ServicosDados
+from app.services.servico_dados_sqlite import ServicosDadosSQLite
+
+def criar_servico(backend: str, diretorio: str, monkeypatch):
+    """Serviço de dados isolado em `diretorio` para o backend informado"""
+    monkeypatch.setattr(settings, "DATA_JOURNAL_ENABLED", backend == "diario")
+    caminho_json = os.path.join(diretorio, "schemas.json")
+    if backend == "sqlite":
+        monkeypatch.setattr(settings, "DATA_FILE_PATH", caminho_json)
+        return ServicosDadosSQLite(os.path.join(diretorio, "financeiro.db"))
+    return ServicosDados(caminho_json)
+
+@pytest.fixture(params=["json", "diario", "sqlite"])
+def servico(request, tmp_path, monkeypatch):
+    """Serviço de dados novo, em cada um dos backends"""
+    servico = criar_servico(request.param, str(tmp_path), monkeypatch)
+    yield servico
+    servico.fechar()
+
+@pytest.fixture
+def cliente(servico, monkeypatch):
+    """TestClient da API servida pelo `servico` da fixture"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.services.servico_dados_assincrono import servico_dados_async
+    
+    monkeypatch.setattr(servico_dados_async, "servico", servico)
+    return TestClient(app)
+
+def novo_gasto(**campos):
+    """Gasto pronto para gravar (com id, como os endpoints o montam)"""
+    gasto = {
+        "id": str(uuid.uuid4()),
+        "descricao": "Mercado",
+        "valor": 10.0,
+        "data": "2024-03-15",
+        "categoria": "Alimentação",
+        "forma_pagamento": "pix"
+    }
+    gasto.update(campos)
+    return gasto
@@ -0,0 +1,59 @@
+import os
+from conftest import criar_servico, novo_gasto
+
+def _reabrir(tmp_path, monkeypatch):
+    """Nova instância sobre os mesmos arquivos, como após uma queda do processo"""
+    return criar_servico("diario", str(tmp_path), monkeypatch)
+
+def _caminho_diario(tmp_path) -> str:
+    return os.path.join(str(tmp_path), "schemas.json.journal")
+
+def _valores(servico):
+    return sorted(gasto["valor"] for gasto in servico.get_gastos())
+
+def test_mutacoes_do_diario_sao_reaplicadas(tmp_path, monkeypatch):
+    servico = _reabrir(tmp_path, monkeypatch)
+    mantido = servico.create_gasto(novo_gasto(valor=1.0))
+    removido = servico.create_gasto(novo_gasto(valor=2.0))
+    servico.update_gasto(mantido["id"], {"valor": 3.0, "versao": 1})
+    servico.delete_gasto(removido["id"])
+    assert os.path.getsize(_caminho_diario(tmp_path)) > 0
+    
+    recuperado = _reabrir(tmp_path, monkeypatch)
+    assert _valores(recuperado) == [3.0]
+    assert recuperado.get_gasto(mantido["id"])["versao"] == 2
+    assert recuperado.get_gasto(removido["id"]) is None
+
+def test_linha_incompleta_e_descartada_e_truncada(tmp_path, monkeypatch):
+    servico = _reabrir(tmp_path, monkeypatch)
+    servico.create_gasto(novo_gasto(valor=1.0))
+    caminho = _caminho_diario(tmp_path)
+    tamanho_valido = os.path.getsize(caminho)
+    
+    # Queda no meio da gravação: a última linha fica sem o "\n"
+    with open(caminho, "ab") as arquivo:
+        arquivo.write(b'{"op":"inserir","colecao":"gastos","dados":{"id":"x","val')
+    
+    recuperado = _reabrir(tmp_path, monkeypatch)
+    assert _valores(recuperado) == [1.0]
+    assert os.path.getsize(caminho) == tamanho_valido
+    
+    # O diário segue utilizável depois do truncamento
+    recuperado.create_gasto(novo_gasto(valor=2.0))
+    assert _valores(_reabrir(tmp_path, monkeypatch)) == [1.0, 2.0]
+
+def test_lote_incompleto_e_descartado_por_inteiro(tmp_path, monkeypatch):
+    servico = _reabrir(tmp_path, monkeypatch)
+    servico.create_gasto(novo_gasto(valor=1.0))
+    caminho = _caminho_diario(tmp_path)
+    
+    with servico.unidade_trabalho() as unidade:
+        for valor in (2.0, 3.0, 4.0):
+            unidade.inserir("gastos", novo_gasto(valor=valor))
+    assert _valores(servico) == [1.0, 2.0, 3.0, 4.0]
+    
+    # O lote é uma única linha: cortá-la no meio perde o lote todo, nunca parte dele
+    with open(caminho, "r+b") as arquivo:
+        arquivo.truncate(os.path.getsize(caminho) - 20)
+    
+    assert _valores(_reabrir(tmp_path, monkeypatch)) == [1.0]
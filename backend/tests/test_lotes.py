@@ -0,0 +1,104 @@
+import pytest
+from app.services.base_dados import ConflitoVersao, RegistroInexistente
+from conftest import criar_servico, novo_gasto
+
+def _estado(servico):
+    return sorted((gasto["id"], gasto["valor"], gasto["versao"]) for gasto in servico.get_gastos())
+
+def test_registro_inexistente_descarta_o_lote(servico):
+    gasto = servico.create_gasto(novo_gasto())
+    antes = _estado(servico)
+    
+    unidade = servico.unidade_trabalho()
+    unidade.inserir("gastos", novo_gasto(valor=2.0))
+    unidade.atualizar("gastos", gasto["id"], {"valor": 3.0})
+    unidade.remover("gastos", "inexistente")
+    with pytest.raises(RegistroInexistente):
+        servico.confirmar(unidade)
+    
+    assert _estado(servico) == antes
+
+def test_conflito_de_versao_descarta_o_lote(servico):
+    gasto = servico.create_gasto(novo_gasto())
+    servico.update_gasto(gasto["id"], {"valor": 2.0})
+    antes = _estado(servico)
+    
+    with pytest.raises(ConflitoVersao):
+        with servico.unidade_trabalho() as unidade:
+            unidade.inserir("gastos", novo_gasto(valor=5.0))
+            unidade.atualizar("gastos", gasto["id"], {"valor": 3.0, "versao": 1})
+    
+    assert _estado(servico) == antes
+
+def test_falha_ao_gravar_o_diario_desfaz_o_lote(tmp_path, monkeypatch):
+    servico = criar_servico("diario", str(tmp_path), monkeypatch)
+    gasto = servico.create_gasto(novo_gasto())
+    antes = _estado(servico)
+    
+    def falhar(registros):
+        raise OSError("disco cheio")
+    monkeypatch.setattr(servico._diario, "anexar", falhar)
+    
+    with pytest.raises(Exception):
+        with servico.unidade_trabalho() as unidade:
+            unidade.inserir("gastos", novo_gasto(valor=2.0))
+            unidade.atualizar("gastos", gasto["id"], {"valor": 3.0})
+    
+    assert _estado(servico) == antes
+
+def test_falha_no_meio_da_transacao_sqlite_desfaz_o_lote(tmp_path, monkeypatch):
+    servico = criar_servico("sqlite", str(tmp_path), monkeypatch)
+    gasto = servico.create_gasto(novo_gasto())
+    antes = _estado(servico)
+    
+    def falhar(conexao, colecao, item):
+        raise RuntimeError("falha ao regravar")
+    monkeypatch.setattr(servico, "_regravar_linha", falhar)
+    
+    # A inclusão já foi gravada na transação quando a alteração falha
+    with pytest.raises(Exception):
+        with servico.unidade_trabalho() as unidade:
+            unidade.inserir("gastos", novo_gasto(valor=2.0))
+            unidade.atualizar("gastos", gasto["id"], {"valor": 3.0})
+    
+    assert _estado(servico) == antes
+    servico.fechar()
+
+def test_patch_em_lote_com_id_inexistente_retorna_404(cliente, servico):
+    gasto = servico.create_gasto(novo_gasto())
+    antes = _estado(servico)
+    
+    resposta = cliente.patch("/api/v1/transacoes/gastos/batch", json=[
+        {"id": gasto["id"], "valor": 2.0},
+        {"id": "inexistente", "valor": 3.0}
+    ])
+    assert resposta.status_code == 404
+    assert _estado(servico) == antes
+
+def test_patch_em_lote_com_versao_desatualizada_retorna_409(cliente, servico):
+    gasto = servico.create_gasto(novo_gasto())
+    servico.update_gasto(gasto["id"], {"valor": 2.0})
+    outro = servico.create_gasto(novo_gasto())
+    antes = _estado(servico)
+    
+    resposta = cliente.patch("/api/v1/transacoes/gastos/batch", json=[
+        {"id": outro["id"], "valor": 4.0, "versao": 1},
+        {"id": gasto["id"], "valor": 3.0, "versao": 1}
+    ])
+    assert resposta.status_code == 409
+    assert _estado(servico) == antes
+
+def test_post_em_lote_com_item_invalido_nao_grava_nada(cliente, servico):
+    validos = [
+        {k: v for k, v in novo_gasto(valor=valor).items() if k != "id"}
+        for valor in (1.0, 2.0)
+    ]
+    invalido = {**validos[0], "forma_pagamento": "cheque"}
+    
+    resposta = cliente.post("/api/v1/transacoes/gastos/batch", json=validos + [invalido])
+    assert resposta.status_code == 422
+    assert servico.get_gastos() == []
+    
+    resposta = cliente.post("/api/v1/transacoes/gastos/batch", json=validos)
+    assert resposta.status_code == 200
+    assert sorted(gasto["valor"] for gasto in servico.get_gastos()) == [1.0, 2.0]
@@ -0,0 +1,44 @@
+import pytest
+from app.services.base_dados import ConflitoVersao
+from conftest import novo_gasto
+
+def test_atualizacao_incrementa_versao(servico):
+    gasto = servico.create_gasto(novo_gasto())
+    assert gasto["versao"] == 1
+    
+    atualizado = servico.update_gasto(gasto["id"], {"valor": 20.0, "versao": 1})
+    assert atualizado["versao"] == 2
+    assert servico.get_gasto(gasto["id"])["valor"] == 20.0
+
+def test_versao_desatualizada_gera_conflito_sem_alterar(servico):
+    gasto = servico.create_gasto(novo_gasto())
+    servico.update_gasto(gasto["id"], {"valor": 20.0, "versao": 1})
+    
+    with pytest.raises(ConflitoVersao) as erro:
+        servico.update_gasto(gasto["id"], {"valor": 30.0, "versao": 1})
+    assert (erro.value.esperada, erro.value.atual) == (1, 2)
+    
+    atual = servico.get_gasto(gasto["id"])
+    assert atual["valor"] == 20.0
+    assert atual["versao"] == 2
+
+def test_atualizacao_sem_versao_nao_e_verificada(servico):
+    gasto = servico.create_gasto(novo_gasto())
+    servico.update_gasto(gasto["id"], {"valor": 20.0})
+    assert servico.update_gasto(gasto["id"], {"valor": 30.0})["versao"] == 3
+
+def test_put_com_versao_desatualizada_retorna_409(cliente, servico):
+    gasto = servico.create_gasto(novo_gasto())
+    url = f"/api/v1/transacoes/gastos/{gasto['id']}"
+    
+    # Dois clientes leram a versão 1; só a primeira gravação vale
+    primeira = cliente.put(url, json={"valor": 20.0, "versao": 1})
+    assert primeira.status_code == 200
+    assert primeira.json()["versao"] == 2
+    
+    segunda = cliente.put(url, json={"valor": 30.0, "versao": 1})
+    assert segunda.status_code == 409
+    
+    atual = servico.get_gasto(gasto["id"])
+    assert atual["valor"] == 20.0
+    assert atual["versao"] == 2
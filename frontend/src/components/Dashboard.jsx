@@ -43,16 +43,11 @@ export default function Dashboard() {
       const ano = hoje.getFullYear()
       const mes = hoje.getMonth() + 1
 
-      // Carregar resumo mensal
-      const resumoResponse = await transacoesService.resumoMensal(ano, mes)
-      setResumoMensal(resumoResponse.data)
-
-      // Carregar transações recentes
-      const gastosResponse = await transacoesService.listarGastos()
-      const receitasResponse = await transacoesService.listarReceitas()
-      
-      setGastos(gastosResponse.data.slice(0, 5)) // Últimos 5 gastos
-      setReceitas(receitasResponse.data.slice(0, 5)) // Últimas 5 receitas
+      // Resumo mensal e transações recentes em uma única chamada
+      const dashboardResponse = await transacoesService.dashboard(ano, mes, 5)
+      setResumoMensal(dashboardResponse.data.resumo)
+      setGastos(dashboardResponse.data.gastos_recentes) // Últimos 5 gastos
+      setReceitas(dashboardResponse.data.receitas_recentes) // Últimas 5 receitas
 
     } catch (error) {
       console.error('Erro ao carregar dados do dashboard:', error)
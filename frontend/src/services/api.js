@@ -50,6 +50,12 @@ export const transacoesService = {
   atualizarGasto: (id, gasto) => api.put(`/transacoes/gastos/${id}`, gasto),
   
   deletarGasto: (id) => api.delete(`/transacoes/gastos/${id}`),
+  
+  criarGastosLote: (gastos) => api.post('/transacoes/gastos/batch', gastos),
+  
+  atualizarGastosLote: (gastos) => api.patch('/transacoes/gastos/batch', gastos),
+  
+  deletarGastosLote: (ids) => api.delete('/transacoes/gastos/batch', { data: { ids } }),
 
   // Receitas
   listarReceitas: (filtros = {}) => {
@@ -67,12 +73,21 @@ export const transacoesService = {
   atualizarReceita: (id, receita) => api.put(`/transacoes/receitas/${id}`, receita),
   
   deletarReceita: (id) => api.delete(`/transacoes/receitas/${id}`),
+  
+  criarReceitasLote: (receitas) => api.post('/transacoes/receitas/batch', receitas),
+  
+  atualizarReceitasLote: (receitas) => api.patch('/transacoes/receitas/batch', receitas),
+  
+  deletarReceitasLote: (ids) => api.delete('/transacoes/receitas/batch', { data: { ids } }),
 
   // Categorias
   listarCategorias: () => api.get('/transacoes/categorias'),
 
   // Relatórios
   resumoMensal: (ano, mes) => api.get(`/transacoes/relatorios/resumo-mensal?ano=${ano}&mes=${mes}`),
+
+  // Dashboard (resumo do mês, transações recentes e saldos em uma chamada)
+  dashboard: (ano, mes, limite = 5) => api.get(`/transacoes/dashboard?ano=${ano}&mes=${mes}&limite=${limite}`),
 };
 
 // === SERVIÇOS DE CONTAS ===